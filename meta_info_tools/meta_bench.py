@@ -0,0 +1,610 @@
+"""Benchmarks of the meta info tools on synthetic dictionaries.
+Run python -m meta_info_tools.meta_bench --help to see the available benchmarks."""
+from .meta_info import MetaDictionary, MetaInfoBase, jsonBackends, writeFile
+from .meta_info import MetaInfo, setDictionaryCache, setInterning
+from .meta_cache import DictionaryCache
+from .meta_compact import compactEntryFromDict
+from .meta_store import MetaStore, writeMetaStore
+from .meta_schema import MetaSchema
+import os, os.path, time
+import gc, tracemalloc
+import io, json, tempfile, shutil
+import random
+
+
+def syntheticDictionaryDict(
+    name="synthetic", nSections=50, nValues=40, nDimensions=2, required=(), seed=0
+):
+    """Returns a json like dictionary with a dictionary of nSections sections each with nValues values and nDimensions dimensions"""
+    rand = random.Random(seed)
+    units = ["m", "s", "kg", "J", "eV", "angstrom", None]
+    dataTypes = ["int", "int64", "float", "float64", "string", "boolean"]
+    entries = [
+        {
+            "meta_name": f"{name}_abstract",
+            "meta_type": "type-abstract",
+            "meta_description": f"abstract type of the {name} dictionary",
+        }
+    ]
+    for iSect in range(nSections):
+        sName = f"{name}_section_{iSect}"
+        parent = f"{name}_section_{rand.randrange(iSect)}" if iSect else None
+        entries.append(
+            {
+                "meta_name": sName,
+                "meta_type": "type-section",
+                "meta_description": 3
+                * f"Section number {iSect} of the synthetic dictionary {name}, ",
+                "meta_parent_section": parent,
+                "meta_abstract_types": [f"{name}_abstract"],
+            }
+        )
+        for iDim in range(nDimensions):
+            entries.append(
+                {
+                    "meta_name": f"{sName}_dim_{iDim}",
+                    "meta_type": "type-dimension",
+                    "meta_description": f"dimension {iDim} of section {sName}",
+                    "meta_parent_section": sName,
+                    "meta_data_type": "int",
+                }
+            )
+        for iVal in range(nValues):
+            dims = []
+            for iDim in range(rand.randrange(3)):
+                if nDimensions and rand.random() < 0.5:
+                    dims.append(
+                        {
+                            "meta_dimension_symbolic": f"{sName}_dim_{rand.randrange(nDimensions)}"
+                        }
+                    )
+                else:
+                    dims.append({"meta_dimension_fixed": 3})
+            value = {
+                "meta_name": f"{sName}_value_{iVal}",
+                "meta_type": "type-value",
+                "meta_description": [
+                    f"Value {iVal} of the section {sName}, with a description long enough ",
+                    "to be split on several lines when the dictionary is standardized, ",
+                    "as it happens in real dictionaries.",
+                ],
+                "meta_parent_section": sName,
+                "meta_data_type": rand.choice(dataTypes),
+                "meta_dimension": dims,
+                "meta_repeats": rand.random() < 0.2,
+            }
+            u = rand.choice(units)
+            if u:
+                value["meta_units"] = u
+            entries.append(value)
+    return {
+        "metadict_name": name,
+        "metadict_description": f"synthetic dictionary {name} for benchmarks",
+        "metadict_version": "1.0.0",
+        "metadict_required": [{"metadict_required_name": r} for r in required],
+        "meta_info_entry": entries,
+    }
+
+
+def syntheticDictionary(**kwargs):
+    """Returns a MetaDictionary created with syntheticDictionaryDict"""
+    return MetaDictionary.fromDict(syntheticDictionaryDict(**kwargs))
+
+
+def syntheticInjectDictionaryDict(name="inject", nPartial=200, nSections=100, seed=0):
+    """Returns a json like dictionary with nPartial partial sections injected (depending on regexps and abstract types) in a tree of nSections sections"""
+    rand = random.Random(seed)
+    entries = [
+        {
+            "meta_name": f"{name}_kind_{k}",
+            "meta_type": "type-abstract",
+            "meta_description": f"kind {k} of sections",
+        }
+        for k in range(4)
+    ]
+    for iPartial in range(nPartial):
+        pName = f"{name}_partial_{iPartial}"
+        kind = f"{name}_kind_{iPartial % 4}"
+        entries += [
+            {
+                "meta_name": pName,
+                "meta_type": "type-section",
+                "meta_description": f"partial section {iPartial}",
+                "meta_inject": [
+                    {
+                        "meta_inject_if_section_regexp": f"{name}_section_{iPartial % 10}_.*",
+                        "meta_inject_if_abstract_type": [
+                            kind if iPartial % 2 else "!" + kind
+                        ],
+                    }
+                ],
+            },
+            {
+                "meta_name": pName + "_sub",
+                "meta_type": "type-section",
+                "meta_description": f"subsection of partial section {iPartial}",
+                "meta_parent_section": pName,
+            },
+        ]
+        for sName in [pName, pName + "_sub"]:
+            entries.append(
+                {
+                    "meta_name": f"{sName}_value",
+                    "meta_type": "type-value",
+                    "meta_description": f"value of {sName}",
+                    "meta_parent_section": sName,
+                    "meta_data_type": "int",
+                }
+            )
+    for iSect in range(nSections):
+        sName = f"{name}_section_{iSect % 10}_{iSect}"
+        parent = None
+        if iSect:
+            iParent = rand.randrange(iSect)
+            parent = f"{name}_section_{iParent % 10}_{iParent}"
+        entries.append(
+            {
+                "meta_name": sName,
+                "meta_type": "type-section",
+                "meta_description": f"section {iSect}",
+                "meta_parent_section": parent,
+                "meta_abstract_types": [f"{name}_kind_{iSect % 4}"],
+            }
+        )
+    return {
+        "metadict_name": name,
+        "metadict_description": f"synthetic dictionary {name} with partial sections",
+        "metadict_required": [],
+        "meta_info_entry": entries,
+    }
+
+
+def syntheticData(nItems=20000, seed=0):
+    """Returns a large json like data document (as passed to validate)"""
+    rand = random.Random(seed)
+    return {
+        "section_run": [
+            {
+                "program_name": f"program {i % 13}",
+                "atom_positions": [
+                    [rand.random(), rand.random(), rand.random()] for _ in range(8)
+                ],
+                "energy_total": rand.random() * 1e-18,
+                "converged": rand.random() < 0.5,
+                "n_atoms": 8,
+            }
+            for i in range(nItems)
+        ]
+    }
+
+
+def bestTime(f, repeat=3):
+    """Returns the best time (in seconds) of repeat calls to f"""
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        f()
+        dt = time.perf_counter() - t0
+        if best is None or dt < best:
+            best = dt
+    return best
+
+
+def allocatedBytes(f):
+    """Returns the result of f() and the number of bytes allocated by it that are still in use"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        res = f()
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return res, after - before
+
+
+def peakBytes(f):
+    """Returns the peak memory (in bytes) allocated during the call f()"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        f()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return peak - before
+
+
+def report(title, results, baseline=None):
+    """prints out the results (a list of (name, seconds, count) tuples)"""
+    print(title)
+    tBase = None
+    for name, t, count in results:
+        if name == baseline:
+            tBase = t
+    for name, t, count in results:
+        speedup = f" x{tBase / t:.2f}" if tBase else ""
+        print(f"  {name:>24}: {t * 1000:10.2f} ms {count / t:14.1f} items/s{speedup}")
+
+
+def benchJson(args):
+    """Compares the json backends on a large dictionary and a large data document"""
+    tmpDir = tempfile.mkdtemp(prefix="benchJson")
+    try:
+        dPath = os.path.join(tmpDir, "synthetic.meta_dictionary.json")
+        d = syntheticDictionary(nSections=args.sections, nValues=args.values)
+        writeFile(dPath, lambda outF: d.write(outF))
+        nEntries = len(d.meta_info_entry)
+        dataPath = os.path.join(tmpDir, "data.json")
+        writeFile(dataPath, lambda outF: json.dump(syntheticData(args.items), outF))
+        for title, p, count in [
+            (f"dictionary ({nEntries} entries)", dPath, nEntries),
+            (f"data document ({args.items} items)", dataPath, args.items),
+        ]:
+            results = []
+            for name, backend in sorted(jsonBackends.items()):
+                results.append(
+                    (name, bestTime(lambda: backend.load(p), args.repeat), count)
+                )
+            report(f"json parsing {title}", results, baseline="json")
+    finally:
+        shutil.rmtree(tmpDir)
+
+
+def benchConstruct(args):
+    """Compares the validating and the trusted construction of meta info entries"""
+    dDict = syntheticDictionaryDict(nSections=args.sections, nValues=args.values)
+    nEntries = len(dDict["meta_info_entry"])
+    results = []
+    for trusted in [False, True]:
+        results.append(
+            (
+                "trusted" if trusted else "validating",
+                bestTime(
+                    lambda: MetaDictionary.fromDict(dDict, trusted=trusted), args.repeat
+                ),
+                nEntries,
+            )
+        )
+    report(f"MetaDictionary.fromDict ({nEntries} entries)", results, "validating")
+
+
+def benchSerialize(args):
+    """Compares the single pass serializer of dictionaries with json.dumps of the same (json like) dictionary"""
+    dDict = syntheticDictionaryDict(nSections=args.sections, nValues=args.values)
+    d = MetaDictionary.fromDict(dDict)
+    nEntries = len(d.meta_info_entry)
+    results = [
+        ("json.dumps", bestTime(lambda: json.dumps(dDict, indent=2), args.repeat)),
+        ("write", bestTime(lambda: d.write(io.StringIO()), args.repeat)),
+    ]
+    report(
+        f"MetaDictionary serialization ({nEntries} entries)",
+        [(name, t, nEntries) for name, t in results],
+        "json.dumps",
+    )
+
+
+def benchCache(args):
+    """Compares loading a dictionary with a cold and a warm dictionary cache"""
+    tmpDir = tempfile.mkdtemp(prefix="benchCache")
+    try:
+        d = syntheticDictionary(nSections=args.sections, nValues=args.values)
+        nEntries = len(d.meta_info_entry)
+        dPath = os.path.join(tmpDir, "synthetic.meta_dictionary.json")
+        writeFile(dPath, lambda outF: d.write(outF))
+        d.writeExploded(tmpDir)
+        cache = DictionaryCache(os.path.join(tmpDir, "cache"))
+        for p in [dPath, os.path.join(tmpDir, "synthetic.meta_dictionary")]:
+            results = []
+            setDictionaryCache(None)
+            results.append(
+                (
+                    "no cache",
+                    bestTime(lambda: MetaDictionary.loadAtPath(p), args.repeat),
+                    nEntries,
+                )
+            )
+            setDictionaryCache(cache)
+
+            def coldLoad():
+                cache.clear()
+                MetaDictionary.loadAtPath(p)
+
+            results.append(("cold cache", bestTime(coldLoad, args.repeat), nEntries))
+            results.append(
+                (
+                    "warm cache",
+                    bestTime(lambda: MetaDictionary.loadAtPath(p), args.repeat),
+                    nEntries,
+                )
+            )
+            report(f"loading {os.path.basename(p)}", results, baseline="no cache")
+    finally:
+        setDictionaryCache(None)
+        shutil.rmtree(tmpDir)
+
+
+def benchLazy(args):
+    """Compares the time to the first lookup in an eager and in a lazy dictionary"""
+    tmpDir = tempfile.mkdtemp(prefix="benchLazy")
+    try:
+        d = syntheticDictionary(nSections=args.sections, nValues=args.values)
+        nEntries = len(d.meta_info_entry)
+        dPath = os.path.join(tmpDir, "synthetic.meta_dictionary.json")
+        writeFile(dPath, lambda outF: d.write(outF))
+        results = []
+        for lazy in [False, True]:
+
+            def firstLookup():
+                dd = MetaDictionary.loadAtPath(dPath, lazy=lazy)
+                dd["synthetic_section_0_value_0"]
+
+            results.append(
+                ("lazy" if lazy else "eager", bestTime(firstLookup, args.repeat), 1)
+            )
+        report(f"load and first lookup ({nEntries} entries)", results, "eager")
+    finally:
+        shutil.rmtree(tmpDir)
+
+
+def benchMemory(args):
+    """Compares the memory used by pydantic and compact entries"""
+    dDict = syntheticDictionaryDict(nSections=args.sections, nValues=args.values)
+    rawEntries = dDict["meta_info_entry"]
+    nEntries = len(rawEntries)
+    print(f"memory of {nEntries} entries")
+    for name, build in [
+        ("pydantic", lambda e: MetaInfoBase.fromDict(e)),
+        ("compact", compactEntryFromDict),
+    ]:
+        entries, nBytes = allocatedBytes(lambda: [build(e) for e in rawEntries])
+        print(
+            f"  {name:>24}: {nBytes / 2**20:10.2f} MiB {nBytes / nEntries:14.1f} bytes/entry"
+        )
+        del entries
+
+
+def benchInterning(args):
+    """Compares the memory used by a set of loaded dictionaries with and without interning of the identifiers"""
+    tmpDir = tempfile.mkdtemp(prefix="benchInterning")
+    try:
+        paths = []
+        for i in range(args.dictionaries):
+            d = syntheticDictionary(
+                name=f"synthetic{i}",
+                nSections=args.sections,
+                nValues=args.values,
+                seed=i,
+            )
+            p = os.path.join(tmpDir, f"synthetic{i}.meta_dictionary.json")
+            writeFile(p, lambda outF: d.write(outF))
+            paths.append(p)
+        nEntries = args.dictionaries * len(d.meta_info_entry)
+        print(f"memory of {args.dictionaries} loaded dictionaries ({nEntries} entries)")
+        MetaDictionary.loadAtPath(paths[0])  # warm up
+        for enabled in [False, True]:
+            setInterning(enabled)
+            dicts, nBytes = allocatedBytes(
+                lambda: [MetaDictionary.loadAtPath(p) for p in paths]
+            )
+            name = "interned" if enabled else "not interned"
+            print(
+                f"  {name:>24}: {nBytes / 2**20:10.2f} MiB {nBytes / nEntries:14.1f} bytes/entry"
+            )
+            del dicts
+    finally:
+        setInterning(False)
+        shutil.rmtree(tmpDir)
+
+
+def benchStreaming(args):
+    """Compares the peak memory and time of the normal and streaming load of a large single file dictionary"""
+    tmpDir = tempfile.mkdtemp(prefix="benchStreaming")
+    try:
+        d = syntheticDictionary(nSections=args.sections, nValues=args.values)
+        nEntries = len(d.meta_info_entry)
+        dPath = os.path.join(tmpDir, "synthetic.meta_dictionary.json")
+        writeFile(dPath, lambda outF: d.write(outF))
+        del d
+        size = os.path.getsize(dPath)
+        print(f"loading {dPath} ({size / 2**20:.1f} MiB, {nEntries} entries)")
+        for streaming in [False, True]:
+            load = lambda: MetaDictionary.loadDictionaryAtPath(
+                dPath, streaming=streaming
+            )
+            name = "streaming" if streaming else "normal"
+            peak = peakBytes(load)
+            t = bestTime(load, args.repeat)
+            print(f"  {name:>24}: {t * 1000:10.2f} ms {peak / 2**20:10.2f} MiB peak")
+    finally:
+        shutil.rmtree(tmpDir)
+
+
+def benchStore(args):
+    """Compares the time to the first lookup loading a dictionary and opening a compiled store"""
+    tmpDir = tempfile.mkdtemp(prefix="benchStore")
+    try:
+        d = syntheticDictionary(nSections=args.sections, nValues=args.values)
+        nEntries = len(d.meta_info_entry)
+        dPath = os.path.join(tmpDir, "synthetic.meta_dictionary.json")
+        writeFile(dPath, lambda outF: d.write(outF))
+        storePath = os.path.join(tmpDir, "synthetic.meta_store")
+        writeMetaStore(MetaInfo.withPath(dPath)[0], storePath)
+        metaName = "synthetic_section_0_value_0"
+
+        def loadLookup():
+            MetaInfo.withPath(dPath)[0].findMany(metaName)
+
+        def storeLookup():
+            with MetaStore(storePath) as store:
+                store.findMany(metaName)
+
+        results = [
+            ("load", bestTime(loadLookup, args.repeat), 1),
+            ("store", bestTime(storeLookup, args.repeat), 1),
+        ]
+        report(f"open and first lookup ({nEntries} entries)", results, "load")
+    finally:
+        shutil.rmtree(tmpDir)
+
+
+def benchSchema(args):
+    """Compares building the schemas of dictionaries sharing a base dictionary entry by entry and merging schema fragments"""
+    nDeps = args.dictionaries
+    metaInfo = MetaInfo.empty()
+    metaInfo.addMetaDict(
+        syntheticDictionary(name="base", nSections=args.sections, nValues=args.values)
+    )
+    for i in range(nDeps):
+        metaInfo.addMetaDict(
+            syntheticDictionary(
+                name=f"dep{i}", nSections=5, nValues=10, required=["base"], seed=i
+            )
+        )
+    names = sorted(metaInfo.dictionaries)
+
+    def byEntry():
+        for name in names:
+            schema = MetaSchema(
+                metaInfo=metaInfo,
+                mainDictionary=name,
+                dictionaries=metaInfo.depsOfDict(name),
+                sections={},
+                abstractTypes={},
+                dimensions={},
+                rootSections={},
+                dataView={},
+            )
+            for dep in schema.dictionaries:
+                schema.addSchemaOfDictionary(metaInfo.dictionaries[dep])
+            schema.injectSections()
+            schema.linkAbstracts()
+
+    def coldFragments():
+        # drops the cached fragments
+        object.__setattr__(metaInfo, "schemaCache", None)
+        fragments()
+
+    def fragments():
+        for name in names:
+            MetaSchema.build(name, metaInfo)
+
+    results = [
+        ("addSchemaOfDictionary", bestTime(byEntry, args.repeat), len(names)),
+        ("fragments (cold)", bestTime(coldFragments, args.repeat), len(names)),
+        ("fragments", bestTime(fragments, args.repeat), len(names)),
+    ]
+    report(
+        f"schemas of {len(names)} dictionaries sharing a base dictionary",
+        results,
+        "addSchemaOfDictionary",
+    )
+
+
+def benchInject(args):
+    """Times the injection of the partial sections for an increasing number of them"""
+    results = []
+    for nPartial in [args.partial // 4, args.partial // 2, args.partial]:
+        metaInfo = MetaInfo.empty()
+        metaInfo.addMetaDict(
+            MetaDictionary.fromDict(
+                syntheticInjectDictionaryDict(
+                    nPartial=nPartial, nSections=args.sections
+                )
+            )
+        )
+        schema = MetaSchema.build("inject", metaInfo)
+        nPaths = sum(1 for _ in schema.iterateData())
+        results.append(
+            (
+                f"{nPartial} partial sections",
+                bestTime(schema.injectSections, args.repeat),
+                nPaths,
+            )
+        )
+    report(
+        f"injectSections in {args.sections} sections (items are data view sections)",
+        results,
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="meta_bench")
+    parser.add_argument("--repeat", type=int, default=3, help="repetitions per timing")
+    parser.add_argument(
+        "--sections", type=int, default=100, help="sections of synthetic dictionaries"
+    )
+    parser.add_argument(
+        "--values",
+        type=int,
+        default=40,
+        help="values per section of synthetic dictionaries",
+    )
+    subparsers = parser.add_subparsers(help="benchmark to run")
+    parser_json = subparsers.add_parser("json", help="compares the json backends")
+    parser_json.add_argument(
+        "--items", type=int, default=20000, help="items in the data document"
+    )
+    parser_json.set_defaults(func=benchJson)
+    parser_construct = subparsers.add_parser(
+        "construct", help="validating vs trusted construction of entries"
+    )
+    parser_construct.set_defaults(func=benchConstruct)
+    parser_serialize = subparsers.add_parser(
+        "serialize", help="single pass dictionary serialization vs json.dumps"
+    )
+    parser_serialize.set_defaults(func=benchSerialize)
+    parser_cache = subparsers.add_parser(
+        "cache", help="loads dictionaries with and without the dictionary cache"
+    )
+    parser_cache.set_defaults(func=benchCache)
+    parser_lazy = subparsers.add_parser(
+        "lazy", help="time to the first lookup of eager and lazy dictionaries"
+    )
+    parser_lazy.set_defaults(func=benchLazy)
+    parser_memory = subparsers.add_parser(
+        "memory", help="memory used by pydantic and compact entries"
+    )
+    parser_memory.set_defaults(func=benchMemory)
+    parser_interning = subparsers.add_parser(
+        "interning", help="memory of loaded dictionaries with and without interning"
+    )
+    parser_interning.add_argument(
+        "--dictionaries", type=int, default=4, help="number of dictionaries loaded"
+    )
+    parser_interning.set_defaults(func=benchInterning)
+    parser_streaming = subparsers.add_parser(
+        "streaming", help="peak memory of the normal and streaming dictionary loader"
+    )
+    parser_streaming.set_defaults(func=benchStreaming)
+    parser_store = subparsers.add_parser(
+        "store", help="time to the first lookup loading a dictionary or a store"
+    )
+    parser_store.set_defaults(func=benchStore)
+    parser_schema = subparsers.add_parser(
+        "schema", help="schemas built entry by entry or merging schema fragments"
+    )
+    parser_schema.add_argument(
+        "--dictionaries",
+        type=int,
+        default=8,
+        help="number of dictionaries depending on the base dictionary",
+    )
+    parser_schema.set_defaults(func=benchSchema)
+    parser_inject = subparsers.add_parser(
+        "inject", help="injection of the partial sections in the data view"
+    )
+    parser_inject.add_argument(
+        "--partial", type=int, default=400, help="maximum number of partial sections"
+    )
+    parser_inject.set_defaults(func=benchInject)
+    args = parser.parse_args()
+    if not hasattr(args, "func"):
+        parser.print_help()
+    else:
+        args.func(args)
@@ -0,0 +1,95 @@
+"""On disk cache of the loaded dictionaries.
+Enable it with setDictionaryCache(DictionaryCache(cacheDir))."""
+from .meta_info import explodedDigest, setDictionaryCache
+import pydantic
+import hashlib, logging
+import os, os.path
+import pickle, tempfile
+import threading
+
+# increase when the pickled representation of MetaDictionary changes
+cacheFormatVersion = 5
+
+
+class DictionaryCache:
+    """Stores a compact binary (pickled) version of each loaded MetaDictionary in cacheDir.
+	Single file dictionaries are keyed by their path, mtime and size, exploded dictionaries by the digest of their content.
+	Restoring a dictionary from the cache skips json parsing and model validation."""
+
+    def __init__(self, cacheDir):
+        self.cacheDir = cacheDir
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def keyOf(self, path, exploded, variant=""):
+        """returns the key of the dictionary at path (variant distinguishes different representations of it)"""
+        realPath = os.path.realpath(os.path.abspath(path))
+        if exploded:
+            source = explodedDigest(path)
+        else:
+            st = os.stat(path)
+            source = f"{st.st_mtime_ns}:{st.st_size}"
+        keyStr = f"{cacheFormatVersion}\0{pydantic.VERSION}\0{path}\0{realPath}\0{exploded}\0{variant}\0{source}"
+        return hashlib.sha256(keyStr.encode("utf8")).hexdigest()
+
+    def pathOfKey(self, key):
+        return os.path.join(self.cacheDir, key[:2], key + ".meta_dictionary.pickle")
+
+    def get(self, key):
+        """returns the dictionary cached with key, or None"""
+        p = self.pathOfKey(key)
+        try:
+            with open(p, "rb") as fIn:
+                d = pickle.load(fIn)
+        except FileNotFoundError:
+            return None
+        except:
+            logging.exception(f"ignoring invalid cache file {p}")
+            return None
+        d.internIdentifiers()
+        return d
+
+    def put(self, key, d):
+        """stores the dictionary d with the given key"""
+        p = self.pathOfKey(key)
+        dir = os.path.dirname(p)
+        try:
+            os.makedirs(dir, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                dir=dir, prefix=key[:10], suffix=".tmp", delete=False
+            ) as outF:
+                pickle.dump(d, outF, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(outF.name, p)
+        except:
+            logging.exception(f"failed to cache dictionary {d.metadict_name} in {p}")
+
+    def load(self, path, exploded, loader, variant=""):
+        """returns the dictionary at path from the cache, or loads it with loader() and stores it in the cache"""
+        key = self.keyOf(path, exploded, variant)
+        d = self.get(key)
+        with self.lock:
+            if d is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if d is None:
+            d = loader()
+            self.put(key, d)
+        return d
+
+    def clear(self):
+        """removes all cached dictionaries"""
+        if not os.path.isdir(self.cacheDir):
+            return
+        for dir, dirs, files in os.walk(self.cacheDir):
+            for f in files:
+                if f.endswith(".meta_dictionary.pickle") or f.endswith(".tmp"):
+                    os.remove(os.path.join(dir, f))
+
+
+def enableDictionaryCache(cacheDir):
+    """Enables a DictionaryCache at cacheDir for all dictionary loads, and returns it"""
+    cache = DictionaryCache(cacheDir)
+    setDictionaryCache(cache)
+    return cache
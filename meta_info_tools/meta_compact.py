@@ -0,0 +1,238 @@
+"""Compact read-only representation of the meta info entries.
+The records have the same attributes (and write, entryId, allSetKeys,...) as the pydantic models,
+but store their values in __slots__, without per instance __dict__ and fields set."""
+from .meta_info import *
+from .meta_info import _trustedConverter, _missing
+from typing import get_type_hints
+
+
+class CompactRecord:
+    """Base class of the compact records, the values of the fields of model are stored in __slots__.
+	Records are read-only, use toModel to get a modifiable pydantic object."""
+
+    __slots__ = ()
+    model = None
+    plan = ()
+
+    def __init__(self, **values):
+        for name, converter, default in self.plan:
+            object.__setattr__(self, name, values.get(name, default))
+
+    @classmethod
+    def fromDict(cls, d):
+        """creates a record from a json like dictionary (no validation is performed)"""
+        self = object.__new__(cls)
+        for name, converter, default in cls.plan:
+            v = d.get(name, _missing)
+            if v is _missing:
+                v = default
+            elif converter is not None and v is not None:
+                v = converter(v)
+            object.__setattr__(self, name, v)
+        return self
+
+    @classmethod
+    def fromModel(cls, m):
+        """creates a record with the values of the pydantic object m"""
+        self = object.__new__(cls)
+        for name, converter, default in cls.plan:
+            v = getattr(m, name)
+            if converter is not None and v is not None:
+                v = converter(v)
+            object.__setattr__(self, name, v)
+        return self
+
+    @classmethod
+    def fromValues(cls, values):
+        self = object.__new__(cls)
+        for name, v in zip(cls.__slots__, values):
+            object.__setattr__(self, name, v)
+        return self
+
+    def dict(self):
+        """returns a dictionary with the values (nested records are converted to dictionaries)"""
+        res = {}
+        for name in self.__slots__:
+            v = getattr(self, name)
+            if isinstance(v, CompactRecord):
+                v = v.dict()
+            elif isinstance(v, list) and v and isinstance(v[0], CompactRecord):
+                v = [x.dict() for x in v]
+            res[name] = v
+        return res
+
+    def toModel(self):
+        """returns the corresponding pydantic object"""
+        return trustedConstruct(self.model, self.dict())
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{self.__class__.__name__} is read-only")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{self.__class__.__name__} is read-only")
+
+    def __eq__(self, other):
+        if type(self) is not type(other):
+            return NotImplemented
+        return all(getattr(self, n) == getattr(other, n) for n in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self):
+        # same as the pydantic representation of model
+        values = " ".join(f"{n}={getattr(self, n)!r}" for n in self.__slots__)
+        return f"<{self.model.__name__} {values}>"
+
+    def __reduce__(self):
+        return (
+            self.__class__.fromValues,
+            (tuple(getattr(self, n) for n in self.__slots__),),
+        )
+
+    @classmethod
+    def __get_validators__(cls):
+        yield cls.validate
+
+    @classmethod
+    def validate(cls, v):
+        """pydantic validator, so that records can be used in (Union) fields of models"""
+        if not isinstance(v, cls):
+            raise TypeError(f"expected {cls.__name__}, not {type(v)}")
+        return v
+
+
+compactClasses = {}
+
+
+def _compactConverter(modelClass):
+    """converter of json values and pydantic objects to the compact class of modelClass"""
+    compactClass = compactClasses[modelClass]
+
+    def convert(v):
+        if isinstance(v, CompactRecord):
+            return v
+        elif isinstance(v, BaseModel):
+            return compactClass.fromModel(v)
+        return compactClass.fromDict(v)
+
+    return convert
+
+
+def compactClassOf(name, modelClass, methods=(), base=CompactRecord, **attributes):
+    """creates the compact read-only class name (subclass of base) corresponding to the pydantic model modelClass.
+	name should be the name of the module variable holding the class (to allow pickling), methods are borrowed from modelClass (they should only read the fields)"""
+    hints = get_type_hints(modelClass)
+    plan = []
+    for fieldName, field in modelClass.__fields__.items():
+        converter = _trustedConverter(hints.get(fieldName), _compactConverter)
+        plan.append((fieldName, converter, field.default))
+    namespace = {
+        "__slots__": tuple(modelClass.__fields__),
+        "__doc__": f"Compact read-only version of {modelClass.__name__}",
+        "model": modelClass,
+        "plan": tuple(plan),
+    }
+    for m in methods:
+        namespace[m] = getattr(modelClass, m)
+    namespace.update(attributes)
+    cls = type(name, (base,), namespace)
+    compactClasses[modelClass] = cls
+    return cls
+
+
+CompactDimension = compactClassOf(
+    "CompactDimension", MetaDimension, ["write", "__str__"]
+)
+CompactEnum = compactClassOf("CompactEnum", MetaEnum, ["write"])
+CompactQueryEnum = compactClassOf("CompactQueryEnum", MetaQueryEnum, ["write"])
+CompactRange = compactClassOf("CompactRange", MetaRange, ["write"])
+CompactInject = compactClassOf("CompactInject", MetaInject, ["write"])
+CompactRequired = compactClassOf("CompactRequired", MetadictRequired, ["write"])
+
+entryMethods = [
+    "allSetKeys",
+    "entryId",
+    "write",
+    "__repr__",
+    "__str__",
+]
+
+
+class CompactEntry(CompactRecord):
+    """Base class of the compact meta_info_entry"""
+
+    __slots__ = ()
+    keys = ()
+
+    def allKeys(self):
+        return list(self.keys)
+
+
+def _entryClassOf(name, modelClass):
+    return compactClassOf(
+        name,
+        modelClass,
+        entryMethods,
+        base=CompactEntry,
+        keys=tuple(modelClass.construct({}, set()).allKeys()),
+    )
+
+
+CompactAbstract = _entryClassOf("CompactAbstract", MetaAbstract)
+CompactDimensionValue = _entryClassOf("CompactDimensionValue", MetaDimensionValue)
+CompactConstraint = _entryClassOf("CompactConstraint", MetaConstraint)
+CompactValue = _entryClassOf("CompactValue", MetaValue)
+CompactSection = _entryClassOf("CompactSection", MetaSection)
+
+compactEntryClasses = {
+    MetaType.type_value: CompactValue,
+    MetaType.type_abstract: CompactAbstract,
+    MetaType.type_section: CompactSection,
+    MetaType.type_dimension: CompactDimensionValue,
+    MetaType.type_constraint: CompactConstraint,
+}
+
+
+def compactEntryFromDict(d):
+    """returns the compact meta_info_entry corresponding to the json like dictionary d (that should be valid)"""
+    try:
+        entryClass = compactEntryClasses[MetaType(d.get("meta_type", "type-value"))]
+    except:
+        raise Exception(
+            f"Failed to instantiate meta_info_entry, invalid meta_type '{d.get('meta_type')}'"
+        )
+    d = internIdentifiers(d)
+    if isinstance(d.get("meta_chosen_key"), str):
+        d["meta_chosen_key"] = [d["meta_chosen_key"]]
+    if isinstance(d.get("meta_context_identifiers"), str):
+        d["meta_context_identifiers"] = [d["meta_context_identifiers"]]
+    return entryClass.fromDict(d)
+
+
+def compactEntry(entry):
+    """returns the compact version of the meta_info_entry entry"""
+    if isinstance(entry, CompactRecord):
+        return entry
+    return compactEntryClasses[entry.meta_type].fromModel(entry)
+
+
+def compactDictionary(metaDict):
+    """returns a copy of metaDict that uses compact entries"""
+    entries = metaDict.meta_info_entry
+    if isinstance(entries, LazyEntryList):
+        entries = [
+            compactEntryFromDict(e) if type(e) is dict else compactEntry(e)
+            for e in list.__iter__(entries)
+        ]
+    else:
+        entries = [compactEntry(e) for e in entries]
+    return metaDict.copy(
+        update={"meta_info_entry": entries, "meta_info_entries_cache": None}
+    )
+
+
+def compactMetaInfo(metaInfo):
+    """replaces all the dictionaries of metaInfo with compact ones, and returns it"""
+    for name, d in list(metaInfo.dictionaries.items()):
+        metaInfo.dictionaries[name] = compactDictionary(d)
+    return metaInfo
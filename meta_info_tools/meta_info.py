@@ -1,69 +1,184 @@
-from typing import Union, List, Optional, Dict, Set, Any
+from typing import Union, List, Optional, Dict, Set, Any, get_type_hints
 from enum import Enum
 from pydantic import BaseModel, ValidationError, validator
 from datetime import date
 import hashlib, logging
 import json, tempfile
-import re, io, stat
-import os, os.path, glob
+import re, io, stat, copy, functools
+import os, os.path, sys, time, mmap
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 jd = lambda x: json.dumps(x, sort_keys=True, ensure_ascii=True)
 jdf = lambda x, fOut: json.dump(x, fOut, sort_keys=True, ensure_ascii=True, indent=2)
 from collections import namedtuple
 
 EntryDict = namedtuple("EntryDict", ["meta_info_entry", "metadict_name"])
+DiscoveredDictionary = namedtuple("DiscoveredDictionary", ["name", "path", "exploded"])
+DirectoryListing = namedtuple(
+    "DirectoryListing", ["mtime", "found", "dictionaries", "others"]
+)
+_missing = object()
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-def replacePath(tmpPath, targetPath):
-    """If tmpPath is different from targetPath, replaces targetPath with the
- file at tmpPath, while keeping a backup .bk-<timestamp> at targetpath"""
+
+class JsonBackend:
+    """A json parser working on bytes"""
+
+    def __init__(self, name, loads):
+        self.name = name
+        self.loads = loads
+
+    def load(self, path):
+        """parses the json file at path"""
+        with open(path, "rb") as fIn:
+            return self.loads(fIn.read())
+
+
+def _orjsonLoads(data):
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError:
+        # orjson is stricter (no NaN, 64 bit integers,...), give stdlib json a chance
+        return json.loads(data)
+
+
+stdlibJsonBackend = JsonBackend("json", json.loads)
+jsonBackends = {"json": stdlibJsonBackend}
+if orjson is not None:
+    jsonBackends["orjson"] = JsonBackend("orjson", _orjsonLoads)
+jsonBackend = jsonBackends.get("orjson", stdlibJsonBackend)
+
+
+def setJsonBackend(name):
+    """Sets the json backend used to parse dictionaries and data (json or orjson)"""
+    global jsonBackend
+    if name not in jsonBackends:
+        raise Exception(
+            f"json backend {name} is not available, known backends: {sorted(jsonBackends.keys())}"
+        )
+    jsonBackend = jsonBackends[name]
+
+
+def loadJson(path):
+    """Parses the json file at path with the current json backend (orjson if installed)"""
+    return jsonBackend.load(path)
+
+
+def loadsJson(data):
+    """Parses the given json bytes (or str) with the current json backend"""
+    return jsonBackend.loads(data)
+
+
+def backupAndReplace(tmpPath, targetPath):
+    """replaces targetPath with the file at tmpPath, keeping a backup .bk-<timestamp> of the old targetPath"""
     if not os.path.exists(targetPath):
         os.replace(tmpPath, targetPath)
         return
-    m = hashlib.sha512()
-    with open(tmpPath, "rb") as f:
-        while True:
-            d = f.read(1024)
-            if not d:
-                break
-            m.update(d)
-    d1 = m.digest()
-    m = hashlib.sha512()
-    with open(targetPath, "rb") as f:
-        while True:
-            d = f.read(1024)
-            if not d:
-                break
-            m.update(d)
-    d2 = m.digest()
-    if d1 == d2:
-        os.remove(tmpPath)
-    else:
-        timestamp = date.today().isoformat()
-        t2 = targetPath + "." + timestamp + ".bk"
-        t3 = t2
-        ii = 0
-        while os.path.exists(t3):
-            ii += 1
-            t3 = f"{targetPath}.{timestamp}-{ii}.bk"
-        os.replace(targetPath, t3)
-        os.replace(tmpPath, targetPath)
-        logging.info(f"changes in {targetPath}, old version in {t3}")
+    timestamp = date.today().isoformat()
+    t2 = targetPath + "." + timestamp + ".bk"
+    t3 = t2
+    ii = 0
+    while os.path.exists(t3):
+        ii += 1
+        t3 = f"{targetPath}.{timestamp}-{ii}.bk"
+    os.replace(targetPath, t3)
+    os.replace(tmpPath, targetPath)
+    logging.info(f"changes in {targetPath}, old version in {t3}")
 
 
-def writeFile(targetPath, writer):
-    """writes to target path keeping a backup of the old version"""
+def replacePath(tmpPath, targetPath):
+    """If tmpPath is different from targetPath, replaces targetPath with the
+ file at tmpPath, while keeping a backup .bk-<timestamp> at targetpath"""
+    if os.path.exists(targetPath):
+        with open(tmpPath, "rb") as f:
+            if hasContent(targetPath, f.read()):
+                os.remove(tmpPath)
+                return
+    backupAndReplace(tmpPath, targetPath)
+
+
+# files larger than this are compared through mmap
+mmapCompareThreshold = 2 ** 20
+
+
+def hasContent(path, data):
+    """returns true if the file at path contains exactly the bytes data.
+	Compares the size first, and then the content (through mmap for large files)"""
+    try:
+        if os.stat(path).st_size != len(data):
+            return False
+    except FileNotFoundError:
+        return False
+    if not data:
+        return True
+    with open(path, "rb") as f:
+        if len(data) < mmapCompareThreshold:
+            return f.read() == data
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            step = mmapCompareThreshold
+            for i in range(0, len(data), step):
+                if mm[i : i + step] != data[i : i + step]:
+                    return False
+            return True
+
+
+class WriteStats:
+    """Counts the files written (changed) and skipped (unchanged) by writeFile"""
+
+    def __init__(self):
+        self.written = 0
+        self.skipped = 0
+        self.lock = threading.Lock()
+
+    def add(self, written):
+        with self.lock:
+            if written:
+                self.written += 1
+            else:
+                self.skipped += 1
+
+    def addCounts(self, written, skipped):
+        """adds the counts of files written and skipped elsewhere (for example in a worker process)"""
+        with self.lock:
+            self.written += written
+            self.skipped += skipped
+
+    def counts(self):
+        """returns the tuple (written, skipped)"""
+        with self.lock:
+            return (self.written, self.skipped)
+
+    def reset(self):
+        with self.lock:
+            self.written = 0
+            self.skipped = 0
+
+
+writeStats = WriteStats()
+
+
+def writeBytes(targetPath, data):
+    """writes data to targetPath if its content is different, keeping a backup of the old version.
+	Returns true if the file was written"""
+    if hasContent(targetPath, data):
+        writeStats.add(False)
+        return False
     name = os.path.basename(targetPath).split(".")[0][:10]
     dir = os.path.dirname(targetPath)
     if not dir:
         dir = "."
     if not os.path.exists(dir):
-        os.makedirs(dir)
+        os.makedirs(dir, exist_ok=True)
     with tempfile.NamedTemporaryFile(
-        mode="w", encoding="utf8", suffix=".tmp", prefix=name, dir=dir, delete=False
+        suffix=".tmp", prefix=name, dir=dir, delete=False
     ) as outF:
         try:
-            writer(outF)
+            outF.write(data)
             outF.flush()
             os.chmod(
                 outF.name, stat.S_IWUSR | stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
@@ -72,7 +187,48 @@ def writeFile(targetPath, writer):
             raise Exception(
                 f"Failure trying to write {targetPath}, leaving failed attempt in {outF.name}"
             )
-        replacePath(outF.name, targetPath)
+    backupAndReplace(outF.name, targetPath)
+    writeStats.add(True)
+    return True
+
+
+# default number of threads used to write files concurrently
+ioWorkers = 4
+
+
+def writeFiles(basePath, files, maxWorkers=ioWorkers):
+    """writes the already rendered files {relativePath: bytes} below basePath (each one only if it changed, see writeBytes).
+	The files are written concurrently by a pool of at most maxWorkers threads, returns the set of the relative paths actually written"""
+    for dir in set(os.path.dirname(f) for f in files):
+        os.makedirs(os.path.join(basePath, dir), exist_ok=True)
+
+    def write(item):
+        return writeBytes(os.path.join(basePath, item[0]), item[1])
+
+    items = list(files.items())
+    if maxWorkers and maxWorkers > 1 and len(items) > 1:
+        with ThreadPoolExecutor(max_workers=min(maxWorkers, len(items))) as pool:
+            changed = list(pool.map(write, items))
+    else:
+        changed = [write(item) for item in items]
+    return set(f for (f, data), c in zip(items, changed) if c)
+
+
+def renderText(writer):
+    """returns the utf8 encoded text written by writer to the file like object it gets"""
+    outF = io.StringIO()
+    writer(outF)
+    return outF.getvalue().encode("utf8")
+
+
+def writeFile(targetPath, writer):
+    """writes to target path keeping a backup of the old version.
+	The content is rendered in memory, and the file is written only if it changed. Returns true if the file was written"""
+    try:
+        data = renderText(writer)
+    except:
+        raise Exception(f"Failure trying to write {targetPath}")
+    return writeBytes(targetPath, data)
 
 
 def safeRemove(toRm):
@@ -93,34 +249,280 @@ def safeRemove(toRm):
             os.replace(os.path.join(dir, f), t3)
 
 
-def splitStr(string, maxLen=80):
-    """If the string has newlines or is longer than maxLen ({maxLen}) characters splits it.
-	if maxLen is -1 it does not split. It always returns an array of strings""".format(
-        maxLen=maxLen
+dictionaryCache = None
+
+
+def explodedDigest(path):
+    """Returns the sha256 hex digest of the content of the exploded dictionary at path (base info and entries)"""
+    m = hashlib.sha256()
+    files = ["_.meta_dictionary.json"] + sorted(
+        f for f, _ in scanFiles(path, ".meta_info_entry.json")
     )
+    for f in files:
+        with open(os.path.join(path, f), "rb") as fIn:
+            data = fIn.read()
+        m.update(f"{f}\0{len(data)}\0".encode("utf8"))
+        m.update(data)
+    return m.hexdigest()
+
+
+def fileDigest(path):
+    """Returns the sha256 hex digest of the content of the file at path (None if it does not exist)"""
+    try:
+        with open(path, "rb") as fIn:
+            return hashlib.sha256(fIn.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def setDictionaryCache(cache):
+    """Sets the cache used when loading dictionaries with MetaDictionary.loadAtPath (and thus fileLoader).
+	cache should be a meta_cache.DictionaryCache, None disables the cache"""
+    global dictionaryCache
+    dictionaryCache = cache
+
+
+def cachedLoad(path, exploded, loader, variant=""):
+    """Returns the dictionary at path using the dictionary cache if set, and calling loader() to load it otherwise.
+	variant distinguishes different in memory representations of the same dictionary"""
+    cache = dictionaryCache
+    if cache is None:
+        return loader()
+    return cache.load(path, exploded, loader, variant)
+
+
+def scanFiles(basePath, suffix, relDir=""):
+    """Yields (relativePath, dirEntry) for the files below basePath whose name ends with suffix.
+	Equivalent to glob("**/*" + suffix, recursive=True) run in basePath (hidden files and directories are skipped) but uses scandir with paths relative to basePath, so it does not change the working directory (and is thread safe). The DirEntry caches the stat information of the file."""
+    with os.scandir(os.path.join(basePath, relDir) if relDir else basePath) as it:
+        dirEntries = list(it)
+    subDirs = []
+    for entry in dirEntries:
+        if entry.name.startswith("."):
+            continue
+        if entry.is_dir():
+            subDirs.append(entry.name)
+        elif entry.name.endswith(suffix) and entry.is_file():
+            yield (os.path.join(relDir, entry.name), entry)
+    for subDir in subDirs:
+        yield from scanFiles(basePath, suffix, os.path.join(relDir, subDir))
+
+
+_nonWhitespaceRe = re.compile(r"[ \t\n\r]*")
+_jsonDelimiters = frozenset(" \t\n\r,:]}")
+
+
+class JsonStream:
+    """Incremental reader of a json document from a text file, it decodes one value at a time using the stdlib json decoder, reading only the data needed"""
+
+    def __init__(self, f, chunkSize=2 ** 20):
+        self.f = f
+        self.chunkSize = chunkSize
+        self.readSize = chunkSize
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def more(self):
+        """reads more data, returns False at the end of the file"""
+        if self.eof:
+            return False
+        chunk = self.f.read(self.readSize)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """returns the next non whitespace character without consuming it ("" at the end of the file)"""
+        while True:
+            self.pos = _nonWhitespaceRe.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.more():
+                return ""
+
+    def expect(self, chars):
+        """consumes and returns the next non whitespace character, that has to be one of chars"""
+        c = self.peek()
+        if not c or c not in chars:
+            raise ValueError(f"expected one of {chars!r}, not {c!r}")
+        self.pos += 1
+        return c
+
+    def value(self):
+        """decodes and returns the next json value"""
+        self.peek()
+        while True:
+            try:
+                v, end = self.decoder.raw_decode(self.buf, self.pos)
+                # a number might continue in the data not yet read
+                if self.eof or (
+                    end < len(self.buf) and self.buf[end] in _jsonDelimiters
+                ):
+                    self.pos = end
+                    self.readSize = self.chunkSize
+                    return v
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            if self.pos == 0:
+                self.readSize *= 2  # a single value larger than the buffer
+            self.more()
+
+
+def streamJsonObject(f, arrayKey, onItem, chunkSize=2 ** 20):
+    """Reads the json object in the text file f, calling onItem for each element of the array stored at arrayKey as soon as it is read.
+	Returns the object without arrayKey, so at no point the whole array is in memory"""
+    s = JsonStream(f, chunkSize)
+    res = {}
+    s.expect("{")
+    if s.peek() == "}":
+        s.pos += 1
+    else:
+        while True:
+            key = s.value()
+            s.expect(":")
+            if key == arrayKey:
+                s.expect("[")
+                if s.peek() == "]":
+                    s.pos += 1
+                else:
+                    while True:
+                        onItem(s.value())
+                        if s.expect(",]") == "]":
+                            break
+            else:
+                res[key] = s.value()
+            if s.expect(",}") == "}":
+                break
+    if s.peek():
+        raise ValueError("Extra data after the json object")
+    return res
+
+
+# single file dictionaries at least this large (in bytes) are loaded with streamJsonObject, None never streams
+streamingThreshold = None
+
+
+def setStreamingThreshold(threshold):
+    """Sets the size (in bytes) from which single file dictionaries are loaded with streamJsonObject (None disables streaming).
+	Streaming lowers the peak memory but bypasses the json backend, and is slower"""
+    global streamingThreshold
+    streamingThreshold = threshold
+
+
+class DictionaryDiscovery:
+    """Index of the dictionaries (single file or exploded) found in some directories.
+	Each directory is scanned once, and scanned again only if its mtime changes."""
+
+    # listings of directories modified less than this (in ns) before the scan are not trusted (mtime granularity)
+    racyInterval = 2 * 10 ** 9
+
+    def __init__(self):
+        self.listings = {}
+        self.lock = threading.Lock()
+        self.scans = 0
+
+    def scan(self, dirPath, mtime):
+        """returns the DirectoryListing of dirPath"""
+        scanStart = time.time_ns()
+        found = []
+        dictionaries = {}
+        others = []
+        with os.scandir(dirPath) as it:
+            dirEntries = sorted(it, key=lambda x: x.name)
+        for entry in dirEntries:
+            if entry.name.endswith(".meta_dictionary.json") and entry.is_file():
+                name = entry.name[: -len(".meta_dictionary.json")]
+                exploded = False
+            elif entry.name.endswith(".meta_dictionary") and entry.is_dir():
+                name = entry.name[: -len(".meta_dictionary")]
+                exploded = True
+            else:
+                others.append(entry.name)
+                continue
+            d = DiscoveredDictionary(name, os.path.join(dirPath, entry.name), exploded)
+            found.append(d)
+            if name not in dictionaries or dictionaries[name].exploded:
+                # single file dictionaries are preferred
+                dictionaries[name] = d
+        if scanStart - mtime < self.racyInterval:
+            mtime = None  # might still change without changing mtime
+        return DirectoryListing(mtime, found, dictionaries, others)
+
+    def listing(self, dirPath):
+        """returns the DirectoryListing of dirPath (empty if it does not exist)"""
+        try:
+            mtime = os.stat(dirPath).st_mtime_ns
+        except OSError:
+            return DirectoryListing(None, [], {}, [])
+        with self.lock:
+            listing = self.listings.get(dirPath)
+        if listing is None or listing.mtime != mtime:
+            listing = self.scan(dirPath, mtime)
+            with self.lock:
+                self.scans += 1
+                self.listings[dirPath] = listing
+        return listing
+
+    def dictionariesAt(self, dirPath):
+        """returns the DiscoveredDictionary found in dirPath (sorted by name, one per name)"""
+        return [d for n, d in sorted(self.listing(dirPath).dictionaries.items())]
+
+    def find(self, name, paths):
+        """returns the DiscoveredDictionary with the given name in the first of paths that contains it, or None"""
+        for p in paths:
+            d = self.listing(p).dictionaries.get(name)
+            if d is not None:
+                return d
+        return None
+
+    def clear(self):
+        with self.lock:
+            self.listings.clear()
+
+
+dictionaryDiscovery = DictionaryDiscovery()
+
+
+_breakRe = re.compile(r"[\s\[\]\(\)\{\}.,<>;:!|\\/=+\-*&^%$#@?~]")
+# number of (string, maxLen) whose split is cached by splitStr
+splitCacheSize = 2 ** 14
+
+
+@functools.lru_cache(maxsize=splitCacheSize)
+def _splitLines(string, maxLen):
     toDo = string.splitlines(keepends=True)[::-1]
     if len(toDo) == 1 and len(string) < maxLen or maxLen == -1:
-        return [string]
+        return (string,)
     res = []
-    breakRe = re.compile(r"[\s\[\]\(\)\{\}.,<>;:!|\\/=+\-*&^%$#@?~]")
+    minBreak = maxLen // 2
     while toDo:
         lNow = toDo.pop()
         if len(lNow) <= maxLen:
             res.append(lNow)
         else:
-            rNow = lNow[maxLen - 1 :: -1]
-            done = False
-            for m in breakRe.finditer(rNow):
+            # break after the last break character in the second half of the first maxLen characters
+            m = _breakRe.search(lNow[minBreak:maxLen][::-1])
+            if m:
                 i = maxLen - m.start()
-                if i > maxLen / 2:
-                    res.append(lNow[:i])
-                    toDo.append(lNow[i:])
-                    done = True
-                break
-            if not done:
-                res.append(lNow[:maxLen])
-                toDo.append(lNow[maxLen:])
-    return res
+            else:
+                i = maxLen
+            res.append(lNow[:i])
+            toDo.append(lNow[i:])
+    return tuple(res)
+
+
+def splitStr(string, maxLen=80):
+    """If the string has newlines or is longer than maxLen ({maxLen}) characters splits it.
+	if maxLen is -1 it does not split. It always returns an array of strings""".format(
+        maxLen=maxLen
+    )
+    return list(_splitLines(string, maxLen))
 
 
 def maybeJoinStr(value):
@@ -131,6 +533,13 @@ def maybeJoinStr(value):
     return "".join(value)
 
 
+def standardStr(value, compact=False):
+    """returns the standard form of a (possibly splitted) description: a single string if compact, otherwise a list of lines"""
+    if compact:
+        return maybeJoinStr(value)
+    return splitStr(maybeJoinStr(value))
+
+
 def writeStrMaybeList(outF, value, indent=0, maxLen=115):
     """Writes out a string, or a list of strings taking care of escaping it for json.
 	Lists of strings are indented with a string per line."""
@@ -151,6 +560,122 @@ def writeStrMaybeList(outF, value, indent=0, maxLen=115):
         outF.write(" ]")
 
 
+def _trustedConverter(tp, modelConverter=None):
+    """returns a function converting a json value to the given type annotation without validation (or None if no conversion is needed).
+	If given, modelConverter(modelClass) returns the converter used for the nested models"""
+    origin = getattr(tp, "__origin__", None)
+    if origin is Union:
+        args = [a for a in tp.__args__ if a is not type(None)]
+        if len(args) == 1:
+            return _trustedConverter(args[0], modelConverter)
+        return None  # like Union[str, List[str]], kept as it is
+    if origin in (list, List):
+        c = _trustedConverter(tp.__args__[0], modelConverter)
+        if c:
+            return lambda v: [c(x) for x in v]
+        return None
+    if tp is float:
+        return float  # json integers would otherwise be written back without .0
+    if isinstance(tp, type) and issubclass(tp, Enum):
+        return lambda v: v if isinstance(v, tp) else tp(v)
+    if isinstance(tp, type) and issubclass(tp, BaseModel):
+        if modelConverter:
+            return modelConverter(tp)
+        return lambda v: v if isinstance(v, tp) else trustedConstruct(tp, v)
+    return None
+
+
+_trustedPlans = {}
+
+
+def trustedConstruct(cls, d):
+    """Creates an instance of the pydantic model cls from the json like dictionary d skipping validation.
+	Enums and nested models are converted, missing values are set to their default, but no check is performed, so d should be trusted"""
+    plan = _trustedPlans.get(cls)
+    if plan is None:
+        hints = get_type_hints(cls)
+        plan = []
+        for name, field in cls.__fields__.items():
+            default = field.default
+            copyDefault = isinstance(default, (list, dict, set))
+            plan.append(
+                (name, _trustedConverter(hints.get(name)), default, copyDefault)
+            )
+        _trustedPlans[cls] = plan
+    values = {}
+    fieldsSet = set()
+    for name, converter, default, copyDefault in plan:
+        v = d.get(name, _missing)
+        if v is _missing:
+            values[name] = copy.deepcopy(default) if copyDefault else default
+        else:
+            fieldsSet.add(name)
+            if converter is not None and v is not None:
+                v = converter(v)
+            values[name] = v
+    return cls.construct(values, fieldsSet)
+
+
+# identifiers repeated in many entries, interned when loading if interning is enabled (see setInterning)
+internedKeys = frozenset(
+    [
+        "meta_name",
+        "meta_parent_section",
+        "meta_referenced_section",
+        "meta_units",
+        "meta_abstract_types",
+        "meta_dimension_symbolic",
+        "meta_range_units",
+        "meta_contains",
+        "meta_constraint_expected_meta_info",
+        "meta_inject_if_abstract_type",
+    ]
+)
+interning = False
+
+
+def setInterning(enabled):
+    """Enables or disables the interning of the identifiers of the loaded entries (disabled by default, the memory saved is small compared to the descriptions)"""
+    global interning
+    interning = enabled
+
+
+def internValue(v):
+    """interns a string (or the strings of a list)"""
+    if type(v) is str:
+        return sys.intern(v)
+    elif type(v) is list:
+        return [sys.intern(x) if type(x) is str else x for x in v]
+    return v
+
+
+def internIdentifiers(d):
+    """returns a copy of the json like entry d with the identifiers (internedKeys) interned, also in nested dictionaries"""
+    if not interning:
+        return dict(d)
+    dd = {}
+    for k, v in d.items():
+        if k in internedKeys:
+            v = internValue(v)
+        elif type(v) is list and v and type(v[0]) is dict:
+            v = [internIdentifiers(x) for x in v]
+        dd[k] = v
+    return dd
+
+
+def internModel(m):
+    """interns in place the identifiers of the (pydantic) model m and the nested models"""
+    if not interning:
+        return
+    values = m.__dict__
+    for k, v in values.items():
+        if k in internedKeys:
+            values[k] = internValue(v)
+        elif type(v) is list and v and isinstance(v[0], BaseModel):
+            for x in v:
+                internModel(x)
+
+
 class MetaType(Enum):
     """the various valid values of meta type"""
 
@@ -171,6 +696,11 @@ class EntryId(BaseModel):
         return f"{self.meta_type.value}:{self.qualifier}{self.meta_name}"
 
 
+def textDigest(data):
+    """returns the digest used to compare the content of entries and files"""
+    return hashlib.sha256(data).hexdigest()
+
+
 class MetaInfoBase(BaseModel):
     """Base values for all meta infos"""
 
@@ -203,43 +733,20 @@ class MetaInfoBase(BaseModel):
             meta_type=self.meta_type, qualifier=qualifier, meta_name=self.meta_name
         )
 
+    def digest(self):
+        """returns the digest of the canonical serialization of the entry.
+		It is always recomputed, so that in place changes of nested values are detected"""
+        return textDigest(renderText(self.write))
+
     def standardize(self, compact=False):
         """Standardizes the values stored (mainly the description formatting)"""
-        if compact:
-            self.meta_description = maybeJoinStr(self.meta_description)
-        else:
-            self.meta_description = splitStr(maybeJoinStr(self.meta_description))
-
-    def writeInternal(self, outF, indent):
-        pass
+        description = standardStr(self.meta_description, compact)
+        if description != self.meta_description:
+            self.meta_description = description
 
     def write(self, outF, indent=0, writeExtra=None):
-        ii = (indent + 2) * " "
-        outF.write(
-            """{{
-{ii}"meta_name": {meta_name},
-{ii}"meta_type": {meta_type},
-{ii}"meta_description": """.format(
-                ii=ii, meta_name=jd(self.meta_name), meta_type=jd(self.meta_type.value)
-            )
-        )
-        writeStrMaybeList(outF, self.meta_description, indent=indent + 2)
-        if self.meta_deprecated:
-            outF.write(
-                ',\n{ii}"meta_deprecated": {meta_deprecated}'.format(
-                    ii=ii, meta_deprecated=jd(self.meta_deprecated)
-                )
-            )
-        if self.meta_abstract_types:
-            outF.write(
-                ',\n{ii}"meta_abstract_types": {value}'.format(
-                    ii=ii, value=jd(self.meta_abstract_types)
-                )
-            )
-        self.writeInternal(outF, indent)
-        if writeExtra:
-            writeExtra(outF, indent=indent + 2)
-        outF.write("\n" + (indent * " ") + "}")
+        """reproducible pretty print to json (writeExtra(outF, indent) can add extra fields)"""
+        outF.write(entryText(self, indent, writeExtra))
 
     def __repr__(self):
         outF = io.StringIO()
@@ -253,32 +760,37 @@ class MetaInfoBase(BaseModel):
         return outF.getvalue()
 
     @staticmethod
-    def fromDict(d):
-        """initializes a meta info value of the correct subclass from a dictionary"""
+    def fromDict(d, trusted=False):
+        """initializes a meta info value of the correct subclass from a dictionary.
+		If trusted is true d is assumed to be valid (our own cache, a canonical file we just wrote,...) and no validation is performed"""
         try:
             mtype = MetaType(d.get("meta_type", "type-value"))
         except:
             raise Exception(
                 f"Failed to instantiate meta_info_entry, invalid meta_type '{d.get(meta_type)}''"
             )
-        dd = {k: v for k, v in d.items()}
+        dd = internIdentifiers(d)
         if isinstance(dd.get("meta_chosen_key"), str):
             dd["meta_chosen_key"] = [dd["meta_chosen_key"]]
         if isinstance(dd.get("meta_context_identifiers"), str):
             dd["meta_context_identifiers"] = [dd["meta_context_identifiers"]]
         try:
             if mtype == MetaType.type_value:
-                el = MetaValue(**dd)
+                entryClass = MetaValue
             elif mtype == MetaType.type_abstract:
-                el = MetaAbstract(**dd)
+                entryClass = MetaAbstract
             elif mtype == MetaType.type_section:
-                el = MetaSection(**dd)
+                entryClass = MetaSection
             elif mtype == MetaType.type_dimension:
-                el = MetaDimensionValue(**dd)
+                entryClass = MetaDimensionValue
             elif mtype == MetaType.type_constraint:
-                el = MetaConstraint(**dd)
+                entryClass = MetaConstraint
             else:
                 raise Exception(f"unexpected type {mtype} in {d}")
+            if trusted:
+                el = trustedConstruct(entryClass, dd)
+            else:
+                el = entryClass(**dd)
         except:
             raise Exception(
                 f"Failed to instantiate meta_info_entry of type {mtype} from {dd}"
@@ -294,25 +806,15 @@ class MetaEnum(BaseModel):
 
     def standardize(self, compact=False):
         """Standardizes the values stored (mainly the description formatting)"""
-        if compact:
-            self.meta_enum_description = maybeJoinStr(self.meta_enum_description)
-        else:
-            self.meta_enum_description = splitStr(
-                maybeJoinStr(self.meta_enum_description)
-            )
+        description = standardStr(self.meta_enum_description, compact)
+        if description != self.meta_enum_description:
+            self.meta_enum_description = description
 
     def write(self, outF, indent=0):
         """Reproducible pretty print of meta enum to json"""
-        ii = (indent + 2) * " "
-        outF.write(
-            """{{
-{ii}"meta_enum_value": {value},
-{ii}"meta_enum_description": """.format(
-                ii=ii, value=jd(self.meta_enum_value)
-            )
-        )
-        writeStrMaybeList(outF, self.meta_enum_description, indent=indent + 2)
-        outF.write("\n" + (indent * " ") + "}")
+        out = []
+        appendEnum(out, self, indent)
+        outF.write("".join(out))
 
 
 class MetaQueryEnum(BaseModel):
@@ -325,26 +827,9 @@ class MetaQueryEnum(BaseModel):
 
     def write(self, outF, indent=0):
         """Reproducible pretty print of meta query to json"""
-        ii = (indent + 2) * " "
-        outF.write(
-            """{{
-{ii}"meta_query_expansion": {meta_query_expansion}""".format(
-                ii=ii, meta_query_expansion=jd(self.meta_query_expansion)
-            )
-        )
-        if self.meta_query_values:
-            outF.write(
-                ',\n{ii}"meta_query_values": {meta_query_values}'.format(
-                    ii=ii, meta_query_values=jd(self.meta_query_values)
-                )
-            )
-        if self.meta_query_regexp:
-            outF.write(
-                ',\n{ii}"meta_query_regexp": {value}'.format(
-                    ii=ii, value=jd(self.meta_query_regexp)
-                )
-            )
-        outF.write("\n" + (indent * " ") + "}")
+        out = []
+        appendQueryEnum(out, self, indent)
+        outF.write("".join(out))
 
 
 class MetaRangeKind(Enum):
@@ -366,32 +851,9 @@ class MetaRange(BaseModel):
 
     def write(self, outF, indent=0):
         """Reproducible pretty print of meta range to json"""
-        ii = (indent + 2) * " "
-        outF.write(
-            """{{
-{ii}"meta_range_kind": {value}""".format(
-                ii=ii, value=jd(self.meta_range_kind.value)
-            )
-        )
-        if self.meta_range_minimum is not None:
-            outF.write(
-                ',\n{ii}"meta_range_minimum": {value}'.format(
-                    ii=ii, value=jd(self.meta_range_minimum)
-                )
-            )
-        if self.meta_range_maximum is not None:
-            outF.write(
-                ',\n{ii}"meta_range_maximum": {value}'.format(
-                    ii=ii, value=jd(self.meta_range_maximum)
-                )
-            )
-        if self.meta_range_units:
-            outF.write(
-                ',\n{ii}"meta_range_units": {value}'.format(
-                    ii=ii, value=jd(self.meta_range_units)
-                )
-            )
-        outF.write("\n" + (indent * " ") + "}")
+        out = []
+        appendRange(out, self, indent)
+        outF.write("".join(out))
 
 
 class MetaDataType(Enum):
@@ -434,24 +896,9 @@ class MetaDimension(BaseModel):
 
     def write(self, outF, indent=0):
         """Reproducible pretty print of meta dimension to json"""
-        ii = (indent + 2) * " "
-        outF.write("{")
-        comma = ""
-        if self.meta_dimension_fixed is not None:
-            outF.write(
-                '{comma}\n{ii}"meta_dimension_fixed": {value}'.format(
-                    ii=ii, comma=comma, value=jd(self.meta_dimension_fixed)
-                )
-            )
-            comma = ","
-        if self.meta_dimension_symbolic:
-            outF.write(
-                '{comma}\n{ii}"meta_dimension_symbolic": {value}'.format(
-                    ii=ii, comma=comma, value=jd(self.meta_dimension_symbolic)
-                )
-            )
-            comma = ","
-        outF.write("\n" + (indent * " ") + "}")
+        out = []
+        appendDimension(out, self, indent)
+        outF.write("".join(out))
 
     def __str__(self):
         if self.meta_dimension_symbolic:
@@ -478,20 +925,6 @@ class MetaDimensionValue(MetaInfoBase):
                 f"meta_type must be type-dimension for MetaDimensionValue"
             )
 
-    def writeInternal(self, outF, indent):
-        ii = (indent + 2) * " "
-        outF.write(
-            ',\n{ii}"meta_parent_section": {value}'.format(
-                ii=ii, value=jd(self.meta_parent_section)
-            )
-        )
-        if self.meta_data_type:
-            outF.write(
-                ',\n{ii}"meta_data_type": {value}'.format(
-                    ii=ii, value=jd(self.meta_data_type.value)
-                )
-            )
-
 
 class MetaConstraint(MetaInfoBase):
     "represents extra constraints on the meta_parent_section"
@@ -515,32 +948,6 @@ class MetaConstraint(MetaInfoBase):
                 f"meta_type must be type-constraint for MetaConstraint"
             )
 
-    def writeInternal(self, outF, indent):
-        ii = (indent + 2) * " "
-        outF.write(
-            ',\n{ii}"meta_parent_section": {value}'.format(
-                ii=ii, value=jd(self.meta_parent_section)
-            )
-        )
-        if self.meta_constraint_select_query:
-            outF.write(
-                ',\n{ii}"meta_constraint_select_query": {value}'.format(
-                    ii=ii, value=jd(self.meta_constraint_select_query)
-                )
-            )
-        if self.meta_constraint_required_query:
-            outF.write(
-                ',\n{ii}"meta_constraint_required_query": {value}'.format(
-                    ii=ii, value=jd(self.meta_constraint_required_query)
-                )
-            )
-        if self.meta_constraint_expected_meta_info:
-            outF.write(
-                ',\n{ii}"meta_constraint_expected_meta_info": {value}'.format(
-                    ii=ii, value=jd(self.meta_constraint_expected_meta_info)
-                )
-            )
-
 
 class MetaValue(MetaInfoBase):
     meta_type = MetaType.type_value
@@ -583,112 +990,15 @@ class MetaValue(MetaInfoBase):
             for e in self.meta_enum:
                 e.standardize(compact=compact)
 
-    def writeInternal(self, outF, indent):
-        ii = (indent + 2) * " "
-        outF.write(
-            ',\n{ii}"meta_parent_section": {value}'.format(
-                ii=ii, value=jd(self.meta_parent_section)
-            )
-        )
-        if self.meta_data_type:
-            outF.write(
-                ',\n{ii}"meta_data_type": {value}'.format(
-                    ii=ii, value=jd(self.meta_data_type.value)
-                )
-            )
-        outF.write(
-            ',\n{ii}"meta_repeats": {value}'.format(ii=ii, value=jd(self.meta_repeats))
-        )
-        outF.write(
-            ',\n{ii}"meta_required": {value}'.format(
-                ii=ii, value=jd(self.meta_required)
-            )
-        )
-        if self.meta_referenced_section:
-            outF.write(
-                ',\n{ii}"meta_referenced_section": {value}'.format(
-                    ii=ii, value=jd(self.meta_referenced_section)
-                )
-            )
-        outF.write(f',\n{ii}"meta_dimension": [ ')
-        first = True
-        for dim in self.meta_dimension:
-            if first:
-                first = False
-            else:
-                outF.write(", ")
-            dim.write(outF, indent + 2)
-        outF.write(" ]")
-        if self.meta_default_value is not None:
-            outF.write(
-                ',\n{ii}"meta_default_value": {value}'.format(
-                    ii=ii, value=jd(self.meta_default_value)
-                )
-            )
-        if self.meta_example is not None:
-            outF.write(
-                ',\n{ii}"meta_example": {value}'.format(
-                    ii=ii, value=jd(self.meta_example)
-                )
-            )
-        first = True
-        if self.meta_enum is not None:
-            outF.write(',\n{ii}"meta_enum": [ '.format(ii=ii))
-            for e in self.meta_enum:
-                if first:
-                    first = False
-                else:
-                    outF.write(", ")
-                e.write(outF, indent=indent + 4)
-            outF.write(" ]")
-        first = True
-        if self.meta_query_enum is not None:
-            outF.write(',\n{ii}"meta_query_enum": [ '.format(ii=ii))
-            for el in self.meta_query_enum:
-                if first:
-                    first = False
-                else:
-                    outF.write(", ")
-                el.write(outF, indent=indent + 4)
-            outF.write(" ]")
-        first = True
-        if self.meta_range_expected is not None:
-            outF.write(',\n{ii}"meta_range_expected": [ '.format(ii=ii))
-            for el in self.meta_range_expected:
-                if first:
-                    first = False
-                else:
-                    outF.write(", ")
-                el.write(outF, indent=indent + 4)
-            outF.write(" ]")
-        if self.meta_units:
-            outF.write(
-                ',\n{ii}"meta_units": {value}'.format(ii=ii, value=jd(self.meta_units))
-            )
-
 
 class MetaInject(BaseModel):
     meta_inject_if_abstract_type: Optional[List[str]]
     meta_inject_if_section_regexp: Optional[str]
 
     def write(self, outF, indent=0):
-        ii = (indent + 2) * " "
-        outF.write("{")
-        comma = ""
-        if self.meta_inject_if_abstract_type:
-            outF.write(
-                '{comma}\n{ii}"meta_inject_if_abstract_type": {value}',
-                format(ii=ii, comma=comma, value=jd(self.meta_inject_if_abstract_type)),
-            )
-            comma = ","
-        if self.meta_inject_if_section_regexp:
-            outF.write(
-                '{comma}\n{ii}"meta_inject_if_section_regexp": {value}'.format(
-                    ii=ii, comma=comma, value=jd(self.meta_inject_if_section_regexp)
-                )
-            )
-            comma = ","
-        outF.write(f"\n{ii}}}")
+        out = []
+        appendInject(out, self, indent)
+        outF.write("".join(out))
 
 
 class MetaSection(MetaInfoBase):
@@ -719,48 +1029,6 @@ class MetaSection(MetaInfoBase):
         if v != MetaType.type_section:
             raise ValidationError(f"meta_type must be type-section for MetaSection")
 
-    def writeInternal(self, outF, indent):
-        ii = (indent + 2) * " "
-        outF.write(
-            ',\n{ii}"meta_parent_section": {value}'.format(
-                ii=ii, value=jd(self.meta_parent_section)
-            )
-        )
-        outF.write(
-            ',\n{ii}"meta_repeats": {value}'.format(ii=ii, value=jd(self.meta_repeats))
-        )
-        outF.write(
-            ',\n{ii}"meta_required": {value}'.format(
-                ii=ii, value=jd(self.meta_required)
-            )
-        )
-        if self.meta_chosen_key:
-            outF.write(
-                ',\n{ii}"meta_chosen_key": {value}'.format(
-                    ii=ii, value=jd(self.meta_chosen_key)
-                )
-            )
-        if self.meta_context_identifier:
-            outF.write(
-                ',\n{ii}"meta_context_identifier": {value}'.format(
-                    ii=ii, value=jd(self.meta_context_identifier)
-                )
-            )
-        if self.meta_contains:
-            outF.write(f',\n{ii}"meta_contains": {jd(self.meta_contains)}')
-        if self.meta_inject:
-            outF.write(f',\n{ii}"meta_inject": [')
-            comma = ""
-            for i in self.meta_inject:
-                if comma:
-                    outF.write(comma)
-                else:
-                    comma = ", "
-                i.write(outF, indent=indent + 2)
-            outF.write(" ]")
-        if self.meta_example:
-            outF.write(f',\n{ii}"meta_example": {jd(self.meta_example)}')
-
 
 class MetaAbstract(MetaInfoBase):
     meta_type = MetaType.type_abstract
@@ -784,22 +1052,453 @@ class MetadictRequired(BaseModel):
 
     def write(self, outF, indent=0):
         """reproducible pretty print to json"""
-        ii = (indent + 2) * " "
-        outF.write(
-            '{{\n{ii}"metadict_required_name": {value}'.format(
-                ii=ii, value=jd(self.metadict_required_name)
-            )
-        )
-        if self.metadict_required_version is not None:
-            outF.write(
-                ',\n{ii}"metadict_required_version": {value}'.format(
-                    ii=ii, value=jd(self.metadict_required_version)
-                )
+        out = []
+        appendRequired(out, self, indent)
+        outF.write("".join(out))
+
+
+def _versionedMethod(name):
+    method = getattr(list, name)
+
+    def changeAndCall(self, *args, **kwargs):
+        self.version += 1
+        return method(self, *args, **kwargs)
+
+    changeAndCall.__name__ = name
+    return changeAndCall
+
+
+class EntryList(list):
+    """A list of meta_info_entry that counts its changes in version, so that the indexes built on it can detect when they are stale.
+	Changes done to the entries themselves (not to the list) are not detected."""
+
+    mutatingMethods = [
+        "__setitem__",
+        "__delitem__",
+        "__iadd__",
+        "__imul__",
+        "append",
+        "extend",
+        "insert",
+        "remove",
+        "pop",
+        "clear",
+        "sort",
+        "reverse",
+    ]
+    version = 0
+
+    for _name in mutatingMethods:
+        locals()[_name] = _versionedMethod(_name)
+    del _name
+
+    def indexOf(self, entry):
+        """returns the index of the given entry object (compared by identity)"""
+        for i in range(len(self)):
+            if list.__getitem__(self, i) is entry:
+                return i
+        raise ValueError(f"entry {entry.meta_name} not in list")
+
+
+def _materializingMethod(name):
+    method = getattr(EntryList, name)
+
+    def materializeAndCall(self, *args, **kwargs):
+        self.materialize()
+        return method(self, *args, **kwargs)
+
+    materializeAndCall.__name__ = name
+    return materializeAndCall
+
+
+class LazyEntryList(EntryList):
+    """A list of meta_info_entry that keeps the raw (json) dictionaries, and builds each entry object only the first time it is accessed.
+	Lookups by name (positionsOf) do not build the entries, everything else acts like a normal list (and builds the entries it needs)."""
+
+    def __init__(self, rawEntries=(), trusted=False):
+        super().__init__(rawEntries)
+        self.trusted = trusted
+        self.pending = sum(1 for e in list.__iter__(self) if type(e) is dict)
+        self.positions = None
+        self.positionsVersion = -1
+
+    def entryAt(self, i):
+        """returns the entry at index i, building it if needed"""
+        e = list.__getitem__(self, i)
+        if type(e) is dict:
+            e = MetaInfoBase.fromDict(e, trusted=self.trusted)
+            list.__setitem__(self, i, e)
+            self.pending -= 1
+        return e
+
+    def nameAt(self, i):
+        """returns the meta_name of the entry at index i (without building it)"""
+        e = list.__getitem__(self, i)
+        if type(e) is dict:
+            return e.get("meta_name")
+        return e.meta_name
+
+    def keyAt(self, i):
+        """returns (meta_name, meta_type, meta_parent_section) of the entry at index i (without building it)"""
+        e = list.__getitem__(self, i)
+        if type(e) is dict:
+            return (
+                e.get("meta_name"),
+                MetaType(e.get("meta_type", "type-value")),
+                e.get("meta_parent_section"),
             )
-        outF.write("\n" + (indent * " ") + "}")
+        return (e.meta_name, e.meta_type, getattr(e, "meta_parent_section", None))
+
+    def positionsOf(self, metaName):
+        """returns the indexes of the entries with the given meta_name"""
+        if self.positions is None or self.positionsVersion != self.version:
+            positions = {}
+            for i in range(len(self)):
+                positions.setdefault(self.nameAt(i), []).append(i)
+            self.positions = positions
+            self.positionsVersion = self.version
+        return self.positions.get(metaName, [])
+
+    def materialize(self):
+        """builds all entries"""
+        if self.pending:
+            for i in range(len(self)):
+                self.entryAt(i)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.entryAt(j) for j in range(*i.indices(len(self)))]
+        return self.entryAt(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.entryAt(i)
+
+    def __reversed__(self):
+        for i in range(len(self) - 1, -1, -1):
+            yield self.entryAt(i)
+
+    def __reduce__(self):
+        # keeps the entries that were not yet used in raw form
+        return (self.__class__, (list(list.__iter__(self)), self.trusted))
+
+    for _name in [
+        "__contains__",
+        "__eq__",
+        "__ne__",
+        "__lt__",
+        "__le__",
+        "__gt__",
+        "__ge__",
+        "__repr__",
+        "__add__",
+        "__mul__",
+        "__iadd__",
+        "__imul__",
+        "__setitem__",
+        "__delitem__",
+        "append",
+        "extend",
+        "insert",
+        "remove",
+        "pop",
+        "clear",
+        "index",
+        "count",
+        "sort",
+        "reverse",
+        "copy",
+    ]:
+        locals()[_name] = _materializingMethod(_name)
+    del _name
+
+
+# single pass serializer: the canonical json of entries and dictionaries is built as a list of strings joined at the end
+
+_encodeStr = json.encoder.encode_basestring_ascii
+_keyPrefixes = {}
+
+
+def keyPrefix(key, indent):
+    """returns ',\n<indent spaces>"key": ' (cached)"""
+    p = _keyPrefixes.get((key, indent))
+    if p is None:
+        p = ",\n" + indent * " " + _encodeStr(key) + ": "
+        _keyPrefixes[(key, indent)] = p
+    return p
+
+
+def jsonValue(v):
+    """returns the canonical json of v (like jd, with fast paths for strings, booleans and lists of strings)"""
+    t = type(v)
+    if t is str:
+        return _encodeStr(v)
+    elif t is bool:
+        return "true" if v else "false"
+    elif v is None:
+        return "null"
+    elif t is list and all(type(x) is str for x in v):
+        return "[" + ", ".join([_encodeStr(x) for x in v]) + "]"
+    return jd(v)
+
+
+def appendStrMaybeList(out, value, indent=0):
+    """appends the json of a string, or a list of strings with a string per line to out (like writeStrMaybeList)"""
+    if isinstance(value, (str, bytes)):
+        out.append(jsonValue(value))
+    else:
+        newline = ",\n" + (indent + 2) * " "
+        out.append("[")
+        if value:
+            out.append(newline[1:])
+            out.append(newline.join([jsonValue(l) for l in value]))
+        out.append(" ]")
+
+
+def appendList(out, values, appendValue, indent):
+    """appends the values separated by ', ' with appendValue(out, value, indent)"""
+    first = True
+    for v in values:
+        if first:
+            first = False
+        else:
+            out.append(", ")
+        appendValue(out, v, indent)
+
+
+def appendDimension(out, d, indent):
+    ii = indent + 2
+    out.append("{")
+    comma = ""
+    if d.meta_dimension_fixed is not None:
+        out.append(comma + keyPrefix("meta_dimension_fixed", ii)[1:])
+        out.append(jsonValue(d.meta_dimension_fixed))
+        comma = ","
+    if d.meta_dimension_symbolic:
+        out.append(comma + keyPrefix("meta_dimension_symbolic", ii)[1:])
+        out.append(jsonValue(d.meta_dimension_symbolic))
+        comma = ","
+    out.append("\n" + indent * " " + "}")
+
+
+def appendEnum(out, e, indent):
+    ii = indent + 2
+    out.append("{" + keyPrefix("meta_enum_value", ii)[1:])
+    out.append(jsonValue(e.meta_enum_value))
+    out.append(keyPrefix("meta_enum_description", ii))
+    appendStrMaybeList(out, e.meta_enum_description, indent=ii)
+    out.append("\n" + indent * " " + "}")
+
+
+def appendQueryEnum(out, q, indent):
+    ii = indent + 2
+    out.append("{" + keyPrefix("meta_query_expansion", ii)[1:])
+    out.append(jsonValue(q.meta_query_expansion))
+    if q.meta_query_values:
+        out.append(keyPrefix("meta_query_values", ii))
+        out.append(jsonValue(q.meta_query_values))
+    if q.meta_query_regexp:
+        out.append(keyPrefix("meta_query_regexp", ii))
+        out.append(jsonValue(q.meta_query_regexp))
+    out.append("\n" + indent * " " + "}")
+
+
+def appendRange(out, r, indent):
+    ii = indent + 2
+    out.append("{" + keyPrefix("meta_range_kind", ii)[1:])
+    out.append(jsonValue(r.meta_range_kind.value))
+    if r.meta_range_minimum is not None:
+        out.append(keyPrefix("meta_range_minimum", ii))
+        out.append(jsonValue(r.meta_range_minimum))
+    if r.meta_range_maximum is not None:
+        out.append(keyPrefix("meta_range_maximum", ii))
+        out.append(jsonValue(r.meta_range_maximum))
+    if r.meta_range_units:
+        out.append(keyPrefix("meta_range_units", ii))
+        out.append(jsonValue(r.meta_range_units))
+    out.append("\n" + indent * " " + "}")
+
+
+def appendInject(out, i, indent):
+    ii = indent + 2
+    out.append("{")
+    comma = ""
+    if i.meta_inject_if_abstract_type:
+        out.append(comma + keyPrefix("meta_inject_if_abstract_type", ii)[1:])
+        out.append(jsonValue(i.meta_inject_if_abstract_type))
+        comma = ","
+    if i.meta_inject_if_section_regexp:
+        out.append(comma + keyPrefix("meta_inject_if_section_regexp", ii)[1:])
+        out.append(jsonValue(i.meta_inject_if_section_regexp))
+        comma = ","
+    out.append("\n" + ii * " " + "}")
+
+
+def appendRequired(out, r, indent):
+    ii = indent + 2
+    out.append("{" + keyPrefix("metadict_required_name", ii)[1:])
+    out.append(jsonValue(r.metadict_required_name))
+    if r.metadict_required_version is not None:
+        out.append(keyPrefix("metadict_required_version", ii))
+        out.append(jsonValue(r.metadict_required_version))
+    out.append("\n" + indent * " " + "}")
+
+
+def _appendValueFields(out, e, ii):
+    out.append(keyPrefix("meta_parent_section", ii))
+    out.append(jsonValue(e.meta_parent_section))
+    if e.meta_data_type:
+        out.append(keyPrefix("meta_data_type", ii))
+        out.append(jsonValue(e.meta_data_type.value))
+    out.append(keyPrefix("meta_repeats", ii))
+    out.append(jsonValue(e.meta_repeats))
+    out.append(keyPrefix("meta_required", ii))
+    out.append(jsonValue(e.meta_required))
+    if e.meta_referenced_section:
+        out.append(keyPrefix("meta_referenced_section", ii))
+        out.append(jsonValue(e.meta_referenced_section))
+    out.append(keyPrefix("meta_dimension", ii) + "[ ")
+    appendList(out, e.meta_dimension, appendDimension, ii)
+    out.append(" ]")
+    if e.meta_default_value is not None:
+        out.append(keyPrefix("meta_default_value", ii))
+        out.append(jsonValue(e.meta_default_value))
+    if e.meta_example is not None:
+        out.append(keyPrefix("meta_example", ii))
+        out.append(jsonValue(e.meta_example))
+    if e.meta_enum is not None:
+        out.append(keyPrefix("meta_enum", ii) + "[ ")
+        appendList(out, e.meta_enum, appendEnum, ii + 2)
+        out.append(" ]")
+    if e.meta_query_enum is not None:
+        out.append(keyPrefix("meta_query_enum", ii) + "[ ")
+        appendList(out, e.meta_query_enum, appendQueryEnum, ii + 2)
+        out.append(" ]")
+    if e.meta_range_expected is not None:
+        out.append(keyPrefix("meta_range_expected", ii) + "[ ")
+        appendList(out, e.meta_range_expected, appendRange, ii + 2)
+        out.append(" ]")
+    if e.meta_units:
+        out.append(keyPrefix("meta_units", ii))
+        out.append(jsonValue(e.meta_units))
+
+
+def _appendDimensionValueFields(out, e, ii):
+    out.append(keyPrefix("meta_parent_section", ii))
+    out.append(jsonValue(e.meta_parent_section))
+    if e.meta_data_type:
+        out.append(keyPrefix("meta_data_type", ii))
+        out.append(jsonValue(e.meta_data_type.value))
+
+
+def _appendConstraintFields(out, e, ii):
+    out.append(keyPrefix("meta_parent_section", ii))
+    out.append(jsonValue(e.meta_parent_section))
+    for key in [
+        "meta_constraint_select_query",
+        "meta_constraint_required_query",
+        "meta_constraint_expected_meta_info",
+    ]:
+        v = getattr(e, key)
+        if v:
+            out.append(keyPrefix(key, ii))
+            out.append(jsonValue(v))
+
+
+def _appendSectionFields(out, e, ii):
+    out.append(keyPrefix("meta_parent_section", ii))
+    out.append(jsonValue(e.meta_parent_section))
+    out.append(keyPrefix("meta_repeats", ii))
+    out.append(jsonValue(e.meta_repeats))
+    out.append(keyPrefix("meta_required", ii))
+    out.append(jsonValue(e.meta_required))
+    for key in ["meta_chosen_key", "meta_context_identifier", "meta_contains"]:
+        v = getattr(e, key)
+        if v:
+            out.append(keyPrefix(key, ii))
+            out.append(jsonValue(v))
+    if e.meta_inject:
+        out.append(keyPrefix("meta_inject", ii) + "[")
+        appendList(out, e.meta_inject, appendInject, ii)
+        out.append(" ]")
+    if e.meta_example:
+        out.append(keyPrefix("meta_example", ii))
+        out.append(jsonValue(e.meta_example))
+
+
+_fieldsAppenders = {
+    MetaType.type_value: _appendValueFields,
+    MetaType.type_dimension: _appendDimensionValueFields,
+    MetaType.type_constraint: _appendConstraintFields,
+    MetaType.type_section: _appendSectionFields,
+    MetaType.type_abstract: None,
+}
+
+
+def appendEntry(out, e, indent=0, writeExtra=None):
+    """appends the canonical json of the meta_info_entry e to out (writeExtra(outF, indent) can add extra fields)"""
+    ii = indent + 2
+    out.append("{" + keyPrefix("meta_name", ii)[1:])
+    out.append(jsonValue(e.meta_name))
+    out.append(keyPrefix("meta_type", ii))
+    out.append(jsonValue(e.meta_type.value))
+    out.append(keyPrefix("meta_description", ii))
+    appendStrMaybeList(out, e.meta_description, indent=ii)
+    if e.meta_deprecated:
+        out.append(keyPrefix("meta_deprecated", ii))
+        out.append(jsonValue(e.meta_deprecated))
+    if e.meta_abstract_types:
+        out.append(keyPrefix("meta_abstract_types", ii))
+        out.append(jsonValue(e.meta_abstract_types))
+    appendFields = _fieldsAppenders[e.meta_type]
+    if appendFields:
+        appendFields(out, e, ii)
+    if writeExtra:
+        outF = io.StringIO()
+        writeExtra(outF, indent=ii)
+        out.append(outF.getvalue())
+    out.append("\n" + indent * " " + "}")
+
+
+def entryText(e, indent=0, writeExtra=None):
+    """returns the canonical json of the meta_info_entry e"""
+    out = []
+    appendEntry(out, e, indent, writeExtra)
+    return "".join(out)
+
+
+def appendDictionary(
+    out, d, indent=0, writeName=True, writeSource=False, writeMetaInfoEntries=True
+):
+    """appends the canonical json of the dictionary d to out"""
+    ii = indent + 2
+    out.append("{")
+    comma = ""
+    if writeName:
+        out.append(comma + keyPrefix("metadict_name", ii)[1:])
+        out.append(jsonValue(d.metadict_name))
+        comma = ","
+    if writeSource:
+        out.append(comma + keyPrefix("metadict_source", ii)[1:])
+        out.append(jsonValue(d.metadict_source))
+        comma = ","
+    out.append(comma + keyPrefix("metadict_description", ii)[1:])
+    appendStrMaybeList(out, d.metadict_description, indent=ii)
+    if d.metadict_version is not None:
+        out.append(keyPrefix("metadict_version", ii))
+        out.append(jsonValue(d.metadict_version))
+    out.append(keyPrefix("metadict_required", ii) + "[ ")
+    appendList(out, d.metadict_required, appendRequired, indent + 4)
+    out.append(" ]")
+    if writeMetaInfoEntries:
+        out.append(keyPrefix("meta_info_entry", ii) + "[ ")
+        appendList(out, d.meta_info_entry, appendEntry, indent + 4)
+        out.append(" ]")
+    out.append("\n" + indent * " " + "}")
 
 
 class MetaDictionary(BaseModel):
+    __slots__ = ("entriesIndex",)
     metadict_name: str
     metadict_source: Optional[List[str]]
     metadict_description: Union[str, List[str]]
@@ -815,27 +1514,121 @@ class MetaDictionary(BaseModel):
             stats[e.meta_type.value] += 1
         return stats
 
+    def entryList(self):
+        """returns meta_info_entry, ensuring that it is an EntryList"""
+        entries = self.meta_info_entry
+        if not isinstance(entries, EntryList):
+            entries = EntryList(entries)
+            self.meta_info_entry = entries
+        return entries
+
+    def entriesIndexes(self):
+        """returns the indexes of the entries by meta_name and by (meta_name, meta_type).
+		They are rebuilt only if meta_info_entry changed (see EntryList)"""
+        entries = self.entryList()
+        index = getattr(self, "entriesIndex", None)
+        if index is None or index[0] is not entries or index[1] != entries.version:
+            byName = {}
+            byNameType = {}
+            for el in entries:
+                byName.setdefault(el.meta_name, []).append(el)
+                byNameType.setdefault((el.meta_name, el.meta_type), []).append(el)
+            index = (entries, entries.version, byName, byNameType)
+            object.__setattr__(self, "entriesIndex", index)
+            self.meta_info_entries_cache = byName
+        return index[2], index[3]
+
+    def updateEntriesIndex(self, version, removed=None, added=None):
+        """updates the index after meta_info_entry changed from version to version+1 by removing the entry removed and adding added"""
+        index = getattr(self, "entriesIndex", None)
+        entries = self.meta_info_entry
+        if index is None or index[0] is not entries or index[1] != version:
+            return  # stale anyway, rebuilt at the next access
+        byName, byNameType = index[2], index[3]
+        if removed is not None:
+            for idx, key in [
+                (byName, removed.meta_name),
+                (byNameType, (removed.meta_name, removed.meta_type)),
+            ]:
+                l = [e for e in idx[key] if e is not removed]
+                if l:
+                    idx[key] = l
+                else:
+                    del idx[key]
+        if added is not None:
+            byName.setdefault(added.meta_name, []).append(added)
+            byNameType.setdefault((added.meta_name, added.meta_type), []).append(added)
+        object.__setattr__(
+            self, "entriesIndex", (entries, entries.version, byName, byNameType)
+        )
+
+    def addEntry(self, entry):
+        """adds the entry to meta_info_entry (updating the index)"""
+        entries = self.entryList()
+        version = entries.version
+        entries.append(entry)
+        self.updateEntriesIndex(version, added=entry)
+
+    def removeEntry(self, entry):
+        """removes the entry object from meta_info_entry (updating the index)"""
+        entries = self.entryList()
+        i = entries.indexOf(entry)
+        version = entries.version
+        del entries[i]
+        self.updateEntriesIndex(version, removed=entry)
+
+    def replaceEntry(self, oldEntry, newEntry):
+        """replaces the entry object oldEntry with newEntry in meta_info_entry (updating the index)"""
+        entries = self.entryList()
+        i = entries.indexOf(oldEntry)
+        version = entries.version
+        entries[i] = newEntry
+        self.updateEntriesIndex(version, removed=oldEntry, added=newEntry)
+
     @property
     def meta_info_entries(self):
-        if self.meta_info_entries_cache is not None and len(
-            self.meta_info_entries_cache
-        ) == len(self.meta_info_entry):
-            return self.meta_info_entries_cache
-        entries = {}
-        for el in self.meta_info_entry:
-            entries[el.meta_name] = entries.get(el.meta_name, []) + [el]
-        self.meta_info_entries_cache = entries
-        return entries
+        return self.entriesIndexes()[0]
 
     def __getitem__(self, meta_name):
         """returns a list with the meta_info_entry with the given meta_name.
 		If meta_name does not exist, it returns an empty list"""
-        return self.meta_info_entries.get(meta_name, [])
+        entries = self.meta_info_entry
+        if isinstance(entries, LazyEntryList):
+            return [entries.entryAt(i) for i in entries.positionsOf(meta_name)]
+        return self.entriesIndexes()[0].get(meta_name, [])
+
+    def entriesOfType(self, metaName, metaType):
+        """returns the list of entries with the given meta_name and meta_type"""
+        entries = self.meta_info_entry
+        if isinstance(entries, LazyEntryList):
+            return [
+                entries.entryAt(i)
+                for i in entries.positionsOf(metaName)
+                if entries.keyAt(i)[1] == metaType
+            ]
+        return self.entriesIndexes()[1].get((metaName, metaType), [])
+
+    def entryNames(self):
+        """returns the meta_name of all the meta_info_entry (without building lazy entries)"""
+        entries = self.meta_info_entry
+        if isinstance(entries, LazyEntryList):
+            return [entries.nameAt(i) for i in range(len(entries))]
+        return [e.meta_name for e in entries]
+
+    def entryKeys(self):
+        """returns the (meta_name, meta_type, meta_parent_section) of all the meta_info_entry (without building lazy entries)"""
+        entries = self.meta_info_entry
+        if isinstance(entries, LazyEntryList):
+            return [entries.keyAt(i) for i in range(len(entries))]
+        return [
+            (e.meta_name, e.meta_type, getattr(e, "meta_parent_section", None))
+            for e in entries
+        ]
 
     def findOne(self, metaName, metaType):
         """Finds the entries with type meta_type with the given name.
 		Raises an exception if not exactly one entry is found."""
-        entries = [e for e in self[metaName] if e.meta_type == metaType]
+        entries = self.entriesOfType(metaName, metaType)
         if len(entries) == 1:
             return entries[0]
         elif not entries:
@@ -847,15 +1640,20 @@ class MetaDictionary(BaseModel):
                 f"Expected just one {metaName} of type {metaType.value}, not {len(entries)}: {entries}"
             )
 
+    def internIdentifiers(self):
+        """interns the identifiers of the entries already built (for example after unpickling)"""
+        entries = self.meta_info_entry
+        for i in range(len(entries)):
+            e = list.__getitem__(entries, i)
+            if isinstance(e, BaseModel):
+                internModel(e)
+
     def standardize(self, compact=False):
         """standarizes the dictionary (mostly the description entries).
 		If compact is true each description is folded in a single string, otherwise a lit of strings (with reasonable line breaks) is used."""
-        if compact:
-            self.metadict_description = maybeJoinStr(self.metadict_description)
-        else:
-            self.metadict_description = splitStr(
-                maybeJoinStr(self.metadict_description)
-            )
+        description = standardStr(self.metadict_description, compact)
+        if description != self.metadict_description:
+            self.metadict_description = description
         for el in self.meta_info_entry:
             el.standardize(compact=compact)
         self.meta_info_entry.sort(key=lambda x: x.meta_name)
@@ -869,67 +1667,29 @@ class MetaDictionary(BaseModel):
         writeMetaInfoEntries=True,
     ):
         """Writes out a dictionary as an indented json. The same json is produced for the same dictionary, but you should call standardize if you want to avoid trivial differences (different order of meta_info_entries, different split of description strings)"""
-        outF.write("{")
-        ii = (indent + 2) * " "
-        comma = ""
-        if writeName:
-            outF.write(
-                '{comma}\n{ii}"metadict_name": {value}'.format(
-                    ii=ii, comma=comma, value=jd(self.metadict_name)
-                )
-            )
-            comma = ","
-        if writeSource:
-            outF.write(
-                '{comma}\n{ii}"metadict_source": {value}'.format(
-                    ii=ii, comma=comma, value=jd(self.metadict_source)
-                )
-            )
-            comma = ","
-        outF.write('{comma}\n{ii}"metadict_description": '.format(ii=ii, comma=comma))
-        comma = ","
-        writeStrMaybeList(outF, self.metadict_description, indent=indent + 2)
-        if self.metadict_version is not None:
-            outF.write(
-                ',\n{ii}"metadict_version": {value}'.format(
-                    ii=ii, value=jd(self.metadict_version)
-                )
-            )
-        outF.write(f',\n{ii}"metadict_required": [ ')
-        first = True
-        for el in self.metadict_required:
-            if first:
-                first = False
-            else:
-                outF.write(", ")
-            el.write(outF, indent=indent + 4)
-        outF.write(" ]")
-        if writeMetaInfoEntries:
-            outF.write(f',\n{ii}"meta_info_entry": [ ')
-            first = True
-            for el in self.meta_info_entry:
-                if first:
-                    first = False
-                else:
-                    outF.write(", ")
-                el.write(outF, indent=indent + 4)
-            outF.write(" ]")
-        outF.write("\n" + (indent * " ") + "}")
+        out = []
+        appendDictionary(
+            out,
+            self,
+            indent=indent,
+            writeName=writeName,
+            writeSource=writeSource,
+            writeMetaInfoEntries=writeMetaInfoEntries,
+        )
+        outF.write("".join(out))
 
-    def writeExploded(self, basePath, cleanup=True):
-        """Writes an exploded dictionary at the given path"""
+    def writeExploded(self, basePath, cleanup=True, maxWorkers=ioWorkers):
+        """Writes an exploded dictionary at the given path.
+		All files are rendered first, and then written (if changed) by a pool of at most maxWorkers threads. If cleanup is true the entry files of removed entries are moved to a backup"""
         dir = os.path.join(basePath, self.metadict_name + ".meta_dictionary")
         if not os.path.isdir(dir):
             os.makedirs(dir)
-        writeFile(
-            os.path.join(dir, "_.meta_dictionary.json"),
-            lambda outF: self.write(outF, writeMetaInfoEntries=False),
-        )
-        dNow = os.getcwd()
-        os.chdir(dir)
-        present = set(glob.glob("**/*.meta_info_entry.json", recursive=True))
-        os.chdir(dNow)
-        written = set()
+        present = set(f for f, _ in scanFiles(dir, ".meta_info_entry.json"))
+        files = {
+            "_.meta_dictionary.json": renderText(
+                lambda outF: self.write(outF, writeMetaInfoEntries=False)
+            )
+        }
         for el in self.meta_info_entry:
             if el.meta_type == MetaType.type_section:
                 fName = os.path.join(el.meta_name, "_.meta_info_entry.json")
@@ -939,31 +1699,43 @@ class MetaDictionary(BaseModel):
                 )
             else:
                 fName = el.meta_name + ".meta_info_entry.json"
-            written.add(fName)
-            writeFile(os.path.join(dir, fName), lambda outF: el.write(outF))
-        timestamp = date.today().isoformat()
-        safeRemove([os.path.join(dir, f) for f in present.difference(written)])
+            files[fName] = renderText(el.write)
+        writeFiles(dir, files, maxWorkers=maxWorkers)
+        if cleanup:
+            safeRemove([os.path.join(dir, f) for f in present.difference(files)])
 
     @classmethod
-    def fromDict(cls, d):
-        """Initializes a meta_dictionary from a dictionary (for example from json serialization)"""
+    def fromDict(cls, d, trusted=False, lazy=False):
+        """Initializes a meta_dictionary from a dictionary (for example from json serialization).
+		If trusted is true d is assumed to be valid and no validation is performed.
+		If lazy is true the meta_info_entry are kept in raw form and built only when first accessed (see LazyEntryList)"""
         try:
             metadict_name = d.get("metadict_name")
             metadict_source = d.get("metadict_source")
             metadict_description = d.get("metadict_description", "")
             metadict_version = d.get("metadict_version")
+            if trusted:
+                requiredClass = lambda **x: trustedConstruct(MetadictRequired, x)
+            else:
+                requiredClass = MetadictRequired
             metadict_required = [
-                MetadictRequired(**x)
+                requiredClass(**x)
                 for x in d.get("metadict_required", d.get("metadict_require", []))
             ]
         except:
             dd = {k: v for k, v in d.items() if k != "meta_info_entry"}
             raise Exception(f"failed to get metadict attributes from {dd}")
         d_meta_info_entry = d.get("meta_info_entry", [])
-        meta_info_entry = []
-        for e in d_meta_info_entry:
-            meta_info_entry.append(MetaInfoBase.fromDict(e))
-        return cls(
+        if lazy:
+            meta_info_entry = LazyEntryList(d_meta_info_entry, trusted=trusted)
+        else:
+            meta_info_entry = EntryList()
+            for e in d_meta_info_entry:
+                if isinstance(e, MetaInfoBase):
+                    meta_info_entry.append(e)  # already built (streaming)
+                else:
+                    meta_info_entry.append(MetaInfoBase.fromDict(e, trusted=trusted))
+        values = dict(
             metadict_name=metadict_name,
             metadict_source=metadict_source,
             metadict_description=metadict_description,
@@ -971,10 +1743,14 @@ class MetaDictionary(BaseModel):
             metadict_required=metadict_required,
             meta_info_entry=meta_info_entry,
         )
+        if trusted:
+            return trustedConstruct(cls, values)
+        return cls(**values)
 
     @classmethod
-    def loadDictionaryAtPath(cls, p, name=None):
-        """Loads a single json file dictionary from the given path"""
+    def loadDictionaryAtPath(cls, p, name=None, lazy=False, streaming=None):
+        """Loads a single json file dictionary from the given path (lazy: build entries only when accessed).
+		With streaming the entries are built while reading the file, and the raw json of all entries is never in memory at the same time, by default it is used only for files larger than streamingThreshold (see setStreamingThreshold)"""
         try:
             if not name:
                 name = os.path.basename(p)
@@ -982,7 +1758,22 @@ class MetaDictionary(BaseModel):
                     name = name[: -len(".json")]
                 if name.endswith(".meta_dictionary"):
                     name = name[: -len(".meta_dictionary")]
-            d = json.load(open(p, encoding="utf8"))
+            if streaming is None:
+                streaming = (
+                    streamingThreshold is not None
+                    and os.path.getsize(p) >= streamingThreshold
+                )
+            if streaming:
+                entries = []
+                if lazy:
+                    addEntry = entries.append
+                else:
+                    addEntry = lambda e: entries.append(MetaInfoBase.fromDict(e))
+                with open(p, encoding="utf8") as f:
+                    d = streamJsonObject(f, "meta_info_entry", addEntry)
+                d["meta_info_entry"] = entries
+            else:
+                d = loadJson(p)
             if d.get("metadict_name", name) != name:
                 raise Exception(
                     f'metadict at {p} has unexpected name ({d["metadict_name"]})'
@@ -995,28 +1786,45 @@ class MetaDictionary(BaseModel):
                 if not uri in uris:
                     uris.insert(0, uri)
             d["metadict_source"] = uris
-            return cls.fromDict(d)
+            return cls.fromDict(d, lazy=lazy)
         except:
             raise Exception(f'failure loading dictionary at "{p}"')
 
     @classmethod
-    def fileLoader(cls, paths: List[str]):
-        """Defines a loader function that looks for dictionaries at the given paths"""
+    def fileLoader(cls, paths: List[str], lazy=False):
+        """Defines a loader function that looks for dictionaries at the given paths (using dictionaryDiscovery)"""
 
         def find(name):
-            for basep in paths:
-                jsonP = os.path.join(basep, name + ".meta_dictionary.json")
-                explodedP = os.path.join(basep, name + ".meta_dictionary")
-                for p in [jsonP, explodedP]:
-                    if os.path.exists(p):
-                        return cls.loadAtPath(p, name=name)
+            found = dictionaryDiscovery.find(name, paths)
+            if found:
+                return cls.loadAtPath(found.path, name=name, lazy=lazy)
             raise Exception(f"could not find dictionary {name} in {paths}")
 
         return find
 
+    @staticmethod
+    def loadEntryAtPath(path, f):
+        """Loads the meta_info_entry stored in the file f (relative to the exploded dictionary at path), and checks that its name is consistent with the file name"""
+        entryExpectedName = os.path.basename(f)[: -len(".meta_info_entry.json")]
+        if entryExpectedName == "_":
+            entryExpectedName = os.path.basename(os.path.dirname(f))
+        entryPath = os.path.join(path, f)
+        try:
+            d = loadJson(entryPath)
+        except:
+            raise Exception(f"Invalid json in {entryPath}")
+        d["meta_name"] = d.get("meta_name", entryExpectedName)
+        if d["meta_name"] != entryExpectedName:
+            raise Exception(
+                f'Inconsistent entry name from filename {entryExpectedName} vs {d["meta_name"]} in {entryPath}, copy paste error?'
+            )
+        return d
+
     @classmethod
-    def loadExplodedDictionaryAtPath(cls, path):
-        """Loads an exploded dictionary that lives inside the directory *.meta_dictionary diven at path"""
+    def loadExplodedDictionaryAtPath(cls, path, maxWorkers=None, lazy=False):
+        """Loads an exploded dictionary that lives inside the directory *.meta_dictionary diven at path.
+		If maxWorkers is larger than 1 the entry files are read and parsed concurrently by a pool of at most maxWorkers threads.
+		If lazy is true the entries are built only when accessed"""
         expectedName = os.path.basename(path)
         if expectedName in [".", ".."]:
             expectedName = os.path.basename(os.path.normpath(os.path.abspath(path)))
@@ -1027,11 +1835,10 @@ class MetaDictionary(BaseModel):
             raise Exception(
                 f"Exploded dictionary is missing base info at {baseInfoPath}"
             )
-        with open(baseInfoPath, encoding="utf8") as fIn:
-            try:
-                baseDict = json.load(fIn)
-            except:
-                raise Exception(f"Invalid json in {baseInfoPath}")
+        try:
+            baseDict = loadJson(baseInfoPath)
+        except:
+            raise Exception(f"Invalid json in {baseInfoPath}")
         baseDict["metadict_name"] = baseDict.get("metadict_name", expectedName)
         if baseDict["metadict_name"] != expectedName:
             logging.warning(
@@ -1044,46 +1851,55 @@ class MetaDictionary(BaseModel):
             if not uri in uris:
                 uris.insert(0, uri)
         baseDict["metadict_source"] = uris
-        dNow = os.getcwd()
-        os.chdir(path)
-        entriesNames = glob.glob("**/*.meta_info_entry.json", recursive=True)
-        os.chdir(dNow)
-        entries = []
-        for f in entriesNames:
-            entryExpectedName = os.path.basename(f)[: -len(".meta_info_entry.json")]
-            if entryExpectedName == "_":
-                entryExpectedName = os.path.basename(os.path.dirname(f))
-            entryPath = os.path.join(path, f)
-            with open(entryPath, encoding="utf8") as fIn:
-                try:
-                    d = json.load(fIn)
-                except:
-                    raise Exception(f"Invalid json in {entryPath}")
-            d["meta_name"] = d.get("meta_name", entryExpectedName)
-            if d["meta_name"] != entryExpectedName:
-                raise Exception(
-                    f'Inconsistent entry name from filename {entryExpectedName} vs {d["meta_name"]} in {entryPath}, copy paste error?'
+        entriesNames = [f for f, _ in scanFiles(path, ".meta_info_entry.json")]
+        if maxWorkers and maxWorkers > 1 and len(entriesNames) > 1:
+            with ThreadPoolExecutor(
+                max_workers=min(maxWorkers, len(entriesNames))
+            ) as pool:
+                # map keeps the order of entriesNames and re-raises the first failure
+                entries = list(
+                    pool.map(lambda f: cls.loadEntryAtPath(path, f), entriesNames)
                 )
-            entries.append(d)
+        else:
+            entries = [cls.loadEntryAtPath(path, f) for f in entriesNames]
         entries.sort(key=lambda x: x.get("meta_name"))
         baseDict["meta_info_entry"] = entries
         try:
-            return cls.fromDict(baseDict)
+            return cls.fromDict(baseDict, lazy=lazy)
         except:
             raise Exception(f'failure loading exploded dictionary at "{path}"')
 
     @classmethod
-    def loadAtPath(cls, path, name=None):
-        """loads the dictionary at the given path (automatically detecting its type)"""
+    def loadAtPath(cls, path, name=None, maxWorkers=None, lazy=False):
+        """loads the dictionary at the given path (automatically detecting its type).
+		maxWorkers is used to load exploded dictionaries in parallel, lazy to build the entries only when accessed.
+		If a dictionary cache is set (setDictionaryCache) an unchanged dictionary is taken from it"""
+        variant = "lazy" if lazy else ""
         if path.endswith("/") or os.path.basename(path) == "_.meta_dictionary.json":
             dPath = os.path.dirname(path)
             if not dPath:
                 dPath = "."
-            return cls.loadExplodedDictionaryAtPath(dPath)
+            return cachedLoad(
+                dPath,
+                True,
+                lambda: cls.loadExplodedDictionaryAtPath(
+                    dPath, maxWorkers=maxWorkers, lazy=lazy
+                ),
+                variant,
+            )
         elif path.endswith(".meta_dictionary.json"):
-            return cls.loadDictionaryAtPath(path)
+            return cachedLoad(
+                path, False, lambda: cls.loadDictionaryAtPath(path, lazy=lazy), variant
+            )
         elif path.endswith(".meta_dictionary"):
-            return cls.loadExplodedDictionaryAtPath(path)
+            return cachedLoad(
+                path,
+                True,
+                lambda: cls.loadExplodedDictionaryAtPath(
+                    path, maxWorkers=maxWorkers, lazy=lazy
+                ),
+                variant,
+            )
         else:
             raise Exception(
                 f"Do not know how to interpret file {path}, expected either a file *.meta_dictionary.json or  directory *.meta_dictionary"
@@ -1095,21 +1911,60 @@ class MetaDictionary(BaseModel):
 
 
 class MetaInfo(BaseModel):
-    """Represents a set of dictionaries that are used together"""
+    """Represents a set of dictionaries that are used together.
+	schemaCache holds the schema fragments of its dictionaries (see meta_schema.SchemaCache)"""
 
+    __slots__ = ("schemaCache",)
     dictionaries: Dict[str, MetaDictionary]
     metaNameInDicts: Dict[str, Set[str]]
+    # (meta_name, meta_type) -> names of the dictionaries defining it
+    dictsByNameType: dict = {}
+    # (meta_parent_section, meta_name) -> names of the dictionaries defining it
+    # (only values and dimensions)
+    dictsByParentName: dict = {}
+    # dictName -> names of the dictionaries it depends on (cleared when dictionaries change)
+    depsCache: dict = {}
+
+    def dictionariesWith(self, candidates, dictionaryNames):
+        """restricts the candidates dictionary names to dictionaryNames (if given)"""
+        if not candidates or not dictionaryNames:
+            return candidates
+        if not isinstance(dictionaryNames, (set, frozenset)):
+            dictionaryNames = frozenset(dictionaryNames)
+        return candidates & dictionaryNames
 
     def findMany(self, metaName, metaType=None, dictionaryNames=None):
         """Finds all entries with the given name, and returns a list of (entry,dinctionaryName) tuples.
 		If metaType or dictionaryNames are given, filters them accordingly."""
+        if metaType:
+            candidates = self.dictsByNameType.get((metaName, metaType))
+        else:
+            candidates = self.metaNameInDicts.get(metaName)
+        res = []
+        for dictName in self.dictionariesWith(candidates, dictionaryNames) or ():
+            dict = self.dictionaries[dictName]
+            if metaType:
+                entries = dict.entriesOfType(metaName, metaType)
+            else:
+                entries = dict[metaName]
+            for entry in entries:
+                res.append(EntryDict(entry, dictName))
+        return res
+
+    def findByParent(
+        self, parentSection, metaName, metaType=None, dictionaryNames=None
+    ):
+        """Finds the values and dimensions with the given meta_parent_section and name, and returns a list of (entry,dinctionaryName) tuples.
+		If metaType or dictionaryNames are given, filters them accordingly."""
+        candidates = self.dictsByParentName.get((parentSection, metaName))
         res = []
-        for dictName in self.metaNameInDicts.get(metaName, set()):
-            if not dictionaryNames or dictName in dictionaryNames:
-                dict = self.dictionaries[dictName]
-                for entry in dict[metaName]:
-                    if not metaType or entry.meta_type == metaType:
-                        res.append(EntryDict(entry, dictName))
+        for dictName in self.dictionariesWith(candidates, dictionaryNames) or ():
+            dict = self.dictionaries[dictName]
+            for entry in dict[metaName]:
+                if (not metaType or entry.meta_type == metaType) and getattr(
+                    entry, "meta_parent_section", None
+                ) == parentSection:
+                    res.append(EntryDict(entry, dictName))
         return res
 
     def findOne(self, metaName, metaType=None, dictionaryNames=None):
@@ -1134,40 +1989,126 @@ class MetaInfo(BaseModel):
 		Raises an exception if more than one entries are found, returns None if none are found."""
         return self.findOne(metaName, MetaType.type_section, dictionaryNames)
 
-    def addMeta(self, metaName, dictName):
-        self.metaNameInDicts[metaName] = self.metaNameInDicts.get(
-            metaName, set()
-        ).union([dictName])
+    def addMeta(self, metaName, dictName, metaType=None, parentSection=None):
+        self.metaNameInDicts.setdefault(metaName, set()).add(dictName)
+        if metaType:
+            self.dictsByNameType.setdefault((metaName, metaType), set()).add(dictName)
+            if parentSection and metaType in (
+                MetaType.type_value,
+                MetaType.type_dimension,
+            ):
+                self.dictsByParentName.setdefault((parentSection, metaName), set()).add(
+                    dictName
+                )
 
     def addMetaDict(self, metaDict):
         name = metaDict.metadict_name
         if name in self.dictionaries:
             raise Exception(f"dictionary {name} added twice to MetaInfo")
         self.dictionaries[name] = metaDict
-        for entry in metaDict.meta_info_entry:
-            self.addMeta(entry.meta_name, name)
-
-    def complete(self, loadDictNamed):
-        """Ensures that all dependent dictionaries are loaded"""
-        namesDone = set()
-        while len(namesDone) < len(self.dictionaries):
-            for n, d in sorted(self.dictionaries.items()):
-                if n not in namesDone:
-                    namesDone.add(n)
-                    for dep in d.metadict_required:
-                        name = dep.metadict_required_name
-                        if name not in self.dictionaries:
-                            newD = loadDictNamed(name)
-                            self.addMetaDict(newD)
-                        version = self.dictionaries[name].metadict_version
-                        expectedVersion = dep.metadict_required_version
-                        if expectedVersion and expectedVersion != version:
-                            raise Exception(
-                                f"Unexpected version {version} for dictionary {name} when {d.metadict_name} expects version {expectedVersion}"
-                            )
+        self.depsCache.clear()
+        for metaName, metaType, parentSection in metaDict.entryKeys():
+            self.addMeta(metaName, name, metaType, parentSection)
+
+    def removeMetaDict(self, name):
+        """removes the dictionary with the given name, and returns it"""
+        metaDict = self.dictionaries.pop(name)
+        self.depsCache.clear()
+        schemaCache = getattr(self, "schemaCache", None)
+        if schemaCache is not None:
+            schemaCache.clear()
+        for metaName, metaType, parentSection in metaDict.entryKeys():
+            for index, key in [
+                (self.metaNameInDicts, metaName),
+                (self.dictsByNameType, (metaName, metaType)),
+                (self.dictsByParentName, (parentSection, metaName)),
+            ]:
+                dicts = index.get(key)
+                if dicts is not None:
+                    dicts.discard(name)
+                    if not dicts:
+                        del index[key]
+        return metaDict
+
+    def requiredNames(self, dictName):
+        """returns the names of the dictionaries directly required by dictName"""
+        return [
+            dep.metadict_required_name
+            for dep in self.dictionaries[dictName].metadict_required
+        ]
+
+    def dependencyOrder(self):
+        """returns the names of the loaded dictionaries, each one after the dictionaries it depends on.
+		Raises an exception if the dependencies have a cycle, or a dependency is not loaded"""
+        order = []
+        state = {}  # 1: visiting, 2: done
+        for root in sorted(self.dictionaries):
+            if root in state:
+                continue
+            state[root] = 1
+            stack = [(root, iter(sorted(self.requiredNames(root))))]
+            while stack:
+                name, deps = stack[-1]
+                dep = next(deps, None)
+                if dep is None:
+                    stack.pop()
+                    state[name] = 2
+                    order.append(name)
+                elif state.get(dep) == 1:
+                    cycle = [n for n, _ in stack]
+                    cycle = cycle[cycle.index(dep) :] + [dep]
+                    raise Exception(
+                        f"Circular dependency between dictionaries: {' -> '.join(cycle)}"
+                    )
+                elif dep not in state:
+                    if dep not in self.dictionaries:
+                        raise Exception(
+                            f"missing dependency {dep} of {name}, call complete to load the dependency"
+                        )
+                    state[dep] = 1
+                    stack.append((dep, iter(sorted(self.requiredNames(dep)))))
+        return order
+
+    def complete(self, loadDictNamed, maxWorkers=None):
+        """Ensures that all dependent dictionaries are loaded.
+		The missing dictionaries are loaded one level of the dependency graph at a time, if maxWorkers is larger than 1 each level is loaded concurrently by a pool of at most maxWorkers threads.
+		Raises an exception if the dependencies have a cycle or the required versions do not match"""
+        missing = set()
+        for n in self.dictionaries:
+            missing.update(self.requiredNames(n))
+        frontier = sorted(missing.difference(self.dictionaries))
+        while frontier:
+            if maxWorkers is not None and maxWorkers > 1 and len(frontier) > 1:
+                with ThreadPoolExecutor(max_workers=maxWorkers) as pool:
+                    newDicts = list(pool.map(loadDictNamed, frontier))
+            else:
+                newDicts = [loadDictNamed(name) for name in frontier]
+            for name, newD in zip(frontier, newDicts):
+                if newD.metadict_name != name:
+                    raise Exception(
+                        f"Loading dictionary {name} returned dictionary {newD.metadict_name}"
+                    )
+                self.addMetaDict(newD)
+            missing = set()
+            for name in frontier:
+                missing.update(self.requiredNames(name))
+            frontier = sorted(missing.difference(self.dictionaries))
+        for n in self.dependencyOrder():
+            for dep in self.dictionaries[n].metadict_required:
+                name = dep.metadict_required_name
+                version = self.dictionaries[name].metadict_version
+                expectedVersion = dep.metadict_required_version
+                if expectedVersion and expectedVersion != version:
+                    raise Exception(
+                        f"Unexpected version {version} for dictionary {name} when {n} expects version {expectedVersion}"
+                    )
 
     def depsOfDict(self, dictName):
-        """returns a set with the names of the dependent dictionaries of dictName (including dictName)"""
+        """returns a set with the names of the dependent dictionaries of dictName (including dictName).
+		The result is cached until a dictionary is added or removed"""
+        cached = self.depsCache.get(dictName)
+        if cached is not None:
+            return set(cached)
         deps = set([dictName])
         depsToDo = set([dictName])
         while depsToDo:
@@ -1187,15 +2128,19 @@ class MetaInfo(BaseModel):
                 if name not in deps:
                     deps.add(name)
                     depsToDo.add(name)
+        self.depsCache[dictName] = frozenset(deps)
         return deps
 
-    def loadDictionariesStartingAtPath(self, dictPath, extraPaths=None, loadAll=False):
-        """loads the dictionary at dictPath and all its dependencies (or if loadAll is true, all other dictionaries at the same path)"""
+    def loadDictionariesStartingAtPath(
+        self, dictPath, extraPaths=None, loadAll=False, lazy=False, maxWorkers=None
+    ):
+        """loads the dictionary at dictPath and all its dependencies (or if loadAll is true, all other dictionaries at the same path).
+		If lazy is true the entries of the dictionaries are built only when accessed, maxWorkers is used to load the dependencies in parallel"""
         if (
             dictPath.endswith("/")
             or os.path.basename(dictPath) == "_.meta_dictionary.json"
         ):
-            basePath = os.path.normpath(os.path.join(os.path.dirname(basePath), ".."))
+            basePath = os.path.normpath(os.path.join(os.path.dirname(dictPath), ".."))
         else:
             basePath = os.path.dirname(dictPath)
         if not basePath:
@@ -1203,18 +2148,14 @@ class MetaInfo(BaseModel):
         paths = [basePath]
         if extraPaths:
             paths += extraPaths
-        loader = MetaDictionary.fileLoader(paths)
-        d = MetaDictionary.loadAtPath(dictPath)
+        loader = MetaDictionary.fileLoader(paths, lazy=lazy)
+        d = MetaDictionary.loadAtPath(dictPath, lazy=lazy)
         self.addMetaDict(d)
         if loadAll:
-            for f in os.listdir(basePath):
-                if (
-                    f.endswith(".meta_dictionary")
-                    or f.endswith(".meta_dictionary.json")
-                ) and f != os.path.basename(dictPath):
-                    d = MetaDictionary.loadAtPath(os.path.join(basePath, f))
-                    self.addMetaDict(d)
-        self.complete(loader)
+            for found in dictionaryDiscovery.dictionariesAt(basePath):
+                if found.name not in self.dictionaries:
+                    self.addMetaDict(MetaDictionary.loadAtPath(found.path, lazy=lazy))
+        self.complete(loader, maxWorkers=maxWorkers)
         return d
 
     @classmethod
@@ -1222,9 +2163,15 @@ class MetaInfo(BaseModel):
         return cls(dictionaries={}, metaNameInDicts={})
 
     @classmethod
-    def withPath(cls, dictPath, extraPaths=None, loadAll=False):
+    def withPath(
+        cls, dictPath, extraPaths=None, loadAll=False, lazy=False, maxWorkers=None
+    ):
         metaI = cls.empty()
         d = metaI.loadDictionariesStartingAtPath(
-            dictPath=dictPath, extraPaths=extraPaths, loadAll=loadAll
+            dictPath=dictPath,
+            extraPaths=extraPaths,
+            loadAll=loadAll,
+            lazy=lazy,
+            maxWorkers=maxWorkers,
         )
         return (metaI, d)
@@ -5,19 +5,26 @@ import hashlib, logging
 import json, tempfile
 import re
 import os, os.path
+import threading
 
 jd = lambda x: json.dumps(x, sort_keys=True, ensure_ascii=True)
-from collections import namedtuple
+from collections import namedtuple, deque
 from .meta_info import *
+from .meta_compact import (
+    CompactSection,
+    CompactValue,
+    CompactDimensionValue,
+    CompactAbstract,
+)
 
 
 class MetaSchemaSection(BaseModel):
     dictionary: str
-    section: MetaSection
-    valueEntries: Dict[str, MetaValue]
+    section: Union[CompactSection, MetaSection]
+    valueEntries: Dict[str, Union[CompactValue, MetaValue]]
     subSections: dict  # Dict[str,'MetaSchemaSection']
     instantiatedCopies: dict  # Dict[str,obj]# 'MetaSchemaSection']
-    dimensions: Dict[str, MetaDimensionValue]
+    dimensions: Dict[str, Union[CompactDimensionValue, MetaDimensionValue]]
     injectionBase: Optional[str]
     possibleInject: Set[str]
     meta_path: Optional[str]
@@ -79,8 +86,7 @@ class MetaSchemaSection(BaseModel):
                 )
                 dicts = [
                     el.metadict_name
-                    for el in schema.findMany(vName, MetaType.type_value)
-                    if el.meta_info_entry.meta_parent_section == sName
+                    for el in schema.findByParent(sName, vName, MetaType.type_value)
                 ]
                 if len(dicts) != 1:
                     raise Exception(
@@ -111,8 +117,7 @@ class MetaSchemaSection(BaseModel):
                 )
                 dicts = [
                     el.metadict_name
-                    for el in schema.findMany(vName, MetaType.type_dimension)
-                    if el.meta_info_entry.meta_parent_section == sName
+                    for el in schema.findByParent(sName, vName, MetaType.type_dimension)
                 ]
                 if len(dicts) != 1:
                     raise Exception(
@@ -182,11 +187,11 @@ class MetaSchemaSection(BaseModel):
             if schema:
                 dicts = [
                     el.metadict_name
-                    for el in schema.findMany(
-                        dimension.meta_name, metaType=MetaType.type_dimension
+                    for el in schema.findByParent(
+                        dimension.meta_parent_section,
+                        dimension.meta_name,
+                        metaType=MetaType.type_dimension,
                     )
-                    if el.meta_info_entry.meta_parent_section
-                    == dimension.meta_parent_section
                 ]
             else:
                 dicts = []
@@ -207,22 +212,21 @@ class MetaSchemaSection(BaseModel):
             if schema:
                 dicts = [
                     el.metadict_name
-                    for el in schema.findMany(
-                        value.meta_name, metaType=MetaType.type_value
+                    for el in schema.findByParent(
+                        value.meta_parent_section,
+                        value.meta_name,
+                        metaType=MetaType.type_value,
                     )
-                    if el.meta_info_entry.meta_parent_section
-                    == value.meta_parent_section
                 ]
             else:
                 dicts = []
             if value == existing:
                 raise Exception(
-                    f"Duplicate add of value {value} from {self.dictionariesOf(value.metaName, metaType=MetaType.type_value)} (dictionaries: {dicts})"
+                    f"Duplicate add of value {value} from {dictionary} (dictionaries: {dicts})"
                 )
             else:
-                # with schema we could use dictionariesOf and return all dictionaries, add extra arg?
                 raise Exception(
-                    f"Duplicate dimension {value.meta_name}: {existing} vs {value} from {dictionary} (dictionaries: {dicts})"
+                    f"Duplicate value {value.meta_name}: {existing} vs {value} from {dictionary} (dictionaries: {dicts})"
                 )
 
     def writeSchema(self, outF, indent=0, indentIncrement=4):
@@ -247,7 +251,7 @@ class MetaSchemaSection(BaseModel):
             )
 
     def copyToInject(self, injectionBase):
-        """creates a copy of this to inject in another section"""
+        """creates a copy (an InjectedSection view) of this to inject in another section"""
         if injectionBase:
             subBase = injectionBase + "." + self.name()
         else:
@@ -256,23 +260,76 @@ class MetaSchemaSection(BaseModel):
             subName: sub.copyToInject(subBase)
             for subName, sub in sorted(self.subSections.items())
         }
-        newSect = self.copy(
-            update={
-                "subSections": subS,
-                "instantiatedCopies": {},
-                "injectionBase": injectionBase,
-                "possibleInject": set(),
-            }
-        )
+        newSect = InjectedSection(self, injectionBase, subS)
         if subBase in self.instantiatedCopies:
             raise Exception(f"double inject of {self.name()} to {subBase}")
         self.instantiatedCopies[subBase] = newSect
         return newSect
 
 
+# MetaSchemaSection methods that work unchanged on an InjectedSection
+injectedSectionMethods = [
+    "name",
+    "meta_possible_inject",
+    "meta_sub_section_name",
+    "meta_instantiated_at",
+    "write",
+    "isPartialSection",
+    "isInjected",
+    "writeSchema",
+]
+
+
+class InjectedSection:
+    """A MetaSchemaSection instantiated in the data view at injectionBase (see MetaSchemaSection.copyToInject).
+	It is a lightweight view: everything but the subsections (the copies of the subsections of the original and the sections injected in it) is taken from the original section"""
+
+    __slots__ = ("original", "injectionBase", "subSections")
+
+    def __init__(self, original, injectionBase, subSections):
+        self.original = original
+        self.injectionBase = injectionBase
+        self.subSections = subSections
+
+    @property
+    def dictionary(self):
+        return self.original.dictionary
+
+    @property
+    def section(self):
+        return self.original.section
+
+    @property
+    def valueEntries(self):
+        return self.original.valueEntries
+
+    @property
+    def dimensions(self):
+        return self.original.dimensions
+
+    @property
+    def meta_path(self):
+        return self.original.meta_path
+
+    @property
+    def instantiatedCopies(self):
+        return {}
+
+    @property
+    def possibleInject(self):
+        return set()
+
+    def __repr__(self):
+        return f"InjectedSection({self.name()}, injectionBase={self.injectionBase!r})"
+
+
+for _method in injectedSectionMethods:
+    setattr(InjectedSection, _method, getattr(MetaSchemaSection, _method))
+
+
 class MetaSchemaAbstract(BaseModel):
     dictionary: str
-    abstract_type: MetaAbstract
+    abstract_type: Union[CompactAbstract, MetaAbstract]
     sections: Set[str]
     values: Set[str]
     dimensions: Set[str]
@@ -405,15 +462,98 @@ SectToInject = namedtuple(
 )
 
 
+class SchemaFragment:
+    """The contribution of a single dictionary to a MetaSchema: its sections, its values and dimensions grouped by parent section and its abstract types.
+	It depends only on the dictionary, so it is computed once and merged in the schemas of all the dictionaries depending on it (see MetaSchema.addFragments)"""
+
+    @staticmethod
+    def layoutOf(dictionary: MetaDictionary):
+        """returns what the fragment of dictionary depends on: the identity, meta_type, meta_name and meta_parent_section of its entries.
+		The fragment keeps the entries themselves, so changes of their other fields (also in place) do not invalidate it"""
+        return (dictionary.metadict_name,) + tuple(
+            (
+                id(entry),
+                entry.meta_type,
+                entry.meta_name,
+                getattr(entry, "meta_parent_section", None),
+            )
+            for entry in dictionary.meta_info_entry
+        )
+
+    def __init__(self, dictionary: MetaDictionary, layout=None):
+        self.name = dictionary.metadict_name
+        self.layout = layout if layout is not None else self.layoutOf(dictionary)
+        self.sections = {}
+        self.values = {}  # meta_parent_section -> {meta_name: value}
+        self.dimensions = {}
+        self.abstractTypes = {}
+        for entry in dictionary.meta_info_entry:
+            meta_type = entry.meta_type
+            if meta_type == MetaType.type_section:
+                kind, entries = "section", self.sections
+            elif meta_type == MetaType.type_value:
+                kind = "value"
+                entries = self.values.setdefault(entry.meta_parent_section, {})
+            elif meta_type == MetaType.type_dimension:
+                kind, entries = "dimension", self.dimensions
+            elif meta_type == MetaType.type_abstract:
+                kind, entries = "abstract type", self.abstractTypes
+            else:
+                raise Exception(
+                    f"Unexpected meta_type {meta_type} in entry {entry.meta_name} of dictionary {self.name}"
+                )
+            existing = entries.get(entry.meta_name)
+            if existing is not None:
+                raise Exception(
+                    f"Duplicated {kind} {entry.meta_name} in dictionary {self.name}: {entry} vs {existing}"
+                )
+            entries[entry.meta_name] = entry
+
+
+class SchemaCache:
+    """Keeps the last SchemaFragment of each dictionary of a MetaInfo, shared by all the schemas built with MetaSchema.build.
+	A fragment is reused as long as the layout of the dictionary does not change (see SchemaFragment.layoutOf)"""
+
+    def __init__(self):
+        self.fragments = {}  # dictionary name -> SchemaFragment
+        self.lock = threading.Lock()
+
+    def fragment(self, dictionary: MetaDictionary):
+        """returns the SchemaFragment of dictionary"""
+        layout = SchemaFragment.layoutOf(dictionary)
+        name = dictionary.metadict_name
+        with self.lock:
+            cached = self.fragments.get(name)
+        if cached is not None and cached.layout == layout:
+            return cached
+        fragment = SchemaFragment(dictionary, layout)
+        with self.lock:
+            self.fragments[name] = fragment
+        return fragment
+
+    def clear(self):
+        with self.lock:
+            self.fragments.clear()
+
+    @classmethod
+    def of(cls, metaInfo):
+        """returns the cache of metaInfo (creating it if needed)"""
+        cache = getattr(metaInfo, "schemaCache", None)
+        if cache is None:
+            cache = cls()
+            object.__setattr__(metaInfo, "schemaCache", cache)
+        return cache
+
+
 class MetaSchema(BaseModel):
     metaInfo: MetaInfo
     mainDictionary: str
     dictionaries: Set[str]
     sections: Dict[str, MetaSchemaSection]
     abstractTypes: Dict[str, MetaSchemaAbstract]
-    dimensions: Dict[str, MetaDimensionValue]
+    dimensions: Dict[str, Union[CompactDimensionValue, MetaDimensionValue]]
     rootSections: Dict[str, MetaSchemaSection]
-    dataView: Dict[str, MetaSchemaSection]
+    dataView: dict  # Dict[str, InjectedSection]
 
     def findMany(self, metaName, metaType=None):
         return self.metaInfo.findMany(metaName, metaType, self.dictionaries)
@@ -421,6 +561,11 @@ class MetaSchema(BaseModel):
     def findOne(self, metaName, metaType=None):
         return self.metaInfo.findOne(metaName, metaType, self.dictionaries)
 
+    def findByParent(self, parentSection, metaName, metaType=None):
+        return self.metaInfo.findByParent(
+            parentSection, metaName, metaType, self.dictionaries
+        )
+
     def dictionariesOf(self, metaName, metaType=None):
         """Returns a list of the dictionaries in which the given metaName is defined"""
         return [x.metadict_name for x in self.findMany(metaName, metaType)]
@@ -603,14 +748,125 @@ class MetaSchema(BaseModel):
                     f"Unexpected meta_type {meta_type} in entry {entry.meta_name} of dictionary {dict.metadict_name}"
                 )
 
+    def addFragments(self, fragments):
+        """adds the sections, values, dimensions and abstract types of the given fragments to this (empty) schema.
+		The result is the same as calling addSchemaOfDictionary with the dictionaries of the fragments, but the entries are merged without looking them up again"""
+        sectionFragments = {}
+        for fragment in fragments:
+            for sName, entry in fragment.sections.items():
+                other = sectionFragments.get(sName)
+                if other is not None:
+                    raise Exception(
+                        f"Duplicate section {sName} in {other.name} and {fragment.name}"
+                    )
+                sectionFragments[sName] = fragment
+                self.sections[sName] = MetaSchemaSection.construct(
+                    {
+                        "dictionary": fragment.name,
+                        "section": entry,
+                        "valueEntries": {},
+                        "subSections": {},
+                        "instantiatedCopies": {},
+                        "dimensions": {},
+                        "injectionBase": None,
+                        "possibleInject": set(),
+                        "meta_path": None,
+                    },
+                    {
+                        "dictionary",
+                        "section",
+                        "valueEntries",
+                        "subSections",
+                        "instantiatedCopies",
+                        "dimensions",
+                        "possibleInject",
+                    },
+                )
+        for sName, sec in self.sections.items():
+            parentName = sec.section.meta_parent_section
+            if not parentName:
+                self.rootSections[sName] = sec
+                continue
+            parent = self.sections.get(parentName)
+            if parent is None:
+                raise Exception(
+                    f"Failed to find {parentName} climbing up the parents of {sName}"
+                )
+            parent.subSections[sName] = sec
+        for sName, sec in self.sections.items():
+            if sec.meta_path is None:
+                path = []
+                sNow = sec
+                while sNow is not None and sNow.meta_path is None:
+                    if len(path) > len(self.sections):
+                        raise Exception(f"circular ref back to {sName}")
+                    path.append(sNow)
+                    sNow = self.sections.get(sNow.section.meta_parent_section)
+                basePath = sNow.meta_path + "." if sNow is not None else ""
+                for sNow in reversed(path):
+                    basePath += sNow.name()
+                    sNow.meta_path = basePath
+                    basePath += "."
+        for fragment in fragments:
+            for parentName, values in fragment.values.items():
+                sec = self.sections.get(parentName)
+                if sec is None:
+                    vName = next(iter(values))
+                    raise Exception(
+                        f"Failure to find meta_parent_section {parentName} of value {vName}"
+                    )
+                if sec.valueEntries:
+                    for vName in values.keys() & sec.valueEntries.keys():
+                        sec.addValue(values[vName], fragment.name, self)
+                sec.valueEntries.update(values)
+            for dName, dim in fragment.dimensions.items():
+                existing = self.dimensions.get(dName)
+                if existing is not None:
+                    raise Exception(
+                        f"Duplicated dimension {dName}: {dim} vs {existing} ({self.dictionariesOf(dName, metaType=MetaType.type_dimension)})"
+                    )
+                sec = self.sections.get(dim.meta_parent_section)
+                if sec is None:
+                    raise Exception(
+                        f"Failure to find meta_parent_section {dim.meta_parent_section} of dimension {dName}"
+                    )
+                self.dimensions[dName] = dim
+                sec.addDimension(dim, self)
+            for aName, entry in fragment.abstractTypes.items():
+                existing = self.abstractTypes.get(aName)
+                if existing is not None:
+                    raise Exception(
+                        f"Duplicated abstract type {aName}: {entry} vs {existing.abstract_type} ({self.dictionariesOf(aName, metaType=MetaType.type_abstract)})"
+                    )
+                self.abstractTypes[aName] = MetaSchemaAbstract.construct(
+                    {
+                        "dictionary": fragment.name,
+                        "abstract_type": entry,
+                        "sections": set(),
+                        "values": set(),
+                        "dimensions": set(),
+                        "abstractTypes": set(),
+                    },
+                    {
+                        "dictionary",
+                        "abstract_type",
+                        "sections",
+                        "values",
+                        "dimensions",
+                        "abstractTypes",
+                    },
+                )
+
     def injectSections(self):
-        """Injects the sections that need to be injected, cleans and recreates dataView from scratch"""
+        """Injects the sections that need to be injected, cleans and recreates dataView from scratch.
+		The copies in the data view are expanded with a work queue, each one is visited once. The sections to inject in a section depend only on its name and abstract types, and are computed once for each of them"""
         injectable = [sec for sec in self.sections.values() if sec.section.meta_inject]
         injectable.sort(key=lambda x: x.section.meta_name)
         nonRootInject = {sect.section.meta_name for sect in injectable}.difference(
             self.rootSections.keys()
         )
         secToInject = []
+        regexps = {}
         if nonRootInject:
             raise Exception(
                 f"Inject of non root sections {nonRootInject} not supported"
@@ -618,66 +874,77 @@ class MetaSchema(BaseModel):
         for sToI in injectable:
             for metaInject in sToI.section.meta_inject:
                 regexpStr = metaInject.meta_inject_if_section_regexp
+                regexp = None
                 if regexpStr:
-                    regexpStr2 = r"\A(?:" + regexpStr + r")\Z"
-                    try:
-                        regexp = re.compile(regexpStr2)
-                    except:
-                        raise Exception(
-                            f"Could not compile regexp {repr(regexpStr2)} from meta_inject_if_section_regexp of section {sec.section.meta_name}"
-                        )
-                else:
-                    regexp = re.compile(".*")
+                    regexp = regexps.get(regexpStr)
+                    if regexp is None:
+                        regexpStr2 = r"\A(?:" + regexpStr + r")\Z"
+                        try:
+                            regexp = re.compile(regexpStr2)
+                        except:
+                            raise Exception(
+                                f"Could not compile regexp {repr(regexpStr2)} from meta_inject_if_section_regexp of section {sToI.section.meta_name}"
+                            )
+                        regexps[regexpStr] = regexp
                 abstractTypesRequired = set()
                 abstractTypesToExclude = set()
                 if metaInject.meta_inject_if_abstract_type:
                     for aType in metaInject.meta_inject_if_abstract_type:
-                        if aType.startsWith("!"):
+                        if aType.startswith("!"):
                             abstractTypesToExclude.add(aType[1:])
                         else:
                             abstractTypesRequired.add(aType)
                 secToInject.append(
                     SectToInject(
-                        sToI, regexp, abstractTypesRequired, abstractTypesToExclude
+                        sToI,
+                        regexp,
+                        frozenset(abstractTypesRequired),
+                        frozenset(abstractTypesToExclude),
                     )
                 )
-
-        class InjectChecker(DataVisitor):
-            def __init__(self, schema):
-                self.schema = schema
-
-            def shouldVisitSection(self, path):
-                pastSectNames = [s.section.meta_name for s in path]
-                sec = path[-1]
-                if sec.section.meta_contains:
-                    for sName in sec.section.meta_contains:
-                        if sName in sec.subSections or sName in pastSectNames:
-                            continue
-                        sToAdd = self.schema.sections[sName]
-                        dottedPath = ".".join(pastSectNames)
-                        injectedSection = sToAdd.copyToInject(dottedPath)
-                        path[-1].subSections[sName] = injectedSection
-                        self.schema.sections[sec.name()].addPossibleInject(sName)
-                        pathsToCheck.append(path + [injectedSection])
-                for sToI in secToInject:
-                    if (
-                        sToI.sect.name() in sec.subSections
-                        or sToI.sect.name() in pastSectNames
-                    ):
+        # a single regexp matching if any of the regexps matches, to skip quickly the sections not matched by any.
+        # Joining renumbers the groups (and so changes the meaning of backreferences), so regexps with groups are always tested one by one
+        anyRegexp = None
+        if regexps and all(r.groups == 0 for r in regexps.values()):
+            try:
+                anyRegexp = re.compile(
+                    r"\A(?:" + "|".join(f"(?:{r})" for r in sorted(regexps)) + r")\Z"
+                )
+            except:
+                # the regexps cannot always be combined (for example if they use global inline flags)
+                anyRegexp = None
+        # the SectToInject (as indexes in secToInject) of each regexp, and the ones without regexp
+        byRegexp = {}
+        anySection = []
+        for i, sToI in enumerate(secToInject):
+            if sToI.sectRegexp is None:
+                anySection.append(i)
+            else:
+                byRegexp.setdefault(sToI.sectRegexp, []).append(i)
+        injectionsCache = {}
+
+        def injectionsFor(sec):
+            """returns the sections to inject in sec"""
+            sName = sec.section.meta_name
+            abstractTypes = frozenset(sec.section.meta_abstract_types)
+            key = (sName, abstractTypes)
+            res = injectionsCache.get(key)
+            if res is None:
+                candidates = list(anySection)
+                if anyRegexp is None or anyRegexp.match(sName):
+                    for regexp, indexes in byRegexp.items():
+                        if regexp.match(sName):
+                            candidates += indexes
+                candidates.sort()
+                res = []
+                for i in candidates:
+                    sToI = secToInject[i]
+                    if not sToI.requiredAbstract.issubset(abstractTypes):
                         continue
-                    if (
-                        sToI.sectRegexp.match(sec.section.meta_name)
-                        and sToI.abstractTypesRequired.issubset(sec.meta_abstract_types)
-                        and sToI.abstractTypesToExclude.isdisjoint(
-                            sec.meta_abstract_types
-                        )
-                    ):
-                        dottedPath = ".".join(pastSectNames)
-                        injectedSection = sToI.copyToInject(dottedPath)
-                        path[-1].subSections[sToI.sect.name()] = injectedSection
-                        self.schema.sections[sec.name()].addPossibleInject(sName)
-                        pathsToCheck.append(path + [injectedSection])
-                return True
+                    if sToI.excludedAbstract.isdisjoint(abstractTypes):
+                        res.append(sToI.sect)
+                injectionsCache[key] = res
+            return res
 
         # clean old
         self.dataView = {}
@@ -686,13 +953,33 @@ class MetaSchema(BaseModel):
         for sName, s in self.rootSections.items():
             self.dataView[sName] = s.copyToInject("")
 
-        pathsToCheck = [[sect] for sName, sect in sorted(self.dataView.items())]
-        pathsToCheck.sort(key=lambda x: x[0].section.meta_name)
-        visitor = InjectChecker(self)
+        # paths to visit, with the names of their sections
+        pathsToCheck = deque(
+            ([sect], (sName,)) for sName, sect in sorted(self.dataView.items())
+        )
         while pathsToCheck:
-            pathToCheck = pathsToCheck[0]
-            pathsToCheck = pathsToCheck[1:]
-            self.visitDataPath(pathToCheck, visitor)
+            path, pastSectNames = pathsToCheck.popleft()
+            sec = path[-1]
+            toAdd = []
+            if sec.section.meta_contains:
+                for sName in sec.section.meta_contains:
+                    sToAdd = self.sections.get(sName)
+                    if sToAdd is None:
+                        raise Exception(
+                            f"Section {sName} in meta_contains of {sec.name()} is not in the schema"
+                        )
+                    toAdd.append(sToAdd)
+            toAdd += injectionsFor(sec)
+            if toAdd:
+                dottedPath = ".".join(pastSectNames)
+                for sToAdd in toAdd:
+                    sName = sToAdd.name()
+                    if sName in sec.subSections or sName in pastSectNames:
+                        continue
+                    sec.subSections[sName] = sToAdd.copyToInject(dottedPath)
+                    self.sections[sec.name()].addPossibleInject(sName)
+            for sName, sub in sorted(sec.subSections.items()):
+                pathsToCheck.append((path + [sub], pastSectNames + (sName,)))
 
     def linkAbstracts(self):
         """links the usages of the abstract types with its abstract type"""
@@ -798,7 +1085,14 @@ class MetaSchema(BaseModel):
 
     @classmethod
     def forDictionary(cls, dictName: str, metaInfo: MetaInfo):
+        """returns a new schema of the dictionary dictName of metaInfo"""
+        return cls.build(dictName, metaInfo)
+
+    @classmethod
+    def build(cls, dictName: str, metaInfo: MetaInfo):
+        """builds a new schema for the dictionary dictName of metaInfo merging the fragments of its dependencies"""
         deps = metaInfo.depsOfDict(dictName)
+        cache = SchemaCache.of(metaInfo)
         schema = MetaSchema(
             metaInfo=metaInfo,
             mainDictionary=dictName,
@@ -809,9 +1103,9 @@ class MetaSchema(BaseModel):
             rootSections={},
             dataView={},
         )
-        for dep in deps:
-            dict = metaInfo.dictionaries[dep]
-            schema.addSchemaOfDictionary(dict)
+        schema.addFragments(
+            [cache.fragment(metaInfo.dictionaries[dep]) for dep in sorted(deps)]
+        )
         schema.injectSections()
         schema.linkAbstracts()
         return schema
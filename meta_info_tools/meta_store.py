@@ -0,0 +1,430 @@
+"""Compiled read-only store of the entries of a MetaInfo, accessed through mmap.
+Write it with writeMetaStore(metaInfo, path), and query it with MetaStore(path), which answers findMany, findOne,
+findSection, findByParent and depsOfDict like MetaInfo, building only the entries that are requested.
+
+The file layout (little endian) is:
+- header (storeHeader)
+- string offsets: nStrings+1 u64 offsets in the string data
+- string data: utf8 strings (names, parent sections and the json of entries and dictionary headers)
+- dictionary table: (name, header json) string indexes for each dictionary, sorted by name
+- entry table: fixed width records (storeEntry) with dictionary, name, parent section, json and type of each entry
+- name index: open addressing hash table (storeSlot) of meta_name -> postings
+- parent index: open addressing hash table (storeSlot) of (meta_parent_section, meta_name) -> postings (values and dimensions only)
+- postings: u32 entry indexes"""
+from .meta_info import *
+import io, mmap, os, struct, zlib
+
+storeMagic = b"METASTOR"
+# increase when the layout of the store changes
+storeFormatVersion = 2
+# magic, formatVersion, nStrings, nDicts, nEntries, nameSlots, parentSlots, nPostings,
+# stringOffsets, stringData, dictTable, entryTable, nameIndex, parentIndex, postings
+storeHeader = struct.Struct("<8s7I7Q")
+# dictIdx, name, parent, json, metaType
+storeEntry = struct.Struct("<IIIIB3x")
+# name (or parent), name (or noString), postings start, postings length
+storeSlot = struct.Struct("<IIII")
+storeDict = struct.Struct("<II")
+storeU32 = struct.Struct("<I")
+storeU64 = struct.Struct("<Q")
+noString = 0xFFFFFFFF
+storeMetaTypes = list(MetaType)
+storeMetaTypeCodes = {t: i for i, t in enumerate(storeMetaTypes)}
+
+
+def storeHash(*keys):
+    """stable hash of the given utf8 encoded keys (used by the hash indexes of the store)"""
+    h = 0
+    for k in keys:
+        h = zlib.crc32(k + b"\0", h)
+    return h
+
+
+def _hashTable(keys):
+    """returns the number of slots and the slots (key1, key2, start, length) for the given {(key1, key2): (start, length)}.
+	key1 and key2 are (string index, utf8 bytes), key2 might be None"""
+    nSlots = 1
+    while nSlots < 2 * len(keys):
+        nSlots *= 2
+    slots = [(noString, noString, 0, 0)] * nSlots
+    for (k1, k2), (start, length) in keys.items():
+        if k2 is None:
+            i = storeHash(k1[1]) & (nSlots - 1)
+        else:
+            i = storeHash(k1[1], k2[1]) & (nSlots - 1)
+        while slots[i][0] != noString:
+            i = (i + 1) & (nSlots - 1)
+        slots[i] = (k1[0], noString if k2 is None else k2[0], start, length)
+    return nSlots, slots
+
+
+def writeMetaStore(metaInfo, targetPath):
+    """compiles the dictionaries of metaInfo to a store at targetPath"""
+    strings = []
+    stringIdx = {}
+
+    def addString(s):
+        i = stringIdx.get(s)
+        if i is None:
+            i = len(strings)
+            b = s.encode("utf8")
+            stringIdx[s] = i
+            strings.append(b)
+        return (i, strings[i])
+
+    dicts = []
+    entries = []
+    byName = {}
+    byParent = {}
+    for dictIdx, dictName in enumerate(sorted(metaInfo.dictionaries)):
+        d = metaInfo.dictionaries[dictName]
+        header = d.copy(update={"meta_info_entry": [], "meta_info_entries_cache": None})
+        buf = io.StringIO()
+        header.write(buf, writeSource=True)
+        dicts.append((addString(dictName)[0], addString(buf.getvalue())[0]))
+        for e in d.meta_info_entry:
+            buf = io.StringIO()
+            e.write(buf)
+            name = addString(e.meta_name)
+            parent = getattr(e, "meta_parent_section", None)
+            if parent:
+                parent = addString(parent)
+            entryIdx = len(entries)
+            entries.append(
+                (
+                    dictIdx,
+                    name[0],
+                    parent[0] if parent else noString,
+                    addString(buf.getvalue())[0],
+                    storeMetaTypeCodes[e.meta_type],
+                )
+            )
+            byName.setdefault((name, None), []).append(entryIdx)
+            if parent and e.meta_type in (
+                MetaType.type_value,
+                MetaType.type_dimension,
+            ):
+                byParent.setdefault((parent, name), []).append(entryIdx)
+    postings = []
+
+    def addPostings(index):
+        res = {}
+        for k, idxs in index.items():
+            res[k] = (len(postings), len(idxs))
+            postings.extend(idxs)
+        return res
+
+    nameSlots, nameIndex = _hashTable(addPostings(byName))
+    parentSlots, parentIndex = _hashTable(addPostings(byParent))
+    pos = storeHeader.size
+    stringOffsetsPos = pos
+    pos += storeU64.size * (len(strings) + 1)
+    stringDataPos = pos
+    pos += sum(len(s) for s in strings)
+    dictTablePos = pos
+    pos += storeDict.size * len(dicts)
+    entryTablePos = pos
+    pos += storeEntry.size * len(entries)
+    nameIndexPos = pos
+    pos += storeSlot.size * nameSlots
+    parentIndexPos = pos
+    pos += storeSlot.size * parentSlots
+    postingsPos = pos
+    if (
+        len(strings) >= noString
+        or len(entries) >= noString
+        or len(postings) >= noString
+    ):
+        raise Exception(f"Too many strings or entries to write a store to {targetPath}")
+    dir = os.path.dirname(targetPath) or "."
+    os.makedirs(dir, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        dir=dir, prefix=".store", suffix=".tmp", delete=False
+    ) as outF:
+        try:
+            outF.write(
+                storeHeader.pack(
+                    storeMagic,
+                    storeFormatVersion,
+                    len(strings),
+                    len(dicts),
+                    len(entries),
+                    nameSlots,
+                    parentSlots,
+                    len(postings),
+                    stringOffsetsPos,
+                    stringDataPos,
+                    dictTablePos,
+                    entryTablePos,
+                    nameIndexPos,
+                    parentIndexPos,
+                    postingsPos,
+                )
+            )
+            offset = 0
+            outF.write(storeU64.pack(offset))
+            for s in strings:
+                offset += len(s)
+                outF.write(storeU64.pack(offset))
+            for s in strings:
+                outF.write(s)
+            for d in dicts:
+                outF.write(storeDict.pack(*d))
+            for e in entries:
+                outF.write(storeEntry.pack(*e))
+            for slot in nameIndex:
+                outF.write(storeSlot.pack(*slot))
+            for slot in parentIndex:
+                outF.write(storeSlot.pack(*slot))
+            outF.write(struct.pack(f"<{len(postings)}I", *postings))
+            os.chmod(
+                outF.name, stat.S_IWUSR | stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+            )
+        except:
+            raise Exception(
+                f"Failure trying to write store {targetPath}, leaving failed attempt in {outF.name}"
+            )
+    os.replace(outF.name, targetPath)
+
+
+class MetaStore:
+    """Read-only view of a store written by writeMetaStore.
+	The file is mapped in memory (so several processes using the same store share its pages), and entries are built only when requested (and then cached).
+	Answers the queries of MetaInfo (findMany, findOne, findSection, findByParent, depsOfDict)."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < storeHeader.size:
+                raise Exception(f"Invalid store {path}, file too short")
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            (
+                magic,
+                formatVersion,
+                self.nStrings,
+                self.nDicts,
+                self.nEntries,
+                self.nameSlots,
+                self.parentSlots,
+                self.nPostings,
+                self.stringOffsetsPos,
+                self.stringDataPos,
+                self.dictTablePos,
+                self.entryTablePos,
+                self.nameIndexPos,
+                self.parentIndexPos,
+                self.postingsPos,
+            ) = storeHeader.unpack_from(self.mm, 0)
+        except:
+            self.mm.close()
+            raise Exception(f"Invalid store {path}, file too short")
+        if magic != storeMagic or formatVersion != storeFormatVersion:
+            self.mm.close()
+            raise Exception(
+                f"Invalid store {path}, expected format {storeMagic} {storeFormatVersion}, got {magic} {formatVersion}"
+            )
+        try:
+            self.checkLayout()
+        except:
+            self.mm.close()
+            raise
+        self.dictNames = []
+        for i in range(self.nDicts):
+            nameIdx, headerIdx = storeDict.unpack_from(
+                self.mm, self.dictTablePos + i * storeDict.size
+            )
+            self.dictNames.append(self.string(nameIdx))
+        self.dictIndex = {n: i for i, n in enumerate(self.dictNames)}
+        self.headers = {}
+        self.entries = {}
+        self.depsCache = {}
+
+    def checkLayout(self):
+        """checks that the tables of the header follow each other and fill the file, so that a truncated store is rejected when opened"""
+        size = len(self.mm)
+        for nSlots in [self.nameSlots, self.parentSlots]:
+            if nSlots == 0 or nSlots & (nSlots - 1) != 0:
+                raise Exception(
+                    f"Invalid store {self.path}, index size {nSlots} is not a power of two"
+                )
+        pos = storeHeader.size
+        for tableName, tablePos, tableSize in [
+            (
+                "string offsets",
+                self.stringOffsetsPos,
+                storeU64.size * (self.nStrings + 1),
+            ),
+            ("string data", self.stringDataPos, None),
+            ("dictionary table", self.dictTablePos, storeDict.size * self.nDicts),
+            ("entry table", self.entryTablePos, storeEntry.size * self.nEntries),
+            ("name index", self.nameIndexPos, storeSlot.size * self.nameSlots),
+            ("parent index", self.parentIndexPos, storeSlot.size * self.parentSlots),
+            ("postings", self.postingsPos, storeU32.size * self.nPostings),
+        ]:
+            if tableSize is None:
+                # the last string offset (just before the string data) is the size of the string data
+                (tableSize,) = storeU64.unpack_from(self.mm, pos - storeU64.size)
+            if tablePos != pos or pos + tableSize > size:
+                raise Exception(
+                    f"Invalid store {self.path}, {tableName} at {tablePos} with size {tableSize} does not fit in a file of {size} bytes after {pos}"
+                )
+            pos += tableSize
+        if pos != size:
+            raise Exception(
+                f"Invalid store {self.path}, {size - pos} unexpected bytes at the end"
+            )
+
+    def close(self):
+        self.mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __reduce__(self):
+        # other processes map the file again
+        return (self.__class__, (self.path,))
+
+    def stringBytes(self, i):
+        """returns the utf8 bytes of the string with index i"""
+        start, end = struct.unpack_from(
+            "<QQ", self.mm, self.stringOffsetsPos + i * storeU64.size
+        )
+        return self.mm[self.stringDataPos + start : self.stringDataPos + end]
+
+    def string(self, i):
+        """returns the string with index i"""
+        return self.stringBytes(i).decode("utf8")
+
+    def entryRecord(self, i):
+        """returns the (dictIdx, name, parent, json, metaType) indexes of the entry i"""
+        return storeEntry.unpack_from(self.mm, self.entryTablePos + i * storeEntry.size)
+
+    def entry(self, i):
+        """returns the meta_info_entry i (built from the store at the first request)"""
+        e = self.entries.get(i)
+        if e is None:
+            jsonIdx = self.entryRecord(i)[3]
+            e = MetaInfoBase.fromDict(
+                loadsJson(self.stringBytes(jsonIdx)), trusted=True
+            )
+            self.entries[i] = e
+        return e
+
+    def postings(self, indexPos, nSlots, key1, key2=None):
+        """returns the indexes of the entries with the given key in the hash index at indexPos"""
+        k1 = key1.encode("utf8")
+        if key2 is None:
+            i = storeHash(k1) & (nSlots - 1)
+        else:
+            k2 = key2.encode("utf8")
+            i = storeHash(k1, k2) & (nSlots - 1)
+        while True:
+            s1, s2, start, length = storeSlot.unpack_from(
+                self.mm, indexPos + i * storeSlot.size
+            )
+            if s1 == noString:
+                return ()
+            if self.stringBytes(s1) == k1 and (
+                key2 is None or self.stringBytes(s2) == k2
+            ):
+                return struct.unpack_from(
+                    f"<{length}I", self.mm, self.postingsPos + start * storeU32.size
+                )
+            i = (i + 1) & (nSlots - 1)
+
+    def dictionaryIndexes(self, dictionaryNames):
+        """returns the set of indexes of the dictionaries in dictionaryNames (None if no restriction is requested)"""
+        if not dictionaryNames:
+            return None
+        return set(self.dictIndex[n] for n in dictionaryNames if n in self.dictIndex)
+
+    def select(self, idxs, metaType, dictionaryNames):
+        dictIdxs = self.dictionaryIndexes(dictionaryNames)
+        res = []
+        for i in idxs:
+            dictIdx, name, parent, jsonIdx, typeCode = self.entryRecord(i)
+            if metaType and storeMetaTypes[typeCode] != metaType:
+                continue
+            if dictIdxs is not None and dictIdx not in dictIdxs:
+                continue
+            res.append(EntryDict(self.entry(i), self.dictNames[dictIdx]))
+        return res
+
+    def findMany(self, metaName, metaType=None, dictionaryNames=None):
+        """Finds all entries with the given name, and returns a list of (entry,dinctionaryName) tuples.
+		If metaType or dictionaryNames are given, filters them accordingly."""
+        idxs = self.postings(self.nameIndexPos, self.nameSlots, metaName)
+        return self.select(idxs, metaType, dictionaryNames)
+
+    def findByParent(
+        self, parentSection, metaName, metaType=None, dictionaryNames=None
+    ):
+        """Finds the values and dimensions with the given meta_parent_section and name, and returns a list of (entry,dinctionaryName) tuples.
+		If metaType or dictionaryNames are given, filters them accordingly."""
+        idxs = self.postings(
+            self.parentIndexPos, self.parentSlots, parentSection, metaName
+        )
+        return self.select(idxs, metaType, dictionaryNames)
+
+    findOne = MetaInfo.findOne
+    findSection = MetaInfo.findSection
+
+    def dictionaryHeader(self, dictName):
+        """returns the MetaDictionary dictName without its entries"""
+        d = self.headers.get(dictName)
+        if d is None:
+            i = self.dictIndex.get(dictName)
+            if i is None:
+                raise Exception(
+                    f"Dictionary named {dictName} is not in store {self.path}"
+                )
+            nameIdx, headerIdx = storeDict.unpack_from(
+                self.mm, self.dictTablePos + i * storeDict.size
+            )
+            d = MetaDictionary.fromDict(
+                loadsJson(self.stringBytes(headerIdx)), trusted=True
+            )
+            self.headers[dictName] = d
+        return d
+
+    def depsOfDict(self, dictName):
+        """returns a set with the names of the dependent dictionaries of dictName (including dictName)"""
+        cached = self.depsCache.get(dictName)
+        if cached is not None:
+            return set(cached)
+        deps = set([dictName])
+        depsToDo = set([dictName])
+        while depsToDo:
+            dictNow = depsToDo.pop()
+            if dictNow not in self.dictIndex:
+                if dictNow == dictName:
+                    raise Exception(
+                        f"Dictionary named {dictName} is not in store {self.path}"
+                    )
+                else:
+                    raise Exception(
+                        f"missing dependency {dictNow} of {dictName} in store {self.path}"
+                    )
+            for dep in self.dictionaryHeader(dictNow).metadict_required:
+                name = dep.metadict_required_name
+                if name not in deps:
+                    deps.add(name)
+                    depsToDo.add(name)
+        self.depsCache[dictName] = frozenset(deps)
+        return deps
+
+    def metaInfo(self):
+        """returns a MetaInfo with all the dictionaries of the store (building all their entries)"""
+        entries = [EntryList() for n in self.dictNames]
+        for i in range(self.nEntries):
+            entries[self.entryRecord(i)[0]].append(self.entry(i))
+        mInfo = MetaInfo.empty()
+        for dictName, dictEntries in zip(self.dictNames, entries):
+            d = self.dictionaryHeader(dictName).copy()
+            d.meta_info_entry = dictEntries
+            mInfo.addMetaDict(d)
+        return mInfo
@@ -1,10 +1,26 @@
 import os
-from .meta_info import MetaInfo, MetaDictionary, writeFile, jdf
+from .meta_info import (
+    MetaInfo,
+    MetaDictionary,
+    writeFile,
+    writeStats,
+    safeRemove,
+    jdf,
+    loadJson,
+    loadsJson,
+    setJsonBackend,
+    dictionaryDiscovery,
+    explodedDigest,
+    fileDigest,
+)
+from .meta_cache import enableDictionaryCache
+from .meta_store import writeMetaStore
 from .meta_schema import MetaSchema
 from .meta_html import SiteWriter
 from .meta_check import doChecks, NameCheckLevel, ClashKinds, ClashException
 from .meta_json_schema import JsonSchemaDumper
-import logging
+import concurrent.futures, multiprocessing
+import hashlib, logging, traceback
 import shutil
 import json
 import jsonschema
@@ -40,13 +56,140 @@ def cleanDir(dir, maxDepth=4):
                 logging.exception(f"error cleaning up {dPath}")
 
 
+# name of the file recording the state of the last cascade in each directory
+manifestName = ".cascade-manifest.json"
+# increase when the meaning of the manifest entries (or the canonical format) changes
+manifestVersion = 1
+
+
+class CascadeManifest:
+    """The digests recorded per dictionary by the last cascade in a directory (stored in <dir>/.cascade-manifest.json).
+	get returns the entry of the previous run, set records the one of the current run (entries not set are dropped on save)"""
+
+    def __init__(self, dir, enabled=True):
+        self.dir = dir
+        self.path = os.path.join(dir, manifestName) if dir else None
+        self.entries = {}
+        self.newEntries = {}
+        if enabled and self.path and os.path.isfile(self.path):
+            try:
+                m = loadJson(self.path)
+                if m.get("version") == manifestVersion:
+                    self.entries = m.get("dictionaries", {})
+            except:
+                logging.exception(f"ignoring invalid manifest {self.path}")
+
+    def get(self, name):
+        return self.entries.get(name, {})
+
+    def set(self, name, **values):
+        self.newEntries.setdefault(name, {}).update(values)
+
+    def save(self):
+        if not self.path or not os.path.isdir(self.dir):
+            return
+        tmpPath = self.path + ".tmp"
+        with open(tmpPath, "w", encoding="utf8") as outF:
+            jdf({"version": manifestVersion, "dictionaries": self.newEntries}, outF)
+        os.replace(tmpPath, self.path)
+
+
+def stateDigest(names, digests, deps, settings):
+    """digest of the dictionaries names, their transitive dependencies and the settings (None if a digest is unknown)"""
+    closure = set()
+    toDo = list(names)
+    while toDo:
+        n = toDo.pop()
+        if n in closure:
+            continue
+        if digests.get(n) is None or n not in deps:
+            return None
+        closure.add(n)
+        toDo.extend(deps[n])
+    m = hashlib.sha256(repr(settings).encode("utf8"))
+    for n in sorted(closure):
+        m.update(f"\0{n}\0{digests[n]}".encode("utf8"))
+    return m.hexdigest()
+
+
+def cascadeStages(mInfo, args, dName, checks, targetDir):
+    """runs the checks (if checks) and writes the documentation to targetDir (if given) of the dictionary dName of mInfo.
+	Returns the formatted exceptions of the checks and of the documentation (None if they succeeded or were not done)"""
+    checksError = None
+    docsError = None
+    schema = None
+    if checks or targetDir:
+        try:
+            schema = MetaSchema.forDictionary(dName, mInfo)
+        except:
+            checksError = docsError = traceback.format_exc()
+    if checks and schema:
+        try:
+            checkWithArgs(schema, args)
+        except:
+            checksError = traceback.format_exc()
+    if targetDir and schema:
+        try:
+            siteWriter = SiteWriter(schema, targetDir, katex=args.katex)
+            siteWriter.writeAll()
+            siteWriter.cleanupUnknown()
+        except:
+            docsError = traceback.format_exc()
+    return (checksError, docsError)
+
+
+# (mInfo, args) of the parallel cascade, inherited by the forked workers
+_cascadeState = None
+
+
+def _cascadeTask(task):
+    """runs cascadeStages in a forked worker, returns the errors and the number of files written and skipped"""
+    mInfo, args = _cascadeState
+    written0, skipped0 = writeStats.counts()
+    errors = cascadeStages(mInfo, args, *task)
+    written, skipped = writeStats.counts()
+    return errors + (written - written0, skipped - skipped0)
+
+
 def cascade(
-    explodedDir, dictionaryDir, docsDir, args, deleteOldBk=False, continueOnError=True
+    explodedDir,
+    dictionaryDir,
+    docsDir,
+    args,
+    deleteOldBk=False,
+    continueOnError=True,
+    useManifest=True,
+    jobs=1,
 ):
-    """Reformats and propagate from exploded to single file dictionaries"""
+    """Reformats and propagate from exploded to single file dictionaries.
+	The stages of the dictionaries whose inputs and transitive dependencies did not change since the last run (as recorded in the .cascade-manifest.json of each directory) are skipped, unless useManifest is false.
+	With jobs > 1 the checks and documentation of the dictionaries are done by a pool of forked processes"""
+    written0, skipped0 = writeStats.counts()
     explodedDone = set()
     dictDone = set()
     mInfo = MetaInfo(dictionaries={}, metaNameInDicts={})
+    explodedManifest = CascadeManifest(explodedDir, useManifest)
+    dictManifest = CascadeManifest(dictionaryDir, useManifest)
+    docsManifest = CascadeManifest(docsDir, useManifest)
+    # the checks are recorded with the single file dictionaries (or with the exploded ones if there are none)
+    checksManifest = dictManifest if dictionaryDir else explodedManifest
+    # per dictionary: digest of its canonical content, names of its dependencies, path to load it from, skipped stages
+    digests = {}
+    deps = {}
+    paths = {}
+    skipped = {}
+
+    def record(d, digest, path):
+        digests[d.metadict_name] = digest
+        deps[d.metadict_name] = [r.metadict_required_name for r in d.metadict_required]
+        paths[d.metadict_name] = path
+
+    def recordSkipped(name, m, path, stage):
+        digests[name] = m.get("output", m.get("input"))
+        deps[name] = m.get("deps", [])
+        paths[name] = path
+        skipped.setdefault(name, []).append(stage)
+
     if deleteOldBk:
         dirToClean = []
         if explodedDir:
@@ -58,39 +201,98 @@ def cascade(
         for dir in dirToClean:
             cleanDir(dir)
     if explodedDir:
-        for dFile in os.listdir(explodedDir):
+        listing = dictionaryDiscovery.listing(explodedDir)
+        for dFile in listing.others:
+            if not dFile.startswith("."):
+                logging.warning(f"Ignoring unknown entry {dFile}")
+        for found in listing.found:
+            dFile = os.path.basename(found.path)
+            if not found.exploded:
+                logging.warning(f"Ignoring unknown entry {dFile}")
+                continue
             try:
-                if not dFile.endswith(".meta_dictionary"):
-                    logging.warning(f"Ignoring unknown entry {dFile}")
-                else:
-                    dPath = os.path.join(explodedDir, dFile)
-                    d = MetaDictionary.loadAtPath(dPath)
-                    d.standardize()
-                    mInfo.addMetaDict(d)
-                    d.writeExploded(explodedDir)
-                    if d.metadict_name + ".meta_dictionary" != dFile:
-                        safeRemove([dPath])
-                    explodedDone.add(d.metadict_name)
+                dPath = found.path
+                m = explodedManifest.get(found.name)
+                jsonPath = None
+                if dictionaryDir:
+                    jsonPath = os.path.join(
+                        dictionaryDir, found.name + ".meta_dictionary.json"
+                    )
+                # a run without dictionaryDir records no output, and then the json must still be written
+                if (
+                    m
+                    and m.get("input") == explodedDigest(dPath)
+                    and (
+                        not jsonPath
+                        or (
+                            m.get("output") is not None
+                            and m.get("output") == fileDigest(jsonPath)
+                        )
+                    )
+                ):
+                    explodedManifest.set(found.name, **m)
+                    recordSkipped(found.name, m, jsonPath or dPath, "reformat")
+                    explodedDone.add(found.name)
+                    if dictionaryDir:
+                        dictManifest.set(found.name, input=m["output"], deps=m["deps"])
+                        dictDone.add(found.name)
+                    continue
+                d = MetaDictionary.loadAtPath(dPath)
+                d.standardize()
+                mInfo.addMetaDict(d)
+                d.writeExploded(explodedDir)
+                if d.metadict_name + ".meta_dictionary" != dFile:
+                    safeRemove([dPath])
+                explodedDone.add(d.metadict_name)
+                newPath = os.path.join(
+                    explodedDir, d.metadict_name + ".meta_dictionary"
+                )
+                digest = explodedDigest(newPath)
+                outDigest = None
                 if dictionaryDir:
                     dPath = os.path.join(
                         dictionaryDir, d.metadict_name + ".meta_dictionary.json"
                     )
                     writeFile(dPath, lambda f: d.write(f))
                     dictDone.add(d.metadict_name)
+                    outDigest = fileDigest(dPath)
+                    dictManifest.set(
+                        d.metadict_name,
+                        input=outDigest,
+                        deps=[r.metadict_required_name for r in d.metadict_required],
+                    )
+                record(d, outDigest or digest, dPath if dictionaryDir else newPath)
+                explodedManifest.set(
+                    d.metadict_name,
+                    input=digest,
+                    output=outDigest,
+                    deps=deps[d.metadict_name],
+                )
             except:
                 if continueOnError:
                     logging.exception(f"Error handling {dFile}")
                 else:
                     raise Exception(f"Error handling {dFile}")
     if dictionaryDir:
-        for dFile in os.listdir(dictionaryDir):
+        listing = dictionaryDiscovery.listing(dictionaryDir)
+        for dFile in listing.others:
+            if not dFile.endswith(".bk") and not dFile.startswith("."):
+                logging.warning(f"Ignoring unexpected entry {dFile}")
+        for found in listing.found:
+            dFile = os.path.basename(found.path)
+            if found.exploded:
+                logging.warning(f"Ignoring unexpected entry {dFile}")
+                continue
             try:
-                name = dFile[: -len(".meta_dictionary.json")]
-                if not dFile.endswith(".meta_dictionary.json"):
-                    if not dFile.endswith(".bk"):
-                        logging.warning(f"Ignoring unexpected entry {dFile}")
-                elif name not in dictDone:
-                    dPath = os.path.join(dictionaryDir, dFile)
+                name = found.name
+                if name not in dictDone:
+                    dPath = found.path
+                    m = dictManifest.get(name)
+                    if m and m.get("input") == fileDigest(dPath):
+                        dictManifest.set(name, **m)
+                        recordSkipped(name, m, dPath, "reformat")
+                        dictDone.add(name)
+                        continue
                     d = MetaDictionary.loadAtPath(dPath)
                     d.standardize()
                     mInfo.addMetaDict(d)
@@ -101,46 +303,155 @@ def cascade(
                     dictDone.add(d.metadict_name)
                     if name != d.metadict_name:
                         safeRemove([dPath])
+                    digest = fileDigest(dOutPath)
+                    record(d, digest, dOutPath)
+                    dictManifest.set(
+                        d.metadict_name, input=digest, deps=deps[d.metadict_name]
+                    )
             except:
                 if continueOnError:
                     logging.exception(f"Error handling {dFile}")
                 else:
                     raise Exception(f"Error handling {dFile}")
-    # do checks
-    for dName, d in sorted(mInfo.dictionaries.items()):
+
+    def ensureLoaded(name):
+        """loads the dictionary name and its dependencies (if their loading was skipped)"""
+        toDo = [name]
+        while toDo:
+            n = toDo.pop()
+            d = mInfo.dictionaries.get(n)
+            if d is None:
+                if n not in paths:
+                    continue  # missing dependency, reported when building the schema
+                d = MetaDictionary.loadAtPath(paths[n])
+                mInfo.addMetaDict(d)
+            for r in d.metadict_required:
+                if r.metadict_required_name not in mInfo.dictionaries:
+                    toDo.append(r.metadict_required_name)
+
+    # plan the checks and the documentation of each dictionary
+    checkSettings = [
+        getattr(args, a, None)
+        for a in ["name_check", "name_clashes", "name_clashes_warn"]
+    ]
+    docsSettings = [getattr(args, "katex", None)]
+    checkKeys = {}
+    docsKeys = {}
+    tasks = []
+    for dName in sorted(digests):
+        key = stateDigest([dName], digests, deps, checkSettings)
+        checkKeys[dName] = key
+        checks = True
+        if key is not None and checksManifest.get(dName).get("checks") == key:
+            checksManifest.set(dName, checks=key)
+            skipped.setdefault(dName, []).append("checks")
+            checks = False
+        targetDir = None
+        if docsDir:
+            targetDir = os.path.join(docsDir, dName)
+            key = stateDigest([dName], digests, deps, docsSettings)
+            docsKeys[dName] = key
+            if (
+                key is not None
+                and docsManifest.get(dName).get("docs") == key
+                and os.path.isdir(targetDir)
+            ):
+                docsManifest.set(dName, docs=key)
+                skipped.setdefault(dName, []).append("docs")
+                targetDir = None
+        if checks or targetDir:
+            tasks.append((dName, checks, targetDir))
+    docsFailed = set()
+    docsWritten = False
+
+    def report(task, checksError, docsError):
+        """records the outcome of the checks and documentation of a dictionary"""
+        nonlocal docsWritten
+        dName, checks, targetDir = task
+        if checks:
+            if checksError is None:
+                if checkKeys[dName] is not None:
+                    checksManifest.set(dName, checks=checkKeys[dName])
+            elif continueOnError:
+                logging.error(
+                    f"Failure when checking dictionary {dName}.\n{checksError}"
+                )
+            else:
+                raise Exception(
+                    f"Failure when checking dictionary {dName}.\n{checksError}"
+                )
+        if targetDir:
+            docsWritten = True
+            if docsError is None:
+                if docsKeys[dName] is not None:
+                    docsManifest.set(dName, docs=docsKeys[dName])
+            else:
+                docsFailed.add(dName)
+                logging.error(
+                    f"Failure when generating documentation for dictionary {dName}.\n{docsError}"
+                )
+
+    # load everything before running the stages, so that forked workers share it
+    toRun = []
+    for task in tasks:
         try:
-            schema = MetaSchema.forDictionary(dName, mInfo)
-            checkWithArgs(schema, args)
+            ensureLoaded(task[0])
+            toRun.append(task)
         except:
-            if continueOnError:
-                logging.exception(f"Failure when checking dictionary {dName}.")
-            else:
-                raise Exception(f"Failure when checking dictionary {dName}.")
+            error = traceback.format_exc()
+            report(task, error, error)
+    jobs = min(jobs or 1, len(toRun))
+    if jobs > 1 and "fork" not in multiprocessing.get_all_start_methods():
+        logging.warning(
+            "parallel cascade needs the fork start method, running serially"
+        )
+        jobs = 1
+    if jobs > 1:
+        global _cascadeState
+        _cascadeState = (mInfo, args)
+        try:
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers=jobs, mp_context=multiprocessing.get_context("fork")
+            ) as pool:
+                futures = [pool.submit(_cascadeTask, task) for task in toRun]
+                for task, future in zip(toRun, futures):
+                    try:
+                        checksError, docsError, nWritten, nSkipped = future.result()
+                        writeStats.addCounts(nWritten, nSkipped)
+                    except:
+                        checksError = docsError = traceback.format_exc()
+                    report(task, checksError, docsError)
+        finally:
+            _cascadeState = None
+    else:
+        for task in toRun:
+            report(task, *cascadeStages(mInfo, args, *task))
     if docsDir:
         indexBody = ['<h1>Documentation for dictionaries</h1>\n<ul class="index">\n']
         regenPaths = []
-        siteWriter = None
-        for dName, d in sorted(mInfo.dictionaries.items()):
-            try:
-                schema = MetaSchema.forDictionary(dName, mInfo)
-                targetDir = os.path.join(docsDir, dName)
-                siteWriter = SiteWriter(schema, targetDir, katex=args.katex)
-                siteWriter.writeAll()
-                siteWriter.cleanupUnknown()
-                indexBody.append(
-                    f'<li><label class="index">{dName}</label> <a href="{dName}/index.html" target="_top">frames</a>, <a href="{dName}/schema_info.html" target="_top">no frames</a></li>\n'
-                )
-                regenPaths.append(targetDir)
-            except:
-                logging.exception(
-                    f"Failure when generating documentation for dictionary {dName}."
-                )
+        for dName in sorted(digests):
+            if dName in docsFailed:
+                continue
+            indexBody.append(
+                f'<li><label class="index">{dName}</label> <a href="{dName}/index.html" target="_top">frames</a>, <a href="{dName}/schema_info.html" target="_top">no frames</a></li>\n'
+            )
+            regenPaths.append(os.path.join(docsDir, dName))
         indexBody.append("</ul>\n")
-        if siteWriter:
+        indexKey = stateDigest(
+            [os.path.basename(p) for p in regenPaths], digests, deps, docsSettings
+        )
+        # the index page is recorded in the manifest of the docs as "index.html"
+        if (
+            docsWritten
+            or indexKey is None
+            or docsManifest.get("index.html").get("index") != indexKey
+        ):
+            siteWriter = SiteWriter(None, docsDir, katex=args.katex)
             siteWriter.resetToPath(docsDir)
             if regenPaths:
                 for d in regenPaths:
                     siteWriter.addGeneratedPath(d)
+                siteWriter.addGeneratedPath(os.path.join(docsDir, manifestName))
                 indexPath = os.path.join(docsDir, "index.html")
                 siteWriter.writeLayout(
                     indexPath,
@@ -149,6 +460,19 @@ def cascade(
                     title="Schemas Index",
                 )
             siteWriter.cleanupUnknown()
+        if indexKey is not None:
+            docsManifest.set("index.html", index=indexKey)
+    for manifest in [explodedManifest, dictManifest, docsManifest]:
+        manifest.save()
+    for dName in sorted(digests):
+        stages = skipped.get(dName)
+        logging.info(
+            f"cascade {dName}: skipped {', '.join(stages) if stages else 'no stage'}"
+        )
+    nWritten, nSkipped = writeStats.counts()
+    logging.info(
+        f"cascade wrote {nWritten - written0} changed files, skipped {nSkipped - skipped0} unchanged files"
+    )
 
 
 def cascadeCmd(args):
@@ -170,6 +494,8 @@ def cascadeCmd(args):
         args.docs_directory,
         deleteOldBk=args.delete_old_bk,
         continueOnError=args.continue_on_error,
+        useManifest=not args.force,
+        jobs=args.jobs,
         args=args,
     )
 
@@ -233,10 +559,20 @@ def docCmd(args):
             logging.exception(f"documenting {inF}")
 
 
+def storeCmd(args):
+    mInfo, d = MetaInfo.withPath(
+        args.inPath, extraPaths=args.extra_path, loadAll=args.all
+    )
+    target = args.output
+    if not target:
+        target = d.metadict_name + ".meta_store"
+    writeMetaStore(mInfo, target)
+    logging.info(f"wrote {len(mInfo.dictionaries)} dictionaries to store {target}")
+
+
 def validateCmd(args):
     if args.read_json_schema:
-        with open(args.read_json_schema, encoding="utf8") as fIn:
-            jSchema = json.load(fIn)
+        jSchema = loadJson(args.read_json_schema)
     else:
         if not args.main_dictionary_path:
             raise Exception(
@@ -260,13 +596,12 @@ def validateCmd(args):
     if args.pathsToValidate:
         for p in args.pathsToValidate:
             try:
-                with open(p, encoding="utf8") as fIn:
-                    toV = json.load(fIn)
+                toV = loadJson(p)
                 jsonschema.validate(toV, jSchema)
             except:
                 logging.exception(f"Error validating {p}.")
     if args.from_stdin:
-        toV = json.load(sys.stdin)
+        toV = loadsJson(sys.stdin.buffer.read())
         jsonschema.validate(toV, jSchema)
 
 
@@ -391,6 +726,22 @@ if __name__ == "__main__":
     parser.add_argument(
         "--verbose", help="increases the logging level", action="store_true"
     )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=os.environ.get("META_INFO_TOOLS_CACHE_DIR"),
+        help="directory where to cache the parsed dictionaries to speed up later runs (defaults to the environment variable META_INFO_TOOLS_CACHE_DIR, if not set no cache is used)",
+    )
+    parser.add_argument(
+        "--json-backend",
+        choices=["json", "orjson"],
+        help="json parser to use (defaults to orjson if installed, json otherwise)",
+    )
+    parser.add_argument(
+        "--streaming-threshold",
+        type=int,
+        help="size in MiB from which single file dictionaries are streamed while loading them, using less memory but more time (by default they are never streamed)",
+    )
     subparsers = parser.add_subparsers(help="sub-command help")
     # create the parser for the "cascade" command
     parser_cascade = subparsers.add_parser(
@@ -412,6 +763,17 @@ if __name__ == "__main__":
     )
     parser_cascade.add_argument("--delete-old-bk", action="store_true")
     parser_cascade.add_argument("--continue-on-error", action="store_true")
+    parser_cascade.add_argument(
+        "--force",
+        action="store_true",
+        help="ignores the .cascade-manifest.json files and redoes all the stages for all dictionaries",
+    )
+    parser_cascade.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of processes used for the checks and the documentation of the dictionaries",
+    )
     parser_cascade.add_argument(
         "--docs-directory",
         type=str,
@@ -473,6 +835,28 @@ if __name__ == "__main__":
     )
     parser_doc.add_argument("--delete-old-bk", action="store_true")
     parser_doc.set_defaults(func=docCmd)
+    # create the parser for the "store" command
+    parser_store = subparsers.add_parser(
+        "store", help="compiles a dictionary and its dependencies to a read-only store",
+    )
+    parser_store.add_argument("inPath", type=str, help="the dictionary to compile")
+    parser_store.add_argument(
+        "--extra-path",
+        type=str,
+        action="append",
+        help="extra path to load dependencies",
+    )
+    parser_store.add_argument(
+        "--all",
+        action="store_true",
+        help="includes all the dictionaries found in the directory of inPath (the extra paths are used only for the dependencies)",
+    )
+    parser_store.add_argument(
+        "--output",
+        type=str,
+        help="path of the store (defaults to <dictionary name>.meta_store)",
+    )
+    parser_store.set_defaults(func=storeCmd)
     # create the parser for the "check" command
     parser_check = subparsers.add_parser("check", help="Checks the given dictionary")
     parser_check.add_argument(
@@ -537,6 +921,12 @@ if __name__ == "__main__":
     args = parser.parse_args()
     if not args.verbose:
         console.setLevel(logging.WARN)
+    if args.json_backend:
+        setJsonBackend(args.json_backend)
+    if args.cache_dir:
+        enableDictionaryCache(args.cache_dir)
+    if args.streaming_threshold is not None:
+        setStreamingThreshold(args.streaming_threshold * 2 ** 20)
     if not hasattr(args, "func"):
         parser.print_help()
     else:
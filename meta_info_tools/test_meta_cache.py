@@ -0,0 +1,47 @@
+import unittest
+from .meta_cache import *
+from .meta_info import MetaDictionary, setDictionaryCache, setInterning, writeFile
+from .test_meta_info import metaMetaDict
+import os, time
+import tempfile, shutil
+
+
+class TestMetaCache(unittest.TestCase):
+    """tests the on disk dictionary cache"""
+
+    def test_dictionary_cache(self):
+        "cached dictionaries are equal to the loaded ones, and changes invalidate them"
+        tempDir = tempfile.mkdtemp(suffix="testMetaCache")
+        try:
+            cache = enableDictionaryCache(os.path.join(tempDir, "cache"))
+            mDict = metaMetaDict()
+            jsonPath = os.path.join(tempDir, "meta.meta_dictionary.json")
+            writeFile(jsonPath, lambda outF: mDict.write(outF))
+            mDict.writeExploded(tempDir)
+            explodedPath = os.path.join(tempDir, "meta.meta_dictionary")
+            # the identifiers of the cached dictionaries are interned too
+            setInterning(True)
+            for p in [jsonPath, explodedPath]:
+                d1 = MetaDictionary.loadAtPath(p)
+                d2 = MetaDictionary.loadAtPath(p)
+                self.assertEqual(d1, d2)
+                self.assertIs(
+                    d1.meta_info_entry[0].meta_name, d2.meta_info_entry[0].meta_name
+                )
+            setInterning(False)
+            self.assertEqual((cache.hits, cache.misses), (2, 2))
+            mDict.metadict_version = "3.0.0"
+            mDict.writeExploded(tempDir)
+            os.utime(jsonPath, ns=(0, 0))
+            d3 = MetaDictionary.loadAtPath(explodedPath)
+            self.assertEqual(d3.metadict_version, "3.0.0")
+            MetaDictionary.loadAtPath(jsonPath)
+            self.assertEqual((cache.hits, cache.misses), (2, 4))
+        finally:
+            setDictionaryCache(None)
+            setInterning(False)
+            shutil.rmtree(tempDir)
+
+
+if __name__ == "__main__":
+    unittest.main()
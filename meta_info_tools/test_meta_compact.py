@@ -0,0 +1,43 @@
+import unittest
+from .meta_compact import *
+from .meta_schema import MetaSchema
+from .test_meta_info import metaMetaDict, metaMetaInfo, metaDictJson
+import io
+import json
+import pickle
+
+
+class TestMetaCompact(unittest.TestCase):
+    """tests the compact entry representation"""
+
+    def test_compact_entries(self):
+        "compact entries have the same values and serialization as the pydantic ones"
+        mDict = metaMetaDict()
+        rawEntries = json.loads(metaDictJson)["meta_info_entry"]
+        for entry, raw in zip(mDict.meta_info_entry, rawEntries):
+            cEntry = compactEntryFromDict(raw)
+            self.assertEqual(cEntry, compactEntry(entry))
+            self.assertEqual(str(cEntry), str(entry))
+            self.assertEqual(cEntry.allSetKeys(), entry.allSetKeys())
+            self.assertEqual(cEntry.entryId(), entry.entryId())
+            self.assertEqual(cEntry.toModel(), entry)
+            self.assertEqual(pickle.loads(pickle.dumps(cEntry)), cEntry)
+            self.assertFalse(hasattr(cEntry, "__dict__"))
+            with self.assertRaises(AttributeError):
+                cEntry.meta_name = "changed"
+
+    def test_compact_schema(self):
+        "a schema of compact dictionaries is equal to the one of pydantic dictionaries"
+        schemas = []
+        for metaI in [metaMetaInfo(), compactMetaInfo(metaMetaInfo())]:
+            schema = MetaSchema.forDictionary(dictName="meta", metaInfo=metaI)
+            outF = io.StringIO()
+            schema.writeSchema(outF)
+            schemas.append(outF.getvalue())
+        self.assertEqual(schemas[0], schemas[1])
+        section = schema.sections["meta_dictionary"].section
+        self.assertIsInstance(section, CompactSection)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,6 +2,8 @@ import unittest
 from .meta_info import *
 import io
 import json
+import tempfile, shutil, math, random
+from unittest import mock
 
 metaDictJson = r"""{
   "metadict_name": "meta",
@@ -588,6 +590,176 @@ def metaMetaInfo():
     return metaI
 
 
+# field by field writers of the canonical json
+# (reference implementation of the format for the single pass serializer of meta_info)
+
+
+def _refWriteRequired(outF, r, indent=0):
+    ii = (indent + 2) * " "
+    outF.write(f'{{\n{ii}"metadict_required_name": {jd(r.metadict_required_name)}')
+    if r.metadict_required_version is not None:
+        outF.write(
+            f',\n{ii}"metadict_required_version": {jd(r.metadict_required_version)}'
+        )
+    outF.write("\n" + (indent * " ") + "}")
+
+
+def _refWriteDimension(outF, d, indent=0):
+    ii = (indent + 2) * " "
+    outF.write("{")
+    comma = ""
+    if d.meta_dimension_fixed is not None:
+        outF.write(f'\n{ii}"meta_dimension_fixed": {jd(d.meta_dimension_fixed)}')
+        comma = ","
+    if d.meta_dimension_symbolic:
+        outF.write(
+            f'{comma}\n{ii}"meta_dimension_symbolic": {jd(d.meta_dimension_symbolic)}'
+        )
+    outF.write("\n" + (indent * " ") + "}")
+
+
+def _refWriteInject(outF, i, indent=0):
+    ii = (indent + 2) * " "
+    outF.write("{")
+    comma = ""
+    for key in ["meta_inject_if_abstract_type", "meta_inject_if_section_regexp"]:
+        if getattr(i, key):
+            outF.write(f'{comma}\n{ii}"{key}": {jd(getattr(i, key))}')
+            comma = ","
+    outF.write(f"\n{ii}}}")
+
+
+def _refWriteEnum(outF, e, indent=0):
+    ii = (indent + 2) * " "
+    outF.write(f'{{\n{ii}"meta_enum_value": {jd(e.meta_enum_value)}')
+    outF.write(f',\n{ii}"meta_enum_description": ')
+    writeStrMaybeList(outF, e.meta_enum_description, indent=indent + 2)
+    outF.write("\n" + (indent * " ") + "}")
+
+
+def _refWriteQueryEnum(outF, q, indent=0):
+    ii = (indent + 2) * " "
+    outF.write(f'{{\n{ii}"meta_query_expansion": {jd(q.meta_query_expansion)}')
+    if q.meta_query_values:
+        outF.write(f',\n{ii}"meta_query_values": {jd(q.meta_query_values)}')
+    if q.meta_query_regexp:
+        outF.write(f',\n{ii}"meta_query_regexp": {jd(q.meta_query_regexp)}')
+    outF.write("\n" + (indent * " ") + "}")
+
+
+def _refWriteRange(outF, r, indent=0):
+    ii = (indent + 2) * " "
+    outF.write(f'{{\n{ii}"meta_range_kind": {jd(r.meta_range_kind.value)}')
+    if r.meta_range_minimum is not None:
+        outF.write(f',\n{ii}"meta_range_minimum": {jd(r.meta_range_minimum)}')
+    if r.meta_range_maximum is not None:
+        outF.write(f',\n{ii}"meta_range_maximum": {jd(r.meta_range_maximum)}')
+    if r.meta_range_units:
+        outF.write(f',\n{ii}"meta_range_units": {jd(r.meta_range_units)}')
+    outF.write("\n" + (indent * " ") + "}")
+
+
+def _refWriteList(outF, values, writeValue, indent):
+    first = True
+    for v in values:
+        if first:
+            first = False
+        else:
+            outF.write(", ")
+        writeValue(outF, v, indent=indent)
+
+
+def _refWriteEntry(outF, e, indent=0, writeExtra=None):
+    ii = (indent + 2) * " "
+    outF.write(f'{{\n{ii}"meta_name": {jd(e.meta_name)}')
+    outF.write(f',\n{ii}"meta_type": {jd(e.meta_type.value)}')
+    outF.write(f',\n{ii}"meta_description": ')
+    writeStrMaybeList(outF, e.meta_description, indent=indent + 2)
+    if e.meta_deprecated:
+        outF.write(f',\n{ii}"meta_deprecated": {jd(e.meta_deprecated)}')
+    if e.meta_abstract_types:
+        outF.write(f',\n{ii}"meta_abstract_types": {jd(e.meta_abstract_types)}')
+    if e.meta_type != MetaType.type_abstract:
+        outF.write(f',\n{ii}"meta_parent_section": {jd(e.meta_parent_section)}')
+    if e.meta_type in [MetaType.type_value, MetaType.type_dimension]:
+        if e.meta_data_type:
+            outF.write(f',\n{ii}"meta_data_type": {jd(e.meta_data_type.value)}')
+    if e.meta_type in [MetaType.type_value, MetaType.type_section]:
+        outF.write(f',\n{ii}"meta_repeats": {jd(e.meta_repeats)}')
+        outF.write(f',\n{ii}"meta_required": {jd(e.meta_required)}')
+    if e.meta_type == MetaType.type_value:
+        if e.meta_referenced_section:
+            outF.write(
+                f',\n{ii}"meta_referenced_section": {jd(e.meta_referenced_section)}'
+            )
+        outF.write(f',\n{ii}"meta_dimension": [ ')
+        _refWriteList(outF, e.meta_dimension, _refWriteDimension, indent + 2)
+        outF.write(" ]")
+        if e.meta_default_value is not None:
+            outF.write(f',\n{ii}"meta_default_value": {jd(e.meta_default_value)}')
+        if e.meta_example is not None:
+            outF.write(f',\n{ii}"meta_example": {jd(e.meta_example)}')
+        for key, writeValue in [
+            ("meta_enum", _refWriteEnum),
+            ("meta_query_enum", _refWriteQueryEnum),
+            ("meta_range_expected", _refWriteRange),
+        ]:
+            values = getattr(e, key)
+            if values is not None:
+                outF.write(f',\n{ii}"{key}": [ ')
+                _refWriteList(outF, values, writeValue, indent + 4)
+                outF.write(" ]")
+        if e.meta_units:
+            outF.write(f',\n{ii}"meta_units": {jd(e.meta_units)}')
+    elif e.meta_type == MetaType.type_constraint:
+        for key in [
+            "meta_constraint_select_query",
+            "meta_constraint_required_query",
+            "meta_constraint_expected_meta_info",
+        ]:
+            if getattr(e, key):
+                outF.write(f',\n{ii}"{key}": {jd(getattr(e, key))}')
+    elif e.meta_type == MetaType.type_section:
+        for key in ["meta_chosen_key", "meta_context_identifier", "meta_contains"]:
+            if getattr(e, key):
+                outF.write(f',\n{ii}"{key}": {jd(getattr(e, key))}')
+        if e.meta_inject:
+            outF.write(f',\n{ii}"meta_inject": [')
+            _refWriteList(outF, e.meta_inject, _refWriteInject, indent + 2)
+            outF.write(" ]")
+        if e.meta_example:
+            outF.write(f',\n{ii}"meta_example": {jd(e.meta_example)}')
+    if writeExtra:
+        writeExtra(outF, indent=indent + 2)
+    outF.write("\n" + (indent * " ") + "}")
+
+
+def _refWriteDictionary(
+    outF, d, indent=0, writeName=True, writeSource=False, writeMetaInfoEntries=True
+):
+    ii = (indent + 2) * " "
+    outF.write("{")
+    comma = ""
+    if writeName:
+        outF.write(f'{comma}\n{ii}"metadict_name": {jd(d.metadict_name)}')
+        comma = ","
+    if writeSource:
+        outF.write(f'{comma}\n{ii}"metadict_source": {jd(d.metadict_source)}')
+        comma = ","
+    outF.write(f'{comma}\n{ii}"metadict_description": ')
+    writeStrMaybeList(outF, d.metadict_description, indent=indent + 2)
+    if d.metadict_version is not None:
+        outF.write(f',\n{ii}"metadict_version": {jd(d.metadict_version)}')
+    outF.write(f',\n{ii}"metadict_required": [ ')
+    _refWriteList(outF, d.metadict_required, _refWriteRequired, indent + 4)
+    outF.write(" ]")
+    if writeMetaInfoEntries:
+        outF.write(f',\n{ii}"meta_info_entry": [ ')
+        _refWriteList(outF, d.meta_info_entry, _refWriteEntry, indent + 4)
+        outF.write(" ]")
+    outF.write("\n" + (indent * " ") + "}")
+
+
 class TestMetaInfo(unittest.TestCase):
     abstractMin = """{
 	"meta_name": "test",
@@ -708,6 +880,10 @@ class TestMetaInfo(unittest.TestCase):
         outF = io.StringIO()
         e.write(outF)
         s1 = outF.getvalue()
+        eTrusted = MetaInfoBase.fromDict(d, trusted=True)
+        self.assertTrue(isinstance(eTrusted, expectedClass))
+        self.assertEqual(e, eTrusted)
+        self.assertEqual(s1, str(eTrusted))
         try:
             d2 = json.loads(s1)
         except:
@@ -767,10 +943,557 @@ class TestMetaInfo(unittest.TestCase):
 
     def test_meta_dictionary(self):
         mDict = metaMetaDict()
+        trustedDict = MetaDictionary.fromDict(json.loads(metaDictJson), trusted=True)
+        self.assertEqual(mDict, trustedDict)
 
     def test_meta_info(self):
         mInfo = metaMetaInfo()
 
+    def test_entries_index(self):
+        "the index of the entries follows the changes of meta_info_entry"
+        mDict = metaMetaDict()
+        self.assertIsInstance(mDict.meta_info_entry, EntryList)
+        units = mDict.findOne("meta_units", MetaType.type_value)
+        newUnits = units.copy(update={"meta_units": "m"})
+        mDict.replaceEntry(units, newUnits)
+        self.assertIs(mDict.findOne("meta_units", MetaType.type_value), newUnits)
+        i = mDict.meta_info_entry.indexOf(newUnits)
+        mDict.meta_info_entry[i] = units
+        self.assertIs(mDict.findOne("meta_units", MetaType.type_value), units)
+        mDict.removeEntry(units)
+        self.assertEqual(mDict["meta_units"], [])
+        mDict.addEntry(newUnits)
+        self.assertEqual(mDict.meta_info_entries["meta_units"], [newUnits])
+        self.assertEqual(mDict.entriesOfType("meta_units", MetaType.type_section), [])
+        plainDict = mDict.copy(update={"meta_info_entry": [units]})
+        self.assertEqual(plainDict["meta_units"], [units])
+        self.assertEqual(plainDict["meta_name"], [])
+
+    def test_meta_info_index(self):
+        "indexed lookups by type, parent section and dictionary scope"
+        mInfo = metaMetaInfo()
+        self.assertEqual(len(mInfo.findMany("meta_name")), 1)
+        self.assertEqual(len(mInfo.findMany("meta_name", MetaType.type_value)), 1)
+        self.assertEqual(mInfo.findMany("meta_name", MetaType.type_section), [])
+        self.assertEqual(mInfo.findMany("meta_name", dictionaryNames=["other"]), [])
+        self.assertEqual(
+            len(mInfo.findMany("meta_name", dictionaryNames=frozenset(["meta"]))), 1
+        )
+        found = mInfo.findByParent(
+            "meta_info_entry", "meta_name", MetaType.type_value, {"meta"}
+        )
+        self.assertEqual(len(found), 1)
+        self.assertEqual(found[0].meta_info_entry.meta_name, "meta_name")
+        self.assertEqual(mInfo.findByParent("meta_dictionary", "meta_name"), [])
+
+    def test_complete(self):
+        "complete loads the dependencies level by level, and detects cycles"
+
+        def metaDict(name, required):
+            return MetaDictionary.fromDict(
+                {
+                    "metadict_name": name,
+                    "metadict_description": f"{name} test dictionary",
+                    "metadict_required": [
+                        {"metadict_required_name": r} for r in required
+                    ],
+                }
+            )
+
+        graph = {"a": ["b", "c"], "b": ["d"], "c": ["d"], "d": []}
+        loaded = []
+
+        def loader(name):
+            loaded.append(name)
+            return metaDict(name, graph[name])
+
+        for maxWorkers in [None, 4]:
+            loaded.clear()
+            mInfo = MetaInfo.empty()
+            mInfo.addMetaDict(loader("a"))
+            mInfo.complete(loader, maxWorkers=maxWorkers)
+            self.assertEqual(sorted(loaded), ["a", "b", "c", "d"])
+            self.assertEqual(loaded[-1], "d")
+            self.assertEqual(mInfo.dependencyOrder()[-1], "a")
+            self.assertEqual(mInfo.depsOfDict("b"), {"b", "d"})
+            self.assertEqual(mInfo.depsCache["b"], {"b", "d"})
+        mInfo.removeMetaDict("d")
+        self.assertEqual(mInfo.depsCache, {})
+        with self.assertRaises(Exception):
+            mInfo.depsOfDict("b")
+        graph["d"] = ["a"]
+        with self.assertRaisesRegex(Exception, "Circular dependency"):
+            mInfo.complete(loader)
+
+    def test_dictionary_discovery(self):
+        "the discovery index scans a directory again only when it changes"
+        tempDir = tempfile.mkdtemp(suffix="testDiscovery")
+        try:
+            mDict = metaMetaDict()
+            mDict.writeExploded(tempDir)
+            discovery = DictionaryDiscovery()
+            discovery.racyInterval = 0
+            found = discovery.find("meta", [os.path.join(tempDir, "none"), tempDir])
+            self.assertTrue(found.exploded)
+            self.assertIsNone(discovery.find("other", [tempDir]))
+            self.assertEqual(discovery.scans, 1)
+            jsonPath = os.path.join(tempDir, "meta.meta_dictionary.json")
+            writeFile(jsonPath, lambda outF: mDict.write(outF))
+            os.utime(tempDir, ns=(0, 0))
+            found = discovery.find("meta", [tempDir])
+            self.assertEqual(found, DiscoveredDictionary("meta", jsonPath, False))
+            self.assertEqual(len(discovery.listing(tempDir).found), 2)
+            self.assertEqual(discovery.scans, 2)
+            loader = MetaDictionary.fileLoader([tempDir])
+            self.assertEqual(loader("meta").meta_info_entry, mDict.meta_info_entry)
+        finally:
+            shutil.rmtree(tempDir)
+
+    def test_stream_json(self):
+        "streamJsonObject gives the same result as json.loads for any chunk size"
+        doc = '{"a": 12345, "l": [ ], "meta_info_entry": [1, 2.5e3, {"x": [true, "\\u00e8]"]}, null ],\n "b": {"c": "}"} }'
+        expected = json.loads(doc)
+        for chunkSize in [1, 2, 3, 5, 8, 1000]:
+            items = []
+            res = streamJsonObject(
+                io.StringIO(doc), "meta_info_entry", items.append, chunkSize=chunkSize
+            )
+            self.assertEqual(items, expected.pop("meta_info_entry"))
+            self.assertEqual(res, expected)
+            expected["meta_info_entry"] = items
+        for invalid in ['{"a": 1', '{"a": 1} x', '{"meta_info_entry": [1 2]}']:
+            with self.assertRaises(ValueError):
+                streamJsonObject(io.StringIO(invalid), "meta_info_entry", print, 4)
+
+    def test_streaming_load(self):
+        "the streaming loader gives the same dictionary as the normal one"
+        tempDir = tempfile.mkdtemp(suffix="testStreaming")
+        try:
+            mDict = metaMetaDict()
+            p = os.path.join(tempDir, "meta.meta_dictionary.json")
+            writeFile(p, lambda outF: mDict.write(outF))
+            d1 = MetaDictionary.loadDictionaryAtPath(p, streaming=False)
+            for lazy in [False, True]:
+                d2 = MetaDictionary.loadDictionaryAtPath(p, streaming=True, lazy=lazy)
+                self.assertEqual(d2.meta_info_entry, d1.meta_info_entry)
+                self.assertEqual(d2.metadict_source, d1.metadict_source)
+                self.assertEqual(d2.metadict_description, d1.metadict_description)
+            # streaming is used by default only above the threshold, if one is set
+            streamed = []
+
+            def stream(*args):
+                streamed.append(args)
+                return streamJsonObject(*args)
+
+            with mock.patch(f"{__package__}.meta_info.streamJsonObject", stream):
+                MetaDictionary.loadDictionaryAtPath(p)
+                self.assertEqual(len(streamed), 0)
+                try:
+                    setStreamingThreshold(os.path.getsize(p))
+                    MetaDictionary.loadDictionaryAtPath(p)
+                    self.assertEqual(len(streamed), 1)
+                    setStreamingThreshold(os.path.getsize(p) + 1)
+                    MetaDictionary.loadDictionaryAtPath(p)
+                    self.assertEqual(len(streamed), 1)
+                finally:
+                    setStreamingThreshold(None)
+        finally:
+            shutil.rmtree(tempDir)
+
+    def test_json_backends(self):
+        "all json backends give the same result, and fall back on stdlib json for non strict json"
+        for name, backend in jsonBackends.items():
+            self.assertEqual(
+                backend.loads(metaDictJson.encode("utf8")), json.loads(metaDictJson)
+            )
+            self.assertTrue(math.isnan(backend.loads(b"[NaN]")[0]))
+        with self.assertRaises(Exception):
+            setJsonBackend("unknown")
+
+    def test_write_file(self):
+        "writeFile skips unchanged files, and keeps a backup of the changed ones"
+        tempDir = tempfile.mkdtemp(suffix="testWriteFile")
+        try:
+            p = os.path.join(tempDir, "a.txt")
+            written, skipped = writeStats.counts()
+            self.assertTrue(writeFile(p, lambda outF: outF.write("hello ü")))
+            self.assertFalse(writeFile(p, lambda outF: outF.write("hello ü")))
+            self.assertTrue(writeFile(p, lambda outF: outF.write("hello ö")))
+            self.assertEqual(writeStats.counts(), (written + 2, skipped + 1))
+            with open(p, encoding="utf8") as f:
+                self.assertEqual(f.read(), "hello ö")
+            self.assertEqual(
+                sorted(f.split(".")[-1] for f in os.listdir(tempDir)), ["bk", "txt"]
+            )
+            data = b"x" * (mmapCompareThreshold + 10)
+            self.assertTrue(writeBytes(p, data))
+            self.assertFalse(writeBytes(p, data))
+            self.assertTrue(writeBytes(p, data[:-1] + b"y"))
+        finally:
+            shutil.rmtree(tempDir)
+
+    def test_split_str(self):
+        "splitStr gives the same lines as the original backward scanning implementation"
+
+        def referenceSplitStr(string, maxLen=80):
+            toDo = string.splitlines(keepends=True)[::-1]
+            if len(toDo) == 1 and len(string) < maxLen or maxLen == -1:
+                return [string]
+            res = []
+            breakRe = re.compile(r"[\s\[\]\(\)\{\}.,<>;:!|\\/=+\-*&^%$#@?~]")
+            while toDo:
+                lNow = toDo.pop()
+                if len(lNow) <= maxLen:
+                    res.append(lNow)
+                else:
+                    rNow = lNow[maxLen - 1 :: -1]
+                    done = False
+                    for m in breakRe.finditer(rNow):
+                        i = maxLen - m.start()
+                        if i > maxLen / 2:
+                            res.append(lNow[:i])
+                            toDo.append(lNow[i:])
+                            done = True
+                        break
+                    if not done:
+                        res.append(lNow[:maxLen])
+                        toDo.append(lNow[maxLen:])
+            return res
+
+        rand = random.Random(4)
+        chars = "abcdefghij    ..,;()\n-/"
+        for i in range(300):
+            s = "".join(rand.choice(chars) for j in range(rand.randrange(400)))
+            for maxLen in [-1, 7, 40, 81]:
+                self.assertEqual(splitStr(s, maxLen), referenceSplitStr(s, maxLen))
+        d = metaMetaDict()
+        d.standardize()
+        text = str(d)
+        d.standardize()
+        self.assertEqual(str(d), text)
+
+    def test_serializer(self):
+        "the single pass serializer writes the same json as the field by field writers"
+        mDict = metaMetaDict()
+        mDict.metadict_required = [
+            MetadictRequired(metadict_required_name="a"),
+            MetadictRequired(
+                metadict_required_name="b", metadict_required_version="1.0"
+            ),
+        ]
+        rawEntries = [
+            {
+                "meta_name": "v",
+                "meta_description": 'a è "value"',
+                "meta_deprecated": True,
+                "meta_abstract_types": ["x", "y"],
+                "meta_parent_section": "s",
+                "meta_data_type": "float64",
+                "meta_referenced_section": "r",
+                "meta_dimension": [
+                    {"meta_dimension_fixed": 3},
+                    {"meta_dimension_symbolic": "n"},
+                ],
+                "meta_default_value": "1",
+                "meta_enum": [
+                    {"meta_enum_value": "e", "meta_enum_description": ["d1", "d2"]}
+                ],
+                "meta_query_enum": [
+                    {
+                        "meta_query_expansion": "q",
+                        "meta_query_values": ["a"],
+                        "meta_query_regexp": "a.*",
+                    }
+                ],
+                "meta_range_expected": [
+                    {
+                        "meta_range_kind": "norm2",
+                        "meta_range_minimum": 0.5,
+                        "meta_range_maximum": 2,
+                        "meta_range_units": "m",
+                    }
+                ],
+                "meta_units": "m",
+                "meta_example": ["1.0"],
+            },
+            {
+                "meta_name": "s",
+                "meta_type": "type-section",
+                "meta_description": [],
+                "meta_chosen_key": ["k"],
+                "meta_context_identifier": ["c"],
+                "meta_contains": ["t"],
+                "meta_inject": [
+                    {"meta_inject_if_abstract_type": ["x"]},
+                    {"meta_inject_if_section_regexp": "s.*"},
+                ],
+                "meta_example": ["{}"],
+            },
+            {
+                "meta_name": "n",
+                "meta_type": "type-dimension",
+                "meta_description": "dim",
+                "meta_parent_section": "s",
+                "meta_data_type": "int",
+            },
+            {
+                "meta_name": "c",
+                "meta_type": "type-constraint",
+                "meta_description": "constraint",
+                "meta_parent_section": "s",
+                "meta_constraint_select_query": "a",
+                "meta_constraint_required_query": "b",
+                "meta_constraint_expected_meta_info": ["v"],
+            },
+            {"meta_name": "x", "meta_type": "type-abstract", "meta_description": ""},
+        ]
+        mDict.meta_info_entry.extend(MetaInfoBase.fromDict(e) for e in rawEntries)
+        writeExtra = lambda outF, indent: outF.write(f',\n{indent * " "}"extra": 1')
+        for e in mDict.meta_info_entry:
+            for indent in [0, 4]:
+                for extra in [None, writeExtra]:
+                    outF = io.StringIO()
+                    _refWriteEntry(outF, e, indent, writeExtra=extra)
+                    self.assertEqual(entryText(e, indent, extra), outF.getvalue())
+        value = mDict.findOne("v", MetaType.type_value)
+        section = mDict.findOne("s", MetaType.type_section)
+        for values, refWrite in [
+            (value.meta_dimension, _refWriteDimension),
+            (value.meta_enum, _refWriteEnum),
+            (value.meta_query_enum, _refWriteQueryEnum),
+            (value.meta_range_expected, _refWriteRange),
+            (section.meta_inject, _refWriteInject),
+            (mDict.metadict_required, _refWriteRequired),
+        ]:
+            for v in values:
+                outF1 = io.StringIO()
+                refWrite(outF1, v, indent=4)
+                outF2 = io.StringIO()
+                v.write(outF2, indent=4)
+                self.assertEqual(outF2.getvalue(), outF1.getvalue())
+        for kwargs in [{}, {"writeSource": True, "writeMetaInfoEntries": False}]:
+            outF1 = io.StringIO()
+            _refWriteDictionary(outF1, mDict, **kwargs)
+            outF2 = io.StringIO()
+            mDict.write(outF2, **kwargs)
+            self.assertEqual(outF2.getvalue(), outF1.getvalue())
+
+    def test_write_exploded(self):
+        "writeExploded writes the changed entries concurrently, and moves the files of removed entries to a backup"
+        tempDir = tempfile.mkdtemp(suffix="testWriteExploded")
+        try:
+            dPath = os.path.join(tempDir, "meta.meta_dictionary")
+
+            def entryPath(e):
+                return os.path.join(
+                    dPath, e.meta_parent_section, e.meta_name + ".meta_info_entry.json"
+                )
+
+            def backups(e):
+                p = entryPath(e)
+                return [
+                    f
+                    for f in os.listdir(os.path.dirname(p))
+                    if f.startswith(os.path.basename(p) + ".") and f.endswith(".bk")
+                ]
+
+            mDict = metaMetaDict()
+            mDict.writeExploded(tempDir, maxWorkers=4)
+            for e in mDict.meta_info_entry:
+                if e.meta_type == MetaType.type_value:
+                    with open(entryPath(e), "rb") as f:
+                        self.assertEqual(f.read(), renderText(e.write))
+            mDict = metaMetaDict()
+            removed, changed, unchanged = [
+                mDict.findOne(n, MetaType.type_value)
+                for n in ["meta_chosen_key", "meta_contains", "meta_data_type"]
+            ]
+            mDict.removeEntry(removed)
+            changed.meta_description = "changed description"
+            added = changed.copy(update={"meta_name": "meta_added"})
+            mDict.addEntry(added)
+            written, skipped = writeStats.counts()
+            mDict.writeExploded(tempDir, maxWorkers=4)
+            # header and unchanged entries are compared, not written
+            self.assertEqual(
+                writeStats.counts(),
+                (written + 2, skipped + len(mDict.meta_info_entry) - 1),
+            )
+            self.assertFalse(os.path.exists(entryPath(removed)))
+            self.assertEqual(len(backups(removed)), 1)
+            self.assertEqual(len(backups(changed)), 1)
+            self.assertEqual(backups(unchanged), [])
+            for e in [changed, added, unchanged]:
+                with open(entryPath(e), "rb") as f:
+                    self.assertEqual(f.read(), renderText(e.write))
+            self.assertEqual(
+                sorted(
+                    e.meta_name
+                    for e in MetaDictionary.loadAtPath(dPath).meta_info_entry
+                ),
+                sorted(e.meta_name for e in mDict.meta_info_entry),
+            )
+            # without cleanup the files of removed entries are kept
+            mDict.removeEntry(added)
+            mDict.writeExploded(tempDir, cleanup=False)
+            self.assertTrue(os.path.exists(entryPath(added)))
+            self.assertEqual(
+                writeFiles(
+                    os.path.join(dPath, "meta_info_entry"),
+                    {
+                        "meta_added.meta_info_entry.json": b"{}",
+                        "meta_data_type.meta_info_entry.json": renderText(
+                            unchanged.write
+                        ),
+                    },
+                ),
+                {"meta_added.meta_info_entry.json"},
+            )
+        finally:
+            shutil.rmtree(tempDir)
+
+    def test_unchanged_entries(self):
+        "writeExploded only touches the files whose content changed"
+        tempDir = tempfile.mkdtemp(suffix="testUnchangedEntries")
+        try:
+            mDict = metaMetaDict()
+            mDict.writeExploded(tempDir)
+            dPath = os.path.join(tempDir, "meta.meta_dictionary")
+            # loading adds the path to metadict_source
+            d = MetaDictionary.loadAtPath(dPath)
+            d.standardize()
+            d.writeExploded(tempDir)
+            d = MetaDictionary.loadAtPath(dPath)
+            d.standardize()
+            nFiles = len(d.meta_info_entry) + 1
+            entry = d.meta_info_entry[0]
+            digest = entry.digest()
+            entry.meta_description = "changed"
+            self.assertNotEqual(entry.digest(), digest)
+            written, skipped = writeStats.counts()
+            d.writeExploded(tempDir)
+            self.assertEqual(writeStats.counts(), (written + 1, skipped + nFiles - 1))
+            d.writeExploded(tempDir)
+            self.assertEqual(
+                writeStats.counts(), (written + 1, skipped + 2 * nFiles - 1)
+            )
+            self.assertEqual(MetaDictionary.loadAtPath(dPath), d)
+            # in place changes of nested values are also detected
+            digest = entry.digest()
+            entry.meta_abstract_types.append("nested_change")
+            self.assertNotEqual(entry.digest(), digest)
+            d.writeExploded(tempDir)
+            self.assertEqual(
+                writeStats.counts(), (written + 2, skipped + 3 * nFiles - 2)
+            )
+            self.assertEqual(MetaDictionary.loadAtPath(dPath), d)
+            # files changed on disk after the load, or in another directory, are rewritten
+            otherDir = os.path.join(tempDir, "other")
+            mDict.writeExploded(otherDir)
+            for baseDir in [tempDir, otherDir]:
+                entryPath = os.path.join(
+                    baseDir,
+                    "meta.meta_dictionary",
+                    entry.meta_parent_section,
+                    entry.meta_name + ".meta_info_entry.json",
+                )
+                if baseDir == tempDir:
+                    with open(entryPath, "w") as f:
+                        f.write("{}")
+                d.writeExploded(baseDir)
+                with open(entryPath, "rb") as f:
+                    self.assertEqual(f.read(), renderText(entry.write))
+        finally:
+            shutil.rmtree(tempDir)
+
+    def test_parallel_exploded_load(self):
+        "the parallel loader of exploded dictionaries gives the same result as the serial one"
+        tempDir = tempfile.mkdtemp(suffix="testParallelLoad")
+        try:
+            mDict = metaMetaDict()
+            mDict.writeExploded(tempDir)
+            dPath = os.path.join(tempDir, "meta.meta_dictionary")
+            d1 = MetaDictionary.loadExplodedDictionaryAtPath(dPath)
+            d2 = MetaDictionary.loadExplodedDictionaryAtPath(dPath, maxWorkers=4)
+            self.assertEqual(
+                [e.meta_name for e in d1.meta_info_entry],
+                [e.meta_name for e in d2.meta_info_entry],
+            )
+            self.assertEqual(d1, d2)
+            entryDir = os.path.join(dPath, "meta_info_entry")
+            os.rename(
+                os.path.join(entryDir, "meta_units.meta_info_entry.json"),
+                os.path.join(entryDir, "meta_unit.meta_info_entry.json"),
+            )
+            errors = []
+            for maxWorkers in [None, 4]:
+                with self.assertRaises(Exception) as ctx:
+                    MetaDictionary.loadExplodedDictionaryAtPath(
+                        dPath, maxWorkers=maxWorkers
+                    )
+                errors.append(str(ctx.exception))
+            self.assertEqual(errors[0], errors[1])
+            self.assertIn("Inconsistent entry name", errors[0])
+        finally:
+            shutil.rmtree(tempDir)
+
+    def test_concurrent_exploded(self):
+        "exploded dictionaries can be written and loaded concurrently, and the working directory is unchanged"
+        from concurrent.futures import ThreadPoolExecutor
+
+        tempDir = tempfile.mkdtemp(suffix="testConcurrentExploded")
+        cwd = os.getcwd()
+        try:
+            mDict = metaMetaDict()
+
+            def writeAndLoad(i):
+                basePath = os.path.join(tempDir, str(i))
+                mDict.writeExploded(basePath)
+                return MetaDictionary.loadExplodedDictionaryAtPath(
+                    os.path.join(basePath, "meta.meta_dictionary")
+                )
+
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                loaded = list(pool.map(writeAndLoad, range(8)))
+            self.assertEqual(os.getcwd(), cwd)
+            expected = sorted(mDict.meta_info_entry, key=lambda x: x.meta_name)
+            for d in loaded:
+                self.assertEqual(d.meta_info_entry, expected)
+        finally:
+            shutil.rmtree(tempDir)
+
+    def test_lazy_dictionary(self):
+        "a lazy dictionary builds only the entries that are used"
+        mDict = metaMetaDict()
+        lazyDict = MetaDictionary.fromDict(json.loads(metaDictJson), lazy=True)
+        entries = lazyDict.meta_info_entry
+        self.assertIsInstance(entries, LazyEntryList)
+        self.assertEqual(entries.pending, len(mDict.meta_info_entry))
+        self.assertEqual(lazyDict.entryNames(), mDict.entryNames())
+        self.assertEqual(entries.pending, len(mDict.meta_info_entry))
+        e = lazyDict.findOne("meta_units", MetaType.type_value)
+        self.assertEqual(e, mDict.findOne("meta_units", MetaType.type_value))
+        self.assertEqual(entries.pending, len(mDict.meta_info_entry) - 1)
+        self.assertIs(lazyDict["meta_units"][0], e)
+        metaI = MetaInfo.empty()
+        metaI.addMetaDict(lazyDict)
+        self.assertEqual(entries.pending, len(mDict.meta_info_entry) - 1)
+        self.assertEqual(lazyDict.meta_info_entry, mDict.meta_info_entry)
+        self.assertEqual(entries.pending, 0)
+
+    def test_interning(self):
+        "with interning the identifiers of separately loaded dictionaries are shared"
+        setInterning(True)
+        try:
+            d1 = metaMetaDict()
+            d2 = MetaDictionary.fromDict(json.loads(metaDictJson), trusted=True)
+        finally:
+            setInterning(False)
+        for e1, e2 in zip(d1.meta_info_entry, d2.meta_info_entry):
+            self.assertIs(e1.meta_name, e2.meta_name)
+            if e1.meta_type != MetaType.type_abstract:
+                self.assertIs(e1.meta_parent_section, e2.meta_parent_section)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 from .meta_schema import *
 from .test_meta_info import metaMetaInfo
+from .meta_bench import syntheticDictionaryDict, syntheticInjectDictionaryDict
 import io
 import json
 
@@ -10,12 +11,285 @@ def metaMetaSchema():
     return MetaSchema.forDictionary(dictName="meta", metaInfo=metaMetaInfo())
 
 
+def schemaByEntry(dictName, metaInfo):
+    "returns the schema of dictName built adding its dependencies entry by entry"
+    schema = MetaSchema(
+        metaInfo=metaInfo,
+        mainDictionary=dictName,
+        dictionaries=metaInfo.depsOfDict(dictName),
+        sections={},
+        abstractTypes={},
+        dimensions={},
+        rootSections={},
+        dataView={},
+    )
+    for dep in sorted(schema.dictionaries):
+        schema.addSchemaOfDictionary(metaInfo.dictionaries[dep])
+    schema.injectSections()
+    schema.linkAbstracts()
+    return schema
+
+
+def layeredMetaInfo():
+    "returns a MetaInfo with the synthetic dictionaries base, mid (requiring base) and dep (requiring mid)"
+    mInfo = MetaInfo.empty()
+    for name, required, parent in [
+        ("base", (), None),
+        ("mid", ("base",), "base_section_1"),
+        ("dep", ("mid",), "mid_section_2"),
+    ]:
+        dDict = syntheticDictionaryDict(name, nSections=6, nValues=4, required=required)
+        # the root section of the dictionary goes in a section of its dependency
+        dDict["meta_info_entry"][1]["meta_parent_section"] = parent
+        mInfo.addMetaDict(MetaDictionary.fromDict(dDict))
+    return mInfo
+
+
 class TestMetaSchema(unittest.TestCase):
     """tests the schema generation"""
 
     def test_metaMetaSchema(self):
         schema = metaMetaSchema()
 
+    def test_schema_cache(self):
+        "forDictionary builds a new schema reusing the fragments of the unchanged dictionaries"
+        mInfo = metaMetaInfo()
+        schema = MetaSchema.forDictionary("meta", mInfo)
+        cache = SchemaCache.of(mInfo)
+        fragment = cache.fragment(mInfo.dictionaries["meta"])
+        schema2 = MetaSchema.forDictionary("meta", mInfo)
+        self.assertIsNot(schema2, schema)
+        self.assertIs(cache.fragment(mInfo.dictionaries["meta"]), fragment)
+        # in place changes of nested values are seen by the new schemas
+        sec = mInfo.dictionaries["meta"].findOne(
+            "meta_info_entry", MetaType.type_section
+        )
+        sec.meta_description.append("changed in place")
+        self.assertIn(
+            "changed in place",
+            MetaSchema.forDictionary("meta", mInfo)
+            .sections[sec.meta_name]
+            .section.meta_description,
+        )
+        mInfo.addMetaDict(mInfo.removeMetaDict("meta"))
+        self.assertIsNot(cache.fragment(mInfo.dictionaries["meta"]), fragment)
+
+    def assertSameSchema(self, schema, expected):
+        out1, out2 = io.StringIO(), io.StringIO()
+        schema.write(out1)
+        expected.write(out2)
+        self.assertEqual(out1.getvalue(), out2.getvalue())
+        self.assertEqual(
+            [[s.meta_path for s in p] for p in schema.iterateData()],
+            [[s.meta_path for s in p] for p in expected.iterateData()],
+        )
+
+    def test_schema_fragments(self):
+        "merging the fragments gives the same schema as adding the dictionaries entry by entry"
+        mInfo = metaMetaInfo()
+        self.assertSameSchema(
+            MetaSchema.build("meta", mInfo), schemaByEntry("meta", mInfo)
+        )
+        cache = SchemaCache.of(mInfo)
+        mDict = mInfo.dictionaries["meta"]
+        fragment = cache.fragment(mDict)
+        MetaSchema.build("meta", mInfo)
+        self.assertIs(cache.fragment(mDict), fragment)
+        # the fragment keeps the entries, only a change of their layout invalidates it
+        mDict.meta_info_entry[0].meta_description = "changed"
+        self.assertIs(cache.fragment(mDict), fragment)
+        mDict.meta_info_entry.append(
+            mDict.meta_info_entry[0].copy(update={"meta_name": "meta_added"})
+        )
+        self.assertIsNot(cache.fragment(mDict), fragment)
+
+    def test_schema_fragments_dependencies(self):
+        "fragments of several dictionaries are merged like the dictionaries added entry by entry"
+        mInfo = layeredMetaInfo()
+        for dName in ["base", "mid", "dep"]:
+            schema = MetaSchema.build(dName, mInfo)
+            self.assertSameSchema(schema, schemaByEntry(dName, mInfo))
+        self.assertEqual(schema.dictionaries, {"base", "mid", "dep"})
+        self.assertEqual(
+            schema.sections["dep_section_0"].meta_path,
+            "base_section_0.base_section_1.mid_section_0.mid_section_1.mid_section_2.dep_section_0",
+        )
+
+    def test_schema_fragments_duplicates(self):
+        "values, dimensions and abstract types defined in two dictionaries are rejected"
+        baseDict = syntheticDictionaryDict("base", nSections=2, nValues=2)
+        sameValue = [
+            e for e in baseDict["meta_info_entry"] if e["meta_type"] == "type-value"
+        ][0]
+        for entry, error in [
+            (sameValue, "Duplicate add of value"),
+            (
+                {
+                    "meta_name": "base_section_0_value_0",
+                    "meta_type": "type-value",
+                    "meta_description": "a value already in base",
+                    "meta_parent_section": "base_section_0",
+                    "meta_data_type": "int",
+                },
+                "Duplicate value base_section_0_value_0",
+            ),
+            (
+                {
+                    "meta_name": "base_section_0_dim_0",
+                    "meta_type": "type-dimension",
+                    "meta_description": "a dimension already in base",
+                    "meta_parent_section": "base_section_0",
+                },
+                "Duplicated dimension base_section_0_dim_0",
+            ),
+            (
+                {
+                    "meta_name": "base_abstract",
+                    "meta_type": "type-abstract",
+                    "meta_description": "an abstract type already in base",
+                },
+                "Duplicated abstract type base_abstract",
+            ),
+        ]:
+            mInfo = MetaInfo.empty()
+            mInfo.addMetaDict(MetaDictionary.fromDict(baseDict))
+            mInfo.addMetaDict(
+                MetaDictionary.fromDict(
+                    {
+                        "metadict_name": "dup",
+                        "metadict_description": "redefines an entry of base",
+                        "metadict_required": [{"metadict_required_name": "base"}],
+                        "meta_info_entry": [entry],
+                    }
+                )
+            )
+            with self.assertRaisesRegex(Exception, error):
+                MetaSchema.build("dup", mInfo)
+
+    def test_injected_views(self):
+        "the sections in the data view are views on the sections of the schema"
+        mInfo = MetaInfo.empty()
+        mInfo.addMetaDict(
+            MetaDictionary.fromDict(
+                {
+                    "metadict_name": "inject",
+                    "metadict_description": "injection through meta_contains",
+                    "metadict_required": [],
+                    "meta_info_entry": [
+                        {
+                            "meta_name": "partial",
+                            "meta_type": "type-section",
+                            "meta_description": "a partial section",
+                            "meta_inject": [{"meta_inject_if_section_regexp": "x"}],
+                        },
+                        {
+                            "meta_name": "partial_value",
+                            "meta_type": "type-value",
+                            "meta_description": "a value of partial",
+                            "meta_parent_section": "partial",
+                            "meta_data_type": "int",
+                        },
+                        {
+                            "meta_name": "full",
+                            "meta_type": "type-section",
+                            "meta_description": "a section containing partial",
+                            "meta_contains": ["partial"],
+                        },
+                    ],
+                }
+            )
+        )
+        schema = MetaSchema.forDictionary("inject", mInfo)
+        partial = schema.sections["partial"]
+        injected = schema.dataView["full"].subSections["partial"]
+        self.assertIsInstance(injected, InjectedSection)
+        self.assertIs(injected.original, partial)
+        self.assertIs(injected.valueEntries, partial.valueEntries)
+        self.assertTrue(injected.isInjected())
+        self.assertFalse(injected.isPartialSection())
+        self.assertEqual(partial.meta_instantiated_at, ["full.partial", "partial"])
+        self.assertEqual(schema.sections["full"].meta_possible_inject, ["partial"])
+        self.assertEqual(
+            [[s.name() for s in p] for p in schema.iterateData()],
+            [["full"], ["full", "partial"], ["partial"]],
+        )
+
+    def test_inject_sections(self):
+        "partial sections are injected in the sections matching their regexp and abstract types"
+        mInfo = MetaInfo.empty()
+        mInfo.addMetaDict(
+            MetaDictionary.fromDict(
+                syntheticInjectDictionaryDict(nPartial=4, nSections=12)
+            )
+        )
+        schema = MetaSchema.forDictionary("inject", mInfo)
+        # partial 1 requires kind_1 in sections matching inject_section_1_.*
+        self.assertEqual(
+            schema.sections["inject_partial_1"].meta_instantiated_at,
+            [
+                "inject_partial_1",
+                "inject_section_0_0.inject_section_1_1.inject_partial_1",
+            ],
+        )
+        self.assertEqual(
+            schema.sections["inject_partial_1_sub"].meta_instantiated_at,
+            [
+                "inject_partial_1.inject_partial_1_sub",
+                "inject_section_0_0.inject_section_1_1.inject_partial_1.inject_partial_1_sub",
+            ],
+        )
+        possibleInject = {
+            sName: s.meta_possible_inject
+            for sName, s in schema.sections.items()
+            if s.meta_possible_inject
+        }
+        # partial 0 excludes kind_0 in sections matching inject_section_0_.*
+        self.assertEqual(
+            possibleInject,
+            {
+                "inject_section_0_10": ["inject_partial_0"],
+                "inject_section_1_1": ["inject_partial_1"],
+                "inject_section_3_3": ["inject_partial_3"],
+            },
+        )
+        # each copy is visited once
+        paths = [".".join(s.name() for s in p) for p in schema.iterateData()]
+        self.assertEqual(len(paths), len(set(paths)))
+
+    def test_inject_backreferences(self):
+        "regexps with backreferences are not changed by the combined regexp used to skip sections"
+        entries = []
+        for letter in "ab":
+            entries += [
+                {
+                    "meta_name": f"partial_{letter}",
+                    "meta_type": "type-section",
+                    "meta_description": f"injected in {2 * letter}",
+                    "meta_inject": [
+                        {"meta_inject_if_section_regexp": f"({letter})\\1"}
+                    ],
+                },
+                {
+                    "meta_name": 2 * letter,
+                    "meta_type": "type-section",
+                    "meta_description": f"a section named {2 * letter}",
+                },
+            ]
+        mInfo = MetaInfo.empty()
+        mInfo.addMetaDict(
+            MetaDictionary.fromDict(
+                {
+                    "metadict_name": "inject",
+                    "metadict_description": "regexps with backreferences",
+                    "metadict_required": [],
+                    "meta_info_entry": entries,
+                }
+            )
+        )
+        schema = MetaSchema.build("inject", mInfo)
+        self.assertEqual(schema.sections["aa"].meta_possible_inject, ["partial_a"])
+        self.assertEqual(schema.sections["bb"].meta_possible_inject, ["partial_b"])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+from .meta_store import *
+from .test_meta_info import metaMetaInfo
+import os, pickle
+import tempfile, shutil
+
+
+class TestMetaStore(unittest.TestCase):
+    """tests the compiled mmap store"""
+
+    def test_meta_store(self):
+        "the store answers the queries like the MetaInfo it was compiled from"
+        tempDir = tempfile.mkdtemp(suffix="testMetaStore")
+        try:
+            mInfo = metaMetaInfo()
+            mInfo.dictionaries["meta"].metadict_source = [
+                "file:///meta.meta_dictionary"
+            ]
+            storePath = os.path.join(tempDir, "meta.meta_store")
+            writeMetaStore(mInfo, storePath)
+            with MetaStore(storePath) as store:
+                dInfo = mInfo.dictionaries["meta"]
+                for e in dInfo.meta_info_entry:
+                    name, metaType = e.meta_name, e.meta_type
+                    self.assertEqual(store.findMany(name), mInfo.findMany(name))
+                    self.assertEqual(
+                        store.findOne(name, metaType), mInfo.findOne(name, metaType)
+                    )
+                    parent = getattr(e, "meta_parent_section", None)
+                    if parent:
+                        self.assertEqual(
+                            store.findByParent(parent, name),
+                            mInfo.findByParent(parent, name),
+                        )
+                self.assertIs(
+                    store.findSection("meta_dictionary").meta_info_entry,
+                    store.findSection("meta_dictionary").meta_info_entry,
+                )
+                self.assertEqual(
+                    store.findMany("meta_dictionary", dictionaryNames=["x"]), []
+                )
+                self.assertEqual(store.findMany("not_there"), [])
+                self.assertEqual(store.depsOfDict("meta"), mInfo.depsOfDict("meta"))
+                self.assertEqual(
+                    store.metaInfo().dictionaries["meta"].meta_info_entry,
+                    dInfo.meta_info_entry,
+                )
+                store2 = pickle.loads(pickle.dumps(store))
+                self.assertEqual(
+                    store2.findMany("meta_name"), mInfo.findMany("meta_name")
+                )
+                store2.close()
+                # the header keeps the sources of the dictionary
+                self.assertEqual(
+                    store.dictionaryHeader("meta").metadict_source,
+                    dInfo.metadict_source,
+                )
+            with open(storePath, "rb") as f:
+                data = f.read()
+            for size in [
+                len(data) - 1,
+                len(data) - storeU32.size,
+                len(data) // 2,
+                storeHeader.size + storeU64.size,
+            ]:
+                with open(storePath, "wb") as f:
+                    f.write(data[:size])
+                with self.assertRaisesRegex(Exception, "Invalid store.*does not fit"):
+                    MetaStore(storePath)
+            with open(storePath, "wb") as f:
+                f.write(data + b"\0")
+            with self.assertRaisesRegex(Exception, "Invalid store.*unexpected bytes"):
+                MetaStore(storePath)
+            for data in [b"", storeMagic]:
+                with open(storePath, "wb") as f:
+                    f.write(data)
+                with self.assertRaisesRegex(Exception, "Invalid store.*too short"):
+                    MetaStore(storePath)
+        finally:
+            shutil.rmtree(tempDir)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+import unittest
+from .meta_tool import *
+from .meta_info import MetadictRequired
+from .test_meta_info import metaMetaDict
+import argparse
+import concurrent.futures
+from unittest import mock
+import re
+import tempfile, shutil
+
+
+class TestMetaTool(unittest.TestCase):
+    """tests the meta_tool commands"""
+
+    def test_incremental_cascade(self):
+        "cascade skips the stages of the dictionaries whose inputs and dependencies did not change"
+        tempDir = tempfile.mkdtemp(suffix="testCascade")
+        try:
+            explodedDir = os.path.join(tempDir, "meta_dictionary_exploded")
+            dictDir = os.path.join(tempDir, "meta_dictionary")
+            docsDir = os.path.join(tempDir, "docs")
+            mDict = metaMetaDict()
+            mDict.writeExploded(explodedDir)
+            other = MetaDictionary(
+                metadict_name="other",
+                metadict_description="depends on meta",
+                metadict_required=[MetadictRequired(metadict_required_name="meta")],
+                meta_info_entry=[],
+            )
+            other.writeExploded(explodedDir)
+            args = argparse.Namespace(
+                name_check=NameCheckLevel.strict,
+                name_clashes=["ignore-case", "unique-section-attributes"],
+                name_clashes_warn=["ignore-all"],
+                katex=None,
+            )
+
+            def runCascade():
+                with self.assertLogs(level="INFO") as logs:
+                    cascade(explodedDir, dictDir, docsDir, args)
+                res = {}
+                for l in logs.output:
+                    m = re.search(r"cascade (\w+): skipped (.*)$", l)
+                    if m:
+                        res[m.group(1)] = m.group(2)
+                return res
+
+            # a first run without dictionaryDir does not skip writing the json later
+            cascade(explodedDir, None, None, args)
+            self.assertEqual(runCascade(), {"meta": "no stage", "other": "no stage"})
+            for name in ["meta", "other"]:
+                self.assertTrue(
+                    os.path.isfile(
+                        os.path.join(dictDir, name + ".meta_dictionary.json")
+                    )
+                )
+            written, skipped = writeStats.counts()
+            self.assertEqual(
+                runCascade(),
+                {"meta": "reformat, checks, docs", "other": "reformat, checks, docs"},
+            )
+            self.assertEqual(writeStats.counts()[0], written)
+            self.assertTrue(os.path.isfile(os.path.join(docsDir, manifestName)))
+            self.assertTrue(os.path.isfile(os.path.join(docsDir, "index.html")))
+            # a change in meta reruns the checks and docs of other, that depends on it
+            mDict.metadict_version = "3.0.0"
+            mDict.writeExploded(explodedDir)
+            self.assertEqual(runCascade(), {"meta": "no stage", "other": "reformat"})
+            self.assertEqual(
+                MetaDictionary.loadAtPath(
+                    os.path.join(dictDir, "meta.meta_dictionary.json")
+                ).metadict_version,
+                "3.0.0",
+            )
+        finally:
+            shutil.rmtree(tempDir)
+
+    def test_parallel_cascade(self):
+        "with jobs > 1 the checks and docs are done by worker processes, with the same results"
+        tempDir = tempfile.mkdtemp(suffix="testParallelCascade")
+        try:
+            explodedDir = os.path.join(tempDir, "meta_dictionary_exploded")
+            docsDir = os.path.join(tempDir, "docs")
+            serialDocsDir = os.path.join(tempDir, "serial_docs")
+            metaMetaDict().writeExploded(explodedDir)
+            MetaDictionary.fromDict(
+                dependentDict("other", "other_section")
+            ).writeExploded(explodedDir)
+            args = cascadeArgs()
+            # standardizes the exploded dictionaries
+            cascade(explodedDir, None, None, args)
+            written0 = writeStats.counts()[0]
+            cascade(explodedDir, None, serialDocsDir, args, useManifest=False)
+            written1 = writeStats.counts()[0]
+            with mock.patch.object(
+                concurrent.futures,
+                "ProcessPoolExecutor",
+                wraps=concurrent.futures.ProcessPoolExecutor,
+            ) as pool:
+                cascade(explodedDir, None, docsDir, args, useManifest=False, jobs=2)
+            self.assertEqual(pool.call_count, 1)
+            self.assertEqual(pool.call_args[1]["max_workers"], 2)
+            written2 = writeStats.counts()[0]
+            serialFiles = sorted(
+                os.path.relpath(os.path.join(d, f), serialDocsDir)
+                for d, dirs, files in os.walk(serialDocsDir)
+                for f in files
+            )
+            files = sorted(
+                os.path.relpath(os.path.join(d, f), docsDir)
+                for d, dirs, files in os.walk(docsDir)
+                for f in files
+            )
+            self.assertIn(os.path.join("other", "index.html"), files)
+            self.assertEqual(files, serialFiles)
+            # the files written by the workers are counted in the parent
+            self.assertEqual(written2 - written1, written1 - written0)
+        finally:
+            shutil.rmtree(tempDir)
+
+    def test_parallel_cascade_failure(self):
+        "a check failing in a worker process raises unless continueOnError"
+        tempDir = tempfile.mkdtemp(suffix="testParallelCascadeFailure")
+        try:
+            explodedDir = os.path.join(tempDir, "meta_dictionary_exploded")
+            metaMetaDict().writeExploded(explodedDir)
+            # not a valid name for the strict name check
+            MetaDictionary.fromDict(dependentDict("bad", "Bad_section")).writeExploded(
+                explodedDir
+            )
+            args = cascadeArgs()
+            cascade(explodedDir, None, None, args, useManifest=False, jobs=2)
+            with self.assertRaisesRegex(Exception, "checking dictionary bad"):
+                cascade(
+                    explodedDir,
+                    None,
+                    None,
+                    args,
+                    useManifest=False,
+                    continueOnError=False,
+                    jobs=2,
+                )
+        finally:
+            shutil.rmtree(tempDir)
+
+
+def dependentDict(name, sectionName):
+    "a dictionary with a single section, depending on meta"
+    return {
+        "metadict_name": name,
+        "metadict_description": [f"a dictionary with the section {sectionName}"],
+        "metadict_required": [{"metadict_required_name": "meta"}],
+        "meta_info_entry": [
+            {
+                "meta_name": sectionName,
+                "meta_type": "type-section",
+                "meta_description": ["a section"],
+            }
+        ],
+    }
+
+
+def cascadeArgs():
+    return argparse.Namespace(
+        name_check=NameCheckLevel.strict,
+        name_clashes=["ignore-case", "unique-section-attributes"],
+        name_clashes_warn=["ignore-all"],
+        katex=None,
+    )
+
+
+if __name__ == "__main__":
+    unittest.main()